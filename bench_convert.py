@@ -0,0 +1,38 @@
+'''Benchmark YUY2 / NV12 conversion throughput in megapixels per second'''
+import os
+import time
+import numpy as np
+from streaming.convert import FrameConverter
+
+WIDTH = 1920
+HEIGHT = 1080
+SECONDS = 1.0
+
+rng = np.random.default_rng(0)
+frames = {
+    b'YUY2': rng.integers(0, 256, (HEIGHT, WIDTH, 2), dtype=np.uint8),
+    b'NV12': rng.integers(0, 256, (HEIGHT * 3 // 2, WIDTH), dtype=np.uint8),
+}
+outputs = {
+    'gray': np.empty((HEIGHT, WIDTH), dtype=np.uint8),
+    'rgb': np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8),
+    'bgr': np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8),
+}
+
+worker_counts = sorted({0, 2, 4, os.cpu_count() or 1})
+print(f"{WIDTH}x{HEIGHT}, {os.cpu_count()} cpus")
+for source, frame in frames.items():
+    for workers in worker_counts:
+        with FrameConverter(source, WIDTH, HEIGHT, workers) as converter:
+            results = []
+            for target, out in outputs.items():
+                convert = getattr(converter, target)
+                convert(frame, out)
+                count = 0
+                start = time.perf_counter()
+                while time.perf_counter() - start < SECONDS:
+                    convert(frame, out)
+                    count += 1
+                elapsed = time.perf_counter() - start
+                results.append(f"{target} {count * WIDTH * HEIGHT / elapsed / 1e6:8.1f} MP/s")
+        print(f"{source.decode()} workers {workers:2}: " + ", ".join(results))
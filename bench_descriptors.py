@@ -0,0 +1,40 @@
+'''Benchmark memory footprint and parse throughput of the descriptor tree using the config_desc dump'''
+import pickle
+import sys
+import time
+import tracemalloc
+from descriptors import DescriptorParser
+
+TREES = 200
+ROUNDS = 50
+
+with open('config_desc', 'rb') as config_file:
+    config = pickle.load(config_file)
+
+# Memory: keep TREES parsed trees alive and measure what they retain
+tracemalloc.start()
+baseline = tracemalloc.take_snapshot()
+trees = [DescriptorParser(config) for _ in range(TREES)]
+retained = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, 'filename'))
+tracemalloc.stop()
+
+instances = trees[0].descriptors
+print(f"descriptors per tree: {len(instances)}")
+print(f"bytes per tree (tracemalloc): {retained / TREES:.0f}")
+print(f"bytes per tree (getsizeof, objects only): {sum(sys.getsizeof(desc) for desc in instances)}")
+print(f"descriptors with __dict__: {sum(hasattr(desc, '__dict__') for desc in instances)}")
+del trees
+
+# Throughput
+start = time.perf_counter()
+for _ in range(ROUNDS):
+    DescriptorParser(config)
+elapsed = time.perf_counter() - start
+print(f"trees per second: {ROUNDS / elapsed:.0f}")
+print(f"instances per second: {ROUNDS * len(instances) / elapsed:.0f}")
+
+start = time.perf_counter()
+for _ in range(ROUNDS):
+    DescriptorParser(config, lazy=True)
+elapsed = time.perf_counter() - start
+print(f"lazy indexed trees per second: {ROUNDS / elapsed:.0f}")
@@ -0,0 +1,81 @@
+'''Benchmark the overhead of the capture metrics against the frame time'''
+import time
+from streaming import HEADER_FID, HEADER_EOF, HEADER_EOH
+from streaming import FrameAssembler, FrameBufferPool, TransferEngine, LoopbackContext, LoopbackDeviceHandle
+from streaming.metrics import Histogram, Metrics, instrument_engine
+
+WIDTH = 640
+HEIGHT = 480
+FPS = 30
+FRAME_SIZE = WIDTH * HEIGHT * 2
+FRAMES = 120
+REPEATS = 5
+ENDPOINT = 0x81
+PAYLOAD_DATA = 3060
+PACKET_SIZE = 3072
+ISO_PACKETS = 4
+# Frames between two snapshots, a snapshot every second at FPS
+SNAPSHOT_PERIOD = FPS
+
+
+def frame_payloads(fid):
+    payloads = []
+    for offset in range(0, FRAME_SIZE, PAYLOAD_DATA):
+        length = min(PAYLOAD_DATA, FRAME_SIZE - offset)
+        info = HEADER_EOH | fid | (HEADER_EOF if offset + length == FRAME_SIZE else 0)
+        payloads.append(bytes((2, info)) + bytes(length))
+    return payloads
+
+
+TEMPLATES = (frame_payloads(0), frame_payloads(HEADER_FID))
+
+
+def stream():
+    for index in range(FRAMES):
+        yield from TEMPLATES[index & 1]
+
+
+def run(instrumented):
+    '''Seconds of processing per frame streaming through the loopback backend'''
+    context = LoopbackContext()
+    handle = LoopbackDeviceHandle(context, stream(), payloads_per_event=ISO_PACKETS)
+    pool = FrameBufferPool(FRAME_SIZE, 4)
+    assembler = FrameAssembler(FRAME_SIZE, expected_size=FRAME_SIZE, pool=pool)
+    engine = TransferEngine(context, handle, ENDPOINT, assembler, queue_depth=8,
+                            transfer_size=PACKET_SIZE * ISO_PACKETS, iso_packets=ISO_PACKETS)
+    metrics = Metrics()
+    snapshots = []
+    if instrumented:
+        instrument_engine(metrics, 'camera', engine)
+    start = time.perf_counter()
+    engine.start()
+    while not handle.exhausted:
+        for frame in engine.poll():
+            frame.release()
+            if instrumented and assembler.frames % SNAPSHOT_PERIOD == 0:
+                snapshots.append(metrics.snapshot())
+    engine.stop()
+    return (time.perf_counter() - start) / assembler.frames
+
+
+def record_cost():
+    '''Seconds per Histogram.record call'''
+    histogram = Histogram()
+    count = 1000000
+    start = time.perf_counter()
+    for _ in range(count):
+        histogram.record(0.000125)
+    return (time.perf_counter() - start) / count
+
+
+frame_time = 1 / FPS
+transfers_per_frame = -(-FRAME_SIZE // PAYLOAD_DATA) / ISO_PACKETS
+plain = min(run(False) for _ in range(REPEATS))
+instrumented = min(run(True) for _ in range(REPEATS))
+record = record_cost()
+print(f"{WIDTH}x{HEIGHT} YUY2, {transfers_per_frame:.0f} transfers per frame, frame time {frame_time * 1e3:.1f} ms")
+print(f"processing per frame: {plain * 1e6:8.1f} us plain, {instrumented * 1e6:8.1f} us instrumented")
+print(f"measured overhead:    {(instrumented - plain) * 1e6:8.1f} us per frame, "
+      f"{(instrumented - plain) / frame_time * 100:.3f}% of the frame time")
+print(f"histogram record:     {record * 1e9:8.1f} ns, {record * transfers_per_frame * 1e6:.1f} us per frame, "
+      f"{record * transfers_per_frame / frame_time * 100:.3f}% of the frame time")
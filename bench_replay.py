@@ -0,0 +1,154 @@
+'''Benchmark the capture path without hardware: replay devices serving config_desc and a synthetic recording
+
+Needs NumPy for the views of the uncompressed frames.
+'''
+import errno
+import os
+import struct
+import sys
+import tempfile
+from descriptors import DT_ID, DT_VC_IAD, SC_VIDEOSTREAMING, VS_INPUT_HEADER, VS_FORMAT_UNCOMPRESSED
+from descriptors import VS_FRAME_UNCOMPRESSED, VS_FORMAT_FRAME_BASED, VS_FRAME_FRAME_BASED
+from streaming import CaptureManager, Frame, Recorder, open_cameras
+from streaming.metrics import Metrics, instrument_capture, rates
+from streaming.replay import ReplayDevice, load_descriptor_dump
+
+WIDTH = 640
+HEIGHT = 480
+FPS = 30
+FRAMES = 90
+CAMERAS = (1, 2, 4)
+CLOCK_FREQUENCY = 15000000
+DUMP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config_desc')
+# Continuous frame interval range offered by the synthetic frame: min, max, step
+CONTINUOUS_INTERVALS = (10000000 // FPS, 10000000, 10000000 // FPS)
+
+
+def synthetic_descriptors(descriptors, frame_based=False, continuous=False):
+    '''The dump with its YUY2 format reduced to one WIDTH x HEIGHT frame
+
+    frame_based turns the format into a frame based one, continuous gives the frame a continuous
+    frame interval range instead of the discrete FPS interval.
+    '''
+    size = WIDTH * HEIGHT * 2
+    if continuous:
+        intervals = struct.pack('<III', *CONTINUOUS_INTERVALS)
+    else:
+        intervals = struct.pack('<I', 10000000 // FPS)
+    interval_type = 0 if continuous else 1
+    if frame_based:
+        frame = struct.pack('<BBBBBHHIIIBI', 26 + len(intervals), DT_VC_IAD, VS_FRAME_FRAME_BASED, 1, 0, WIDTH,
+                            HEIGHT, size * 8, size * 8 * FPS, 10000000 // FPS, interval_type, WIDTH * 2)
+    else:
+        frame = struct.pack('<BBBBBHHIIIIB', 26 + len(intervals), DT_VC_IAD, VS_FRAME_UNCOMPRESSED, 1, 0, WIDTH,
+                            HEIGHT, size * 8, size * 8 * FPS, size, 10000000 // FPS, interval_type)
+    frame += intervals
+    result = bytearray()
+    header_offset = None
+    subclass = None
+    offset = 0
+    while offset < len(descriptors):
+        descriptor = descriptors[offset:offset + descriptors[offset]]
+        offset += len(descriptor)
+        if descriptor[1] == DT_ID:
+            subclass = descriptor[6]
+        elif descriptor[1] == DT_VC_IAD and subclass == SC_VIDEOSTREAMING:
+            if descriptor[2] == VS_INPUT_HEADER:
+                header_offset = len(result)
+            elif descriptor[2] == VS_FORMAT_UNCOMPRESSED:
+                if frame_based:
+                    # Same index and GUID, 16 bits per pixel, fixed size frames
+                    descriptor = struct.pack('<BBBBB16sBBBBBBB', 28, DT_VC_IAD, VS_FORMAT_FRAME_BASED, descriptor[3], 1,
+                                             descriptor[5:21], 16, 1, 0, 0, 0, 0, 0)
+                else:
+                    # One frame only
+                    descriptor = descriptor[:4] + b'\x01' + descriptor[5:]
+                result += descriptor + frame
+                continue
+            elif descriptor[2] == VS_FRAME_UNCOMPRESSED:
+                continue
+        result += descriptor
+    struct.pack_into('<H', result, 2, len(result))
+    # The input header's wTotalLength covers the class specific descriptors of the interface
+    header_length = struct.unpack_from('<H', result, header_offset + 4)[0]
+    struct.pack_into('<H', result, header_offset + 4, header_length + len(result) - len(descriptors))
+    return bytes(result)
+
+
+def record(path, descriptors):
+    '''Recording of FRAMES YUY2 frames at FPS with PTS and SCR of a CLOCK_FREQUENCY device clock'''
+    size = WIDTH * HEIGHT * 2
+    with Recorder(path, descriptors, max_pending=FRAMES) as recorder:
+        for index in range(FRAMES):
+            ticks = index * CLOCK_FREQUENCY // FPS
+            buffer = bytearray((index % 251,)) * size
+            recorder.write_frame(Frame(buffer, size, index & 1, ticks & 0xFFFFFFFF,
+                                       (ticks + CLOCK_FREQUENCY // 200) & 0xFFFFFFFF, (index * 1000 // FPS) & 0x7FF,
+                                       index, True, timestamp=index / FPS))
+
+
+def aliases(manager, name, frame):
+    '''Whether the camera's NumPy view of the frame is a YUY2 (HEIGHT, WIDTH, 2) view of its pooled buffer'''
+    layout = manager.layout(name)
+    if layout is None or layout.fourcc != b'YUY2':
+        return False
+    image = manager.array(name, frame)
+    if image.shape != (HEIGHT, WIDTH, 2) or image.flags.owndata:
+        return False
+    # A write through the buffer shows in the view
+    first = frame.buffer[0]
+    frame.buffer[0] = first ^ 0xFF
+    aliased = image[0, 0, 0] == first ^ 0xFF
+    frame.buffer[0] = first
+    return bool(aliased)
+
+
+def run(path, cameras, speed, preferred_format=VS_FORMAT_UNCOMPRESSED):
+    devices = [ReplayDevice.from_recording(path, speed=speed, address=number + 1) for number in range(cameras)]
+    manager = CaptureManager(max_queued=3)
+    open_cameras(manager, min_width=WIDTH, min_height=HEIGHT, min_fps=FPS,
+                 preferred_formats=(preferred_format,), devices=devices)
+    metrics = Metrics()
+    instrument_capture(metrics, manager)
+    frames = 0
+    corrupt = 0
+    # Uncompressed frames are also read as (height, width, 2) views, which must alias the pooled buffers
+    viewed = preferred_format == VS_FORMAT_UNCOMPRESSED
+    not_aliased = 0
+    before = metrics.snapshot()
+    with manager:
+        for name, frame in manager:
+            data = frame.data
+            if data[0] != data[-1] or len(data) != WIDTH * HEIGHT * 2:
+                corrupt += 1
+            if viewed:
+                not_aliased += not aliases(manager, name, frame)
+            frame.release()
+            frames += 1
+    after = metrics.snapshot()
+    per_second = rates(before, after)
+    transferred = sum(value for name, value in per_second.items() if name.endswith('.bytes'))
+    # Every worker ends when its replay runs out
+    errors = [name for name in manager.cameras if getattr(manager.stats(name).error, 'errno', None) != errno.ENODEV]
+    label = 'max speed' if speed is None else f'speed {speed}'
+    print(f"{cameras} camera(s), {label:9}: {frames:4}/{cameras * FRAMES} frames, {corrupt} corrupt, "
+          f"{not_aliased} views copied, "
+          f"{frames / (after['time'] - before['time']):7.1f} frames/s, {transferred / 1e6:7.1f} MB/s")
+    return corrupt == 0 and not_aliased == 0 and frames == cameras * FRAMES and not errors
+
+
+descriptors = load_descriptor_dump(DUMP)
+ok = True
+with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, 'recording')
+    record(path, descriptors)
+    for cameras in CAMERAS:
+        ok &= run(path, cameras, None)
+    ok &= run(path, 1, 1.0)
+    for frame_based, continuous in ((False, True), (True, False), (True, True)):
+        path = os.path.join(directory, f'synthetic-{int(frame_based)}{int(continuous)}')
+        record(path, synthetic_descriptors(descriptors, frame_based, continuous))
+        print(f"{'frame based' if frame_based else 'uncompressed'}, "
+              f"{'continuous' if continuous else 'discrete'} frame intervals:")
+        ok &= run(path, 1, None, VS_FORMAT_FRAME_BASED if frame_based else VS_FORMAT_UNCOMPRESSED)
+sys.exit(0 if ok else 1)
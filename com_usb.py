@@ -1,27 +1,35 @@
-import usb
-import numpy as np
+import json
+import sys
 import time
-devs_iter = usb.core.find(find_all=True, bDeviceClass=239)
-device_list = list(devs_iter)
-cam = device_list[0]
-cam.set_configuration()
-conf = cam.get_active_configuration()
-intfs = conf.interfaces()
-index = 0
-stream = intfs[2]
-eps = stream.endpoints()
-ep = eps[0]
-print(ep.__str__())
-control_intf = intfs[0]
-print(stream._get_full_descriptor_str())
-cam.set_interface_altsetting(stream, stream.bAlternateSetting)
-prev = time.time()
-data = []
-while True:
-    data = ep.read(31871)
-    if data:
-        print("FRAME")
-        print(time.time() - prev)
-        print(len(data))
-        print(np.average(data))
-        prev = time.time()
\ No newline at end of file
+from descriptors import VS_FORMAT_UNCOMPRESSED
+from streaming import CaptureManager, open_cameras
+from streaming.metrics import Metrics, instrument_capture, rates
+from streaming.replay import ReplayDevice
+
+# Frames that may be held by consumers at once, per camera
+POOL_SIZE = 4
+# Seconds between metrics printouts
+STATS_PERIOD = 5
+
+# Recording directories given on the command line are replayed instead of the connected cameras
+devices = [ReplayDevice.from_recording(path, address=number + 1) for number, path in enumerate(sys.argv[1:])]
+manager = CaptureManager(max_queued=POOL_SIZE - 1)
+names = open_cameras(manager, min_width=640, min_height=480, min_fps=30,
+                     preferred_formats=(VS_FORMAT_UNCOMPRESSED,), pool_size=POOL_SIZE, devices=devices or None)
+print(f"capturing from {', '.join(names)}")
+metrics = Metrics()
+instrument_capture(metrics, manager)
+
+# Mean pixel value of the last frame of each camera, read through a zero copy view of the pooled buffer
+brightness = {}
+previous = metrics.snapshot()
+with manager:
+    for name, frame in manager:
+        if manager.layout(name) is not None:
+            brightness[name] = round(float(manager.array(name, frame).mean()), 1)
+        frame.release()
+        if time.monotonic() - previous['time'] >= STATS_PERIOD:
+            current = metrics.snapshot()
+            print(json.dumps({'rates': rates(previous, current), 'gauges': current['gauges'],
+                              'capture': manager.snapshot(), 'brightness': brightness}, indent=1))
+            previous = current
@@ -15,4 +15,23 @@ from .vs_descriptors import VSHeaderDescriptor
 from .vs_descriptors import UncompressedVideoFormatDescriptor
 from .vs_descriptors import MJPEGVideoFormatDescriptor
 from .vs_descriptors import VideoFrameDescriptor
-from .descriptor_parser import DescriptorParser
\ No newline at end of file
+from .vs_descriptors import VSOutputHeaderDescriptor
+from .vs_descriptors import StillImageFrameDescriptor
+from .vs_descriptors import MPEG2TSFormatDescriptor
+from .vs_descriptors import DVFormatDescriptor
+from .vs_descriptors import FrameBasedFormatDescriptor
+from .vs_descriptors import FrameBasedFrameDescriptor
+from .vs_descriptors import StreamBasedFormatDescriptor
+from .vs_descriptors import H264VideoFormatDescriptor
+from .vs_descriptors import H264VideoFrameDescriptor
+from .vs_descriptors import VP8VideoFormatDescriptor
+from .vs_descriptors import VP8VideoFrameDescriptor
+from .descriptor_tree import ConfigurationNode
+from .descriptor_tree import InterfaceAssociationNode
+from .descriptor_tree import InterfaceNode
+from .descriptor_tree import AlternateSettingNode
+from .descriptor_tree import FormatNode
+from .descriptor_tree import EndpointNode
+from .descriptor_parser import DescriptorParser
+from .descriptor_parser import parse_all
+from .descriptor_cache import DescriptorCache
\ No newline at end of file
@@ -0,0 +1,188 @@
+'''This module contains a vectorized parser for scanning many configuration blobs at once
+
+It depends on NumPy and is therefore not imported by the descriptors package itself.
+'''
+import numpy as np
+from .descriptor_constants import *
+
+# Zero bytes appended to the concatenated buffer so fixed offset gathers never run off the end
+_PADDING = 64
+
+# Fields of a video frame descriptor, padded frame intervals are appended per batch
+FRAME_FIELDS = [
+    ('blob', np.int32),
+    ('offset', np.int32),
+    ('format_index', np.uint8),
+    ('format_sub_type', np.uint8),
+    ('frame_index', np.uint8),
+    ('sub_type', np.uint8),
+    ('capabilities', np.uint8),
+    ('width', np.uint16),
+    ('height', np.uint16),
+    ('min_bit_rate', np.uint32),
+    ('max_bit_rate', np.uint32),
+    ('max_video_frame_buffer_size', np.uint32),
+    ('default_frame_interval', np.uint32),
+    ('frame_interval_type', np.uint8),
+    ('min_frame_interval', np.uint32),
+    ('max_frame_interval', np.uint32),
+    ('frame_interval_step', np.uint32),
+]
+
+DESCRIPTOR_FIELDS = [
+    ('blob', np.int32),
+    ('offset', np.int32),
+    ('length', np.uint8),
+    ('type', np.uint8),
+    ('sub_type', np.uint8),
+    ('interface_type', np.int16),
+]
+
+# Frame sub types sharing the uncompressed / MJPEG frame layout
+_FRAME_SUB_TYPES = (VS_FRAME_UNCOMPRESSED, VS_FRAME_MJPEG)
+
+_FORMAT_SUB_TYPES = (
+    VS_FORMAT_UNCOMPRESSED, VS_FORMAT_MJPEG, VS_FORMAT_MPEG2TS, VS_FORMAT_DV, VS_FORMAT_FRAME_BASED,
+    VS_FORMAT_STREAM_BASED, VS_FORMAT_H264, VS_FORMAT_H264_SIMULCAST, VS_FORMAT_VP8,
+    VS_FORMAT_VP8_SIMULCAST
+)
+
+
+def _u16(buffer, positions):
+    return buffer[positions].astype(np.uint32) | (buffer[positions + 1].astype(np.uint32) << 8)
+
+
+def _u32(buffer, positions):
+    return _u16(buffer, positions) | (_u16(buffer, positions + 2) << 16)
+
+
+def _last_index(mask):
+    '''For every row the index of the last row at or before it where mask is set (-1 if none)'''
+    if not len(mask):
+        return np.empty(0, dtype=np.int64)
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+
+class DescriptorBatch:
+    '''Columnar view of the descriptors in many raw configuration blobs
+
+    The blobs are concatenated into one buffer and descriptor boundaries are found for all of
+    them at once by pointer doubling over the bLength chains, so no Python object is built
+    per descriptor.
+    '''
+
+    def __init__(self, blobs):
+        blobs = [np.frombuffer(memoryview(blob).cast('B'), dtype=np.uint8) for blob in blobs]
+        lengths = np.array([len(blob) for blob in blobs], dtype=np.int64)
+        self._ends = np.cumsum(lengths)
+        self._starts = self._ends - lengths
+        self._buffer = np.concatenate(blobs + [np.zeros(_PADDING, dtype=np.uint8)])
+        self._offsets, self._blob_ids = self._find_boundaries()
+        buffer = self._buffer
+        offsets = self._offsets
+        self._lengths = buffer[offsets]
+        self._types = buffer[offsets + 1]
+        # A two byte descriptor has no sub type, its third byte belongs to the next descriptor
+        self._sub_types = np.where(self._lengths > 2, buffer[offsets + 2], 0).astype(np.uint8)
+        self._interface_types = self._context(self._types == DT_ID, 6).astype(np.int16)
+
+    def _find_boundaries(self):
+        '''Offsets of every descriptor reachable by following bLength from the start of each blob'''
+        size = int(self._ends[-1]) if len(self._ends) else 0
+        positions = np.arange(size, dtype=np.int64)
+        blob_ends = np.repeat(self._ends, self._ends - self._starts)
+        desc_lengths = self._buffer[:size].astype(np.int64)
+        jump = positions + desc_lengths
+        # Chains stop at the end of their blob, on a zero length or on a descriptor overrunning the blob
+        jump[(desc_lengths < 2) | (jump >= blob_ends)] = size
+        jump = np.append(jump, size)
+        visited = np.zeros(size + 1, dtype=bool)
+        visited[self._starts[self._ends > self._starts]] = True
+        reached = np.count_nonzero(visited)
+        while True:
+            visited[jump[np.flatnonzero(visited)]] = True
+            jump = jump[jump]
+            now_reached = np.count_nonzero(visited)
+            if now_reached == reached:
+                break
+            reached = now_reached
+        offsets = np.flatnonzero(visited[:size])
+        # Drop the descriptor ending a chain on an invalid length or truncated by the end of its blob
+        blob_ids = np.searchsorted(self._ends, offsets, side='right')
+        keep = (desc_lengths[offsets] >= 2) & (offsets + desc_lengths[offsets] <= self._ends[blob_ids])
+        return offsets[keep], blob_ids[keep]
+
+    def _context(self, mask, field_offset):
+        '''Byte at field_offset of the last descriptor matching mask in the same blob (-1 if none)'''
+        last = _last_index(mask)
+        valid = last >= 0
+        valid[valid] = self._blob_ids[last[valid]] == self._blob_ids[valid]
+        values = np.full(len(mask), -1, dtype=np.int64)
+        values[valid] = self._buffer[self._offsets[last[valid]] + field_offset]
+        return values
+
+    @property
+    def buffer(self):
+        '''Concatenated blobs (followed by zero padding)'''
+        return self._buffer
+
+    @property
+    def descriptors(self):
+        '''Structured array with one row per descriptor in all blobs'''
+        table = np.empty(len(self._offsets), dtype=DESCRIPTOR_FIELDS)
+        table['blob'] = self._blob_ids
+        table['offset'] = self._offsets - self._starts[self._blob_ids]
+        table['length'] = self._lengths
+        table['type'] = self._types
+        table['sub_type'] = self._sub_types
+        table['interface_type'] = self._interface_types
+        return table
+
+    def frame_descriptors(self):
+        '''Structured array with one row per uncompressed / MJPEG video frame descriptor
+
+        Discrete frame intervals are returned in the frame_intervals column padded with zeros
+        to the longest list in the batch.
+        '''
+        class_specific = (self._types == CS_INTERFACE) & (self._interface_types == SC_VIDEOSTREAMING)
+        is_format = class_specific & np.isin(self._sub_types, _FORMAT_SUB_TYPES)
+        is_frame = class_specific & np.isin(self._sub_types, _FRAME_SUB_TYPES)
+        format_index = self._context(is_format, 3)[is_frame]
+        format_sub_type = self._context(is_format, 2)[is_frame]
+        buffer = self._buffer
+        offsets = self._offsets[is_frame]
+        interval_types = buffer[offsets + 25]
+        max_intervals = max(int(interval_types.max()) if len(offsets) else 0, 1)
+
+        table = np.zeros(len(offsets), dtype=FRAME_FIELDS + [('frame_intervals', np.uint32, (max_intervals,))])
+        table['blob'] = self._blob_ids[is_frame]
+        table['offset'] = offsets - self._starts[table['blob']]
+        table['format_index'] = np.maximum(format_index, 0)
+        table['format_sub_type'] = np.maximum(format_sub_type, 0)
+        table['frame_index'] = buffer[offsets + 3]
+        table['sub_type'] = buffer[offsets + 2]
+        table['capabilities'] = buffer[offsets + 4]
+        table['width'] = _u16(buffer, offsets + 5)
+        table['height'] = _u16(buffer, offsets + 7)
+        table['min_bit_rate'] = _u32(buffer, offsets + 9)
+        table['max_bit_rate'] = _u32(buffer, offsets + 13)
+        table['max_video_frame_buffer_size'] = _u32(buffer, offsets + 17)
+        table['default_frame_interval'] = _u32(buffer, offsets + 21)
+        table['frame_interval_type'] = interval_types
+
+        continuous = interval_types == 0
+        table['min_frame_interval'] = np.where(continuous, _u32(buffer, offsets + 26), 0)
+        table['max_frame_interval'] = np.where(continuous, _u32(buffer, offsets + 30), 0)
+        table['frame_interval_step'] = np.where(continuous, _u32(buffer, offsets + 34), 0)
+        slots = np.arange(max_intervals)
+        interval_positions = offsets[:, None] + 26 + 4 * slots[None, :]
+        # A bFrameIntervalType larger than the descriptor holds must not gather past its end
+        ends = (offsets + self._lengths[is_frame])[:, None]
+        in_list = (slots[None, :] < interval_types[:, None]) & (interval_positions + 4 <= ends)
+        # Only gather inside the descriptor, padding slots stay zero
+        interval_positions = np.where(in_list, interval_positions, 0)
+        table['frame_intervals'] = np.where(in_list, _u32(buffer, interval_positions), 0)
+        return table
+
+    def __len__(self):
+        return len(self._offsets)
@@ -0,0 +1,149 @@
+'''This module contains a cache of parsed descriptor trees keyed by the content of the configuration blob'''
+import collections
+import hashlib
+import os
+import struct
+import threading
+from .descriptor_parser import DescriptorParser
+
+
+class DescriptorCache:
+    '''LRU cache of parsed configuration descriptors with an optional on-disk store
+
+    Entries are keyed by a hash of the raw configuration bytes, optionally combined with
+    the idVendor / idProduct / bcdDevice of the device descriptor. The on-disk store keeps
+    the raw blob and the parser index so a known camera is rebuilt without walking the blob.
+    '''
+
+    # File header: magic, format version, number of index records, blob length
+    FILE_HEADER = struct.Struct('<4sHII')
+    # Index record: offset, length, type, sub type, interface sub class, flags
+    FILE_RECORD = struct.Struct('<IBBBBB')
+    FILE_MAGIC = b'UVCD'
+    FILE_VERSION = 1
+    FILE_SUFFIX = '.desc'
+
+    # Record flags for index fields that may be None
+    _HAS_SUB_TYPE = 0x01
+    _HAS_INTERFACE_TYPE = 0x02
+
+    def __init__(self, max_size=128, directory=None, lazy=True):
+        self._max_size = max_size
+        self._directory = directory
+        self._lazy = lazy
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(data, device_descriptor=None):
+        '''Cache key for a configuration blob and optional DeviceDescriptor'''
+        digest = hashlib.blake2b(digest_size=16)
+        if device_descriptor is not None:
+            digest.update(struct.pack('<HHH', device_descriptor.idVendor, device_descriptor.idProduct,
+                                      device_descriptor.bcdDevice))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def parse(self, data, device_descriptor=None):
+        '''Parsed descriptors for the configuration blob, parsing only on a miss'''
+        key = self.key(data, device_descriptor)
+        with self._lock:
+            parser = self._entries.get(key)
+            if parser is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return parser
+        parser = self._load(key)
+        if parser is not None:
+            hit = True
+        else:
+            hit = False
+            # Cached trees outlive the caller's buffer, keep a private copy of the blob
+            parser = DescriptorParser(bytes(data), lazy=self._lazy)
+            self._store(key, parser)
+        with self._lock:
+            if hit:
+                self._disk_hits += 1
+            else:
+                self._misses += 1
+            self._entries[key] = parser
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        return parser
+
+    def clear(self):
+        '''Drop all in-memory entries (the on-disk store is kept)'''
+        with self._lock:
+            self._entries.clear()
+
+    def _path(self, key):
+        return os.path.join(self._directory, key + self.FILE_SUFFIX)
+
+    def _load(self, key):
+        '''Rebuild a parser from the on-disk store, None if the entry is missing or unreadable'''
+        if self._directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as cache_file:
+                contents = cache_file.read()
+        except OSError:
+            return None
+        try:
+            magic, version, count, blob_length = self.FILE_HEADER.unpack_from(contents)
+        except struct.error:
+            return None
+        blob_offset = self.FILE_HEADER.size + count * self.FILE_RECORD.size
+        if magic != self.FILE_MAGIC or version != self.FILE_VERSION or blob_offset + blob_length != len(contents):
+            return None
+        index = []
+        for record in self.FILE_RECORD.iter_unpack(contents[self.FILE_HEADER.size:blob_offset]):
+            offset, length, desc_type, sub_type, interface_type, flags = record
+            index.append((offset, length, desc_type,
+                          sub_type if flags & self._HAS_SUB_TYPE else None,
+                          interface_type if flags & self._HAS_INTERFACE_TYPE else None))
+        return DescriptorParser(contents[blob_offset:], lazy=self._lazy, index=index)
+
+    def _store(self, key, parser):
+        '''Write the raw blob and parser index to the on-disk store'''
+        if self._directory is None:
+            return
+        records = bytearray()
+        for offset, length, desc_type, sub_type, interface_type in parser.index:
+            flags = 0
+            if sub_type is not None:
+                flags |= self._HAS_SUB_TYPE
+            if interface_type is not None:
+                flags |= self._HAS_INTERFACE_TYPE
+            records += self.FILE_RECORD.pack(offset, length, desc_type, sub_type or 0, interface_type or 0, flags)
+        data = parser.data
+        path = self._path(key)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as cache_file:
+            cache_file.write(self.FILE_HEADER.pack(self.FILE_MAGIC, self.FILE_VERSION, len(parser.index), len(data)))
+            cache_file.write(records)
+            cache_file.write(data)
+        os.replace(temp_path, path)
+
+    @property
+    def hits(self):
+        '''Number of lookups served from memory'''
+        return self._hits
+
+    @property
+    def disk_hits(self):
+        '''Number of lookups served from the on-disk store'''
+        return self._disk_hits
+
+    @property
+    def misses(self):
+        '''Number of lookups that had to parse the blob'''
+        return self._misses
+
+    def __len__(self):
+        return len(self._entries)
@@ -48,6 +48,12 @@ VC_PROCESSING_UNIT = 0x05
 VC_EXTENSION_UNIT = 0x06
 VC_ENCODING_UNIT = 0x07
 
+# Class specific endpoint descriptor sub types
+EP_UNDEFINED = 0x00
+EP_GENERAL = 0x01
+EP_ENDPOINT = 0x02
+EP_INTERRUPT = 0x03
+
 ITT_VENDOR_SPECIFIC = 0x0200
 ITT_CAMERA = 0x0201
 ITT_MEDIA_TRANSPORT_INPUT = 0x202
@@ -80,4 +86,43 @@ VS_FRAME_H264 = 0x14
 VS_FORMAT_H264_SIMULCAST = 0x15
 VS_FORMAT_VP8 = 0x16
 VS_FRAME_VP8 = 0x17
-VS_FORMAT_VP8_SIMULCAST = 0x18
\ No newline at end of file
+VS_FORMAT_VP8_SIMULCAST = 0x18
+#--------------------------------------#
+# Standard Requests                    #
+#--------------------------------------#
+# bmRequestType of standard requests
+REQUEST_TYPE_SET_DEVICE = 0x00
+REQUEST_TYPE_SET_STANDARD_INTERFACE = 0x01
+REQUEST_TYPE_GET_DEVICE = 0x80
+# Request codes
+GET_STATUS = 0x00
+GET_DESCRIPTOR = 0x06
+GET_CONFIGURATION = 0x08
+SET_CONFIGURATION = 0x09
+SET_INTERFACE = 0x0B
+#--------------------------------------#
+# Video Class-Specific Requests        #
+#--------------------------------------#
+# bmRequestType of class specific requests to an interface
+REQUEST_TYPE_SET_INTERFACE = 0x21
+REQUEST_TYPE_GET_INTERFACE = 0xA1
+# Request codes
+SET_CUR = 0x01
+GET_CUR = 0x81
+GET_MIN = 0x82
+GET_MAX = 0x83
+GET_RES = 0x84
+GET_LEN = 0x85
+GET_INFO = 0x86
+GET_DEF = 0x87
+# Video streaming interface control selectors
+VS_CONTROL_UNDEFINED = 0x00
+VS_PROBE_CONTROL = 0x01
+VS_COMMIT_CONTROL = 0x02
+VS_STILL_PROBE_CONTROL = 0x03
+VS_STILL_COMMIT_CONTROL = 0x04
+VS_STILL_IMAGE_TRIGGER_CONTROL = 0x05
+VS_STREAM_ERROR_CODE_CONTROL = 0x06
+VS_GENERATE_KEY_FRAME_CONTROL = 0x07
+VS_UPDATE_FRAME_SEGMENT_CONTROL = 0x08
+VS_SYNCH_DELAY_CONTROL = 0x09
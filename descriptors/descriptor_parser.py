@@ -1,64 +1,180 @@
+import concurrent.futures
 from .descriptor_constants import *
 from .usb_descriptors import *
 from .vc_descriptors import *
 from .vs_descriptors import *
+from .descriptor_tree import build_tree
+
+# Marks descriptors in the index that have not been constructed yet
+_UNPARSED = object()
+
+
+def _parse_input_terminal(data):
+    '''Input terminals describing a camera sensor carry the camera controls'''
+    # wTerminalType is read from the raw bytes so only one descriptor is constructed
+    if int.from_bytes(data[4:6], 'little') == ITT_CAMERA:
+        return CameraTerminalDescriptor(data)
+    return VCInputTerminalDescriptor(data)
+
 
 class DescriptorParser:
     '''Helper class used to parse all configuration descriptors'''
 
+    # Constructors for class specific interface descriptors keyed by (interface sub class, sub type)
     CLASS_SPECIFIC_CONSTRUCTORS = {
-        SC_VIDEOCONTROL: {
-            VC_HEADER: VCInterfaceHeaderDescriptor,
-            VC_INPUT_TERMINAL: VCInputTerminalDescriptor,
-            VC_OUTPUT_TERMINAL: VCOutputTerminalDescriptor,
-            VC_SELECTOR_UNIT: SelectorUnitDescriptor,
-            VC_PROCESSING_UNIT: ProcessingUnitDescriptor,
-            VC_EXTENSION_UNIT: ExtensionUnitDescriptor,
-            VC_ENCODING_UNIT: EncodingUnitDescriptor
-        },
-        SC_VIDEOSTREAMING: {
-            VS_INPUT_HEADER: VSHeaderDescriptor,
-            VS_FORMAT_UNCOMPRESSED: UncompressedVideoFormatDescriptor,
-            VS_FORMAT_MJPEG: MJPEGVideoFormatDescriptor,
-            VS_FRAME_UNCOMPRESSED: VideoFrameDescriptor,
-            VS_FRAME_MJPEG: VideoFrameDescriptor,
-            VS_COLORFORMAT: VSColorMatchingDescriptor
-        }
+        (SC_VIDEOCONTROL, VC_HEADER): VCInterfaceHeaderDescriptor,
+        (SC_VIDEOCONTROL, VC_INPUT_TERMINAL): _parse_input_terminal,
+        (SC_VIDEOCONTROL, VC_OUTPUT_TERMINAL): VCOutputTerminalDescriptor,
+        (SC_VIDEOCONTROL, VC_SELECTOR_UNIT): SelectorUnitDescriptor,
+        (SC_VIDEOCONTROL, VC_PROCESSING_UNIT): ProcessingUnitDescriptor,
+        (SC_VIDEOCONTROL, VC_EXTENSION_UNIT): ExtensionUnitDescriptor,
+        (SC_VIDEOCONTROL, VC_ENCODING_UNIT): EncodingUnitDescriptor,
+        (SC_VIDEOSTREAMING, VS_INPUT_HEADER): VSHeaderDescriptor,
+        (SC_VIDEOSTREAMING, VS_OUTPUT_HEADER): VSOutputHeaderDescriptor,
+        (SC_VIDEOSTREAMING, VS_STILL_IMAGE_FRAME): StillImageFrameDescriptor,
+        (SC_VIDEOSTREAMING, VS_FORMAT_UNCOMPRESSED): UncompressedVideoFormatDescriptor,
+        (SC_VIDEOSTREAMING, VS_FRAME_UNCOMPRESSED): VideoFrameDescriptor,
+        (SC_VIDEOSTREAMING, VS_FORMAT_MJPEG): MJPEGVideoFormatDescriptor,
+        (SC_VIDEOSTREAMING, VS_FRAME_MJPEG): VideoFrameDescriptor,
+        (SC_VIDEOSTREAMING, VS_FORMAT_MPEG2TS): MPEG2TSFormatDescriptor,
+        (SC_VIDEOSTREAMING, VS_FORMAT_DV): DVFormatDescriptor,
+        (SC_VIDEOSTREAMING, VS_COLORFORMAT): VSColorMatchingDescriptor,
+        (SC_VIDEOSTREAMING, VS_FORMAT_FRAME_BASED): FrameBasedFormatDescriptor,
+        (SC_VIDEOSTREAMING, VS_FRAME_FRAME_BASED): FrameBasedFrameDescriptor,
+        (SC_VIDEOSTREAMING, VS_FORMAT_STREAM_BASED): StreamBasedFormatDescriptor,
+        (SC_VIDEOSTREAMING, VS_FORMAT_H264): H264VideoFormatDescriptor,
+        (SC_VIDEOSTREAMING, VS_FRAME_H264): H264VideoFrameDescriptor,
+        (SC_VIDEOSTREAMING, VS_FORMAT_H264_SIMULCAST): H264VideoFormatDescriptor,
+        (SC_VIDEOSTREAMING, VS_FORMAT_VP8): VP8VideoFormatDescriptor,
+        (SC_VIDEOSTREAMING, VS_FRAME_VP8): VP8VideoFrameDescriptor,
+        (SC_VIDEOSTREAMING, VS_FORMAT_VP8_SIMULCAST): VP8VideoFormatDescriptor
     }
 
-    @classmethod
-    def USBInterfaceParser(cls, data):
-        intf = InterfaceDescriptor(data)
-        DescriptorParser.CURR_INTF_TYPE = intf.bInterfaceSubClass
-        return intf
-    
-    @classmethod
-    def ClassSpecificInterfaceParser(cls, data):
-        return DescriptorParser.CLASS_SPECIFIC_CONSTRUCTORS[DescriptorParser.CURR_INTF_TYPE][data[2]](data)
+    USB_CONSTRUCTORS = {
+        DT_CONFIG: ConfigurationDescriptor,
+        DT_ID: InterfaceDescriptor,
+        DT_ED: EndpointDescriptor,
+        DT_IAD: InterfaceAssociationDescriptor,
+        CS_ENDPOINT: VCInterruptEndpointDescriptor
+    }
 
     @classmethod
-    def ClassSpecificEndpointParser(cls, data):
-        return VCInterruptEndpointDescriptor(data)
-
-    def __init__(self, data):
-        self._curr_interface_type = None
-        self.USB_CONSTRUCTORS = {
-            DT_CONFIG: ConfigurationDescriptor,
-            DT_ID: DescriptorParser.USBInterfaceParser,
-            DT_ED: EndpointDescriptor,
-            DT_IAD: InterfaceAssociationDescriptor,
-            DT_VC_IAD: InterfaceAssociationDescriptor,
-            CS_INTERFACE: DescriptorParser.ClassSpecificInterfaceParser,
-            CS_ENDPOINT: DescriptorParser.ClassSpecificEndpointParser
-        }
+    def ClassSpecificInterfaceParser(cls, data, interface_type):
+        return cls.CLASS_SPECIFIC_CONSTRUCTORS[interface_type, data[2]](data)
+
+    def __init__(self, data, verbose=False, lazy=False, index=None):
+        # All parsing state lives on the instance, the interface sub class in effect is
+        # recorded per descriptor in the index, so parsers can run concurrently.
+        # A single view of the configuration blob shared by every descriptor
+        self._data = memoryview(data).cast('B')
+        # A previously computed index (e.g. from the descriptor cache) skips the walk
+        self._index = self._index_descriptors(self._data) if index is None else index
+        self._materialized = [_UNPARSED] * len(self._index)
+        self._configuration = None
+        if verbose and self.invalid_offset is not None:
+            print(f"Invalid descriptor length at offset {self.invalid_offset}")
+        if lazy:
+            return
+        self._configuration = build_tree(self, self._data, self._index)
+        for index in range(len(self._index)):
+            descriptor = self.descriptor(index)
+            if not verbose:
+                continue
+            if descriptor is None:
+                offset, length = self._index[index][:2]
+                print(f"Invalid descriptor {bytes(self._data[offset:offset + length])}")
+            else:
+                print(descriptor)
 
+    @staticmethod
+    def _index_descriptors(data):
+        '''Walk the blob once by offset recording (offset, length, type, sub type, interface sub class)'''
+        index = []
+        interface_type = None
         data_len = len(data)
-        while data_len > 0:
-            sub_len = int(data[0])
-            desc_data = data[0:sub_len]
-            data = data[sub_len:]
-            data_len -= sub_len
-            try:
-                print(self.USB_CONSTRUCTORS[desc_data[1]](desc_data))
-            except KeyError:
-                print(f"Invalid descriptor {desc_data}")
+        offset = 0
+        while offset + 1 < data_len:
+            sub_len = data[offset]
+            if sub_len < 2 or offset + sub_len > data_len:
+                break
+            desc_type = data[offset + 1]
+            sub_type = data[offset + 2] if sub_len > 2 else None
+            if desc_type == DT_ID:
+                interface_type = data[offset + 6]
+            index.append((offset, sub_len, desc_type, sub_type, interface_type))
+            offset += sub_len
+        return index
+
+    @property
+    def data(self):
+        '''View of the raw configuration blob'''
+        return self._data
+
+    @property
+    def index(self):
+        '''Index of (offset, length, type, sub type, interface sub class) for every descriptor'''
+        return self._index
+
+    @property
+    def invalid_offset(self):
+        '''Offset of the descriptor with an invalid length that ended the walk (None if the whole blob was read)'''
+        end = self._index[-1][0] + self._index[-1][1] if self._index else 0
+        return end if end + 1 < len(self._data) else None
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, index):
+        return self.descriptor(index)
+
+    def descriptor(self, index):
+        '''Descriptor at the given position, constructed on first access (None if unsupported)'''
+        descriptor = self._materialized[index]
+        if descriptor is not _UNPARSED:
+            return descriptor
+        offset, length, desc_type, _, interface_type = self._index[index]
+        desc_data = self._data[offset:offset + length]
+        try:
+            if desc_type == CS_INTERFACE:
+                descriptor = self.ClassSpecificInterfaceParser(desc_data, interface_type)
+            else:
+                descriptor = self.USB_CONSTRUCTORS[desc_type](desc_data)
+        except KeyError:
+            descriptor = None
+        self._materialized[index] = descriptor
+        return descriptor
+
+    def find(self, descriptor_type, sub_type=None, interface_type=None):
+        '''Generator over descriptors matching the given type, sub type and interface sub class
+
+        Only the matching descriptors are constructed.
+        '''
+        for index, (_, _, entry_type, entry_sub_type, entry_interface_type) in enumerate(self._index):
+            if entry_type != descriptor_type:
+                continue
+            if sub_type is not None and entry_sub_type != sub_type:
+                continue
+            if interface_type is not None and entry_interface_type != interface_type:
+                continue
+            descriptor = self.descriptor(index)
+            if descriptor is not None:
+                yield descriptor
+
+    @property
+    def configuration(self):
+        '''Root node of the descriptor tree (None if the blob has no configuration descriptor)'''
+        if self._configuration is None:
+            self._configuration = build_tree(self, self._data, self._index)
+        return self._configuration
+
+    @property
+    def descriptors(self):
+        '''All supported descriptors in the configuration in the order they appear'''
+        descriptors = (self.descriptor(index) for index in range(len(self._index)))
+        return [descriptor for descriptor in descriptors if descriptor is not None]
+
+
+def parse_all(blobs, max_workers=None, lazy=False):
+    '''Parse many configuration blobs on a pool of worker threads, parsers are returned in the order of blobs'''
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda blob: DescriptorParser(blob, lazy=lazy), blobs))
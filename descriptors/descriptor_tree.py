@@ -0,0 +1,303 @@
+'''This module contains the nodes of the navigable descriptor tree built by the descriptor parser'''
+from .descriptor_constants import *
+
+# Class specific video streaming sub types that start a new format
+VS_FORMAT_SUB_TYPES = frozenset((
+    VS_FORMAT_UNCOMPRESSED, VS_FORMAT_MJPEG, VS_FORMAT_MPEG2TS, VS_FORMAT_DV, VS_FORMAT_FRAME_BASED,
+    VS_FORMAT_STREAM_BASED, VS_FORMAT_H264, VS_FORMAT_H264_SIMULCAST, VS_FORMAT_VP8,
+    VS_FORMAT_VP8_SIMULCAST
+))
+
+# Class specific video streaming sub types describing a frame of the preceding format
+VS_FRAME_SUB_TYPES = frozenset((
+    VS_FRAME_UNCOMPRESSED, VS_FRAME_MJPEG, VS_FRAME_FRAME_BASED, VS_FRAME_H264, VS_FRAME_VP8
+))
+
+VC_TERMINAL_SUB_TYPES = frozenset((VC_INPUT_TERMINAL, VC_OUTPUT_TERMINAL))
+
+VC_UNIT_SUB_TYPES = frozenset((
+    VC_SELECTOR_UNIT, VC_PROCESSING_UNIT, VC_EXTENSION_UNIT, VC_ENCODING_UNIT
+))
+
+
+class DescriptorNode:
+    '''Node of the descriptor tree, the descriptor itself is constructed by the parser on access'''
+
+    __slots__ = ('_parser', '_position')
+
+    def __init__(self, parser, position):
+        self._parser = parser
+        self._position = position
+
+    @property
+    def descriptor(self):
+        '''The descriptor this node wraps'''
+        return self._parser.descriptor(self._position)
+
+
+class ConfigurationNode(DescriptorNode):
+    '''Root of the descriptor tree'''
+
+    __slots__ = ('_interface_associations', '_interfaces')
+
+    def __init__(self, parser, position):
+        super().__init__(parser, position)
+        self._interface_associations = []
+        self._interfaces = {}
+
+    def interface(self, interface_number):
+        '''Interface with the given bInterfaceNumber'''
+        return self._interfaces[interface_number]
+
+    @property
+    def interface_associations(self):
+        '''Interface associations in this configuration'''
+        return self._interface_associations
+
+    @property
+    def interfaces(self):
+        '''Interfaces in this configuration keyed by bInterfaceNumber'''
+        return self._interfaces
+
+
+class InterfaceAssociationNode(DescriptorNode):
+    '''Interface association grouping the video control and video streaming interfaces of a function'''
+
+    __slots__ = ('_first_interface', '_interface_count', '_interfaces')
+
+    def __init__(self, parser, position, first_interface, interface_count):
+        super().__init__(parser, position)
+        self._first_interface = first_interface
+        self._interface_count = interface_count
+        self._interfaces = []
+
+    def covers(self, interface_number):
+        '''Check if the interface number belongs to this association'''
+        return self._first_interface <= interface_number < self._first_interface + self._interface_count
+
+    @property
+    def interfaces(self):
+        '''Interfaces belonging to this association'''
+        return self._interfaces
+
+
+class InterfaceNode:
+    '''Interface made up of one or more alternate settings'''
+
+    __slots__ = ('_interface_number', '_alternate_settings')
+
+    def __init__(self, interface_number):
+        self._interface_number = interface_number
+        self._alternate_settings = {}
+
+    def alternate_setting(self, alternate_setting):
+        '''Alternate setting with the given bAlternateSetting'''
+        return self._alternate_settings[alternate_setting]
+
+    @property
+    def interface_number(self):
+        '''bInterfaceNumber shared by all alternate settings of this interface'''
+        return self._interface_number
+
+    @property
+    def alternate_settings(self):
+        '''Alternate settings of this interface keyed by bAlternateSetting'''
+        return self._alternate_settings
+
+
+class AlternateSettingNode(DescriptorNode):
+    '''Alternate setting of an interface with its class specific descriptors and endpoints'''
+
+    __slots__ = (
+        '_interface_sub_class', '_header', '_class_descriptors', '_terminals', '_units', '_formats',
+        '_formats_by_sub_type', '_endpoints'
+    )
+
+    def __init__(self, parser, position, interface_sub_class):
+        super().__init__(parser, position)
+        self._interface_sub_class = interface_sub_class
+        self._header = None
+        self._class_descriptors = []
+        self._terminals = {}
+        self._units = {}
+        self._formats = {}
+        self._formats_by_sub_type = {}
+        self._endpoints = []
+
+    def terminal(self, terminal_id):
+        '''Input or output terminal with the given bTerminalID'''
+        return self._terminals[terminal_id]
+
+    def unit(self, unit_id):
+        '''Selector, processing, extension or encoding unit with the given bUnitID'''
+        return self._units[unit_id]
+
+    def format(self, format_index):
+        '''Format with the given bFormatIndex'''
+        return self._formats[format_index]
+
+    def formats_of_type(self, sub_type):
+        '''Formats with the given descriptor sub type (e.g. VS_FORMAT_MJPEG) in bFormatIndex order'''
+        return self._formats_by_sub_type.get(sub_type, [])
+
+    @property
+    def bInterfaceSubClass(self):
+        '''Sub class of the interface (SC_VIDEOCONTROL or SC_VIDEOSTREAMING)'''
+        return self._interface_sub_class
+
+    @property
+    def header(self):
+        '''Node of the class specific header descriptor (None if this setting has none)'''
+        return self._header
+
+    @property
+    def class_descriptors(self):
+        '''Nodes of all class specific descriptors of this setting in the order they appear'''
+        return self._class_descriptors
+
+    @property
+    def terminals(self):
+        '''Terminals keyed by bTerminalID'''
+        return self._terminals
+
+    @property
+    def units(self):
+        '''Units keyed by bUnitID'''
+        return self._units
+
+    @property
+    def formats(self):
+        '''Formats keyed by bFormatIndex'''
+        return self._formats
+
+    @property
+    def endpoints(self):
+        '''Endpoints of this setting'''
+        return self._endpoints
+
+
+class FormatNode(DescriptorNode):
+    '''Video streaming format with its frames'''
+
+    __slots__ = ('_sub_type', '_frames', '_still_image_frame', '_color_matching')
+
+    def __init__(self, parser, position, sub_type):
+        super().__init__(parser, position)
+        self._sub_type = sub_type
+        self._frames = {}
+        self._still_image_frame = None
+        self._color_matching = None
+
+    def frame(self, frame_index):
+        '''Frame with the given bFrameIndex'''
+        return self._frames[frame_index]
+
+    @property
+    def bDescriptorSubType(self):
+        '''Sub type of the format descriptor'''
+        return self._sub_type
+
+    @property
+    def frames(self):
+        '''Frames of this format keyed by bFrameIndex'''
+        return self._frames
+
+    @property
+    def still_image_frame(self):
+        '''Node of the still image frame descriptor (None if there is none)'''
+        return self._still_image_frame
+
+    @property
+    def color_matching(self):
+        '''Node of the color matching descriptor (None if there is none)'''
+        return self._color_matching
+
+
+class EndpointNode(DescriptorNode):
+    '''Endpoint with its optional class specific endpoint descriptor'''
+
+    __slots__ = ('_class_descriptor',)
+
+    def __init__(self, parser, position):
+        super().__init__(parser, position)
+        self._class_descriptor = None
+
+    @property
+    def class_descriptor(self):
+        '''Node of the class specific endpoint descriptor (None if there is none)'''
+        return self._class_descriptor
+
+
+def build_tree(parser, data, index):
+    '''Build the descriptor tree from the parser index reading only the bytes needed to link nodes'''
+    configuration = None
+    association = None
+    alternate_setting = None
+    video_format = None
+    endpoint = None
+    for position, (offset, length, desc_type, sub_type, interface_type) in enumerate(index):
+        if desc_type == DT_CONFIG:
+            configuration = ConfigurationNode(parser, position)
+        elif configuration is None:
+            continue
+        elif desc_type == DT_IAD:
+            association = InterfaceAssociationNode(parser, position, data[offset + 2], data[offset + 3])
+            configuration.interface_associations.append(association)
+        elif desc_type == DT_ID:
+            interface_number = data[offset + 2]
+            interface = configuration.interfaces.get(interface_number)
+            if interface is None:
+                interface = InterfaceNode(interface_number)
+                configuration.interfaces[interface_number] = interface
+                if association is not None and association.covers(interface_number):
+                    association.interfaces.append(interface)
+            alternate_setting = AlternateSettingNode(parser, position, interface_type)
+            interface.alternate_settings[data[offset + 3]] = alternate_setting
+            video_format = None
+            endpoint = None
+        elif alternate_setting is None:
+            continue
+        elif desc_type == DT_ED:
+            endpoint = EndpointNode(parser, position)
+            alternate_setting.endpoints.append(endpoint)
+        elif desc_type == CS_ENDPOINT:
+            if endpoint is not None:
+                endpoint._class_descriptor = DescriptorNode(parser, position)
+        elif desc_type == CS_INTERFACE:
+            # Descriptors shorter than 4 bytes carry no ID or index
+            entity_id = data[offset + 3] if length > 3 else None
+            node = _link_class_descriptor(parser, position, entity_id, sub_type, interface_type,
+                                          alternate_setting, video_format)
+            if isinstance(node, FormatNode):
+                video_format = node
+    return configuration
+
+
+def _link_class_descriptor(parser, position, entity_id, sub_type, interface_type, alternate_setting, video_format):
+    '''Attach a class specific interface descriptor to its alternate setting or format'''
+    if entity_id is None:
+        # Only listed with the class specific descriptors of the alternate setting
+        node = DescriptorNode(parser, position)
+    elif sub_type in VS_FORMAT_SUB_TYPES and interface_type == SC_VIDEOSTREAMING:
+        node = FormatNode(parser, position, sub_type)
+        alternate_setting._formats[entity_id] = node
+        alternate_setting._formats_by_sub_type.setdefault(sub_type, []).append(node)
+    else:
+        node = DescriptorNode(parser, position)
+        if sub_type == VC_HEADER:
+            # VC_HEADER and VS_INPUT_HEADER share the same sub type
+            alternate_setting._header = node
+        elif interface_type == SC_VIDEOCONTROL and sub_type in VC_TERMINAL_SUB_TYPES:
+            alternate_setting._terminals[entity_id] = node
+        elif interface_type == SC_VIDEOCONTROL and sub_type in VC_UNIT_SUB_TYPES:
+            alternate_setting._units[entity_id] = node
+        elif interface_type == SC_VIDEOSTREAMING and sub_type == VS_OUTPUT_HEADER:
+            alternate_setting._header = node
+        elif video_format is not None and sub_type in VS_FRAME_SUB_TYPES:
+            video_format._frames[entity_id] = node
+        elif video_format is not None and sub_type == VS_STILL_IMAGE_FRAME:
+            video_format._still_image_frame = node
+        elif video_format is not None and sub_type == VS_COLORFORMAT:
+            video_format._color_matching = node
+    alternate_setting._class_descriptors.append(node)
+    return node
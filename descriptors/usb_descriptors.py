@@ -1,10 +1,37 @@
 '''This module contains classes representing standard USB descriptors'''
+import functools
+import struct
+
+
+@functools.lru_cache(maxsize=None)
+def array_layout(type_code, count):
+    '''Cached little-endian struct for an array of count fields of the given type code'''
+    return struct.Struct(f'<{count}{type_code}')
+
+
+def decode_bitmap(bitmap, members):
+    '''Integer mask of a little-endian bitmap and the frozenset of enum members whose bit is set'''
+    mask = int.from_bytes(bitmap, 'little')
+    return mask, frozenset(member for member in members if (mask >> member) & 0x01)
 
 
 class Descriptor:
+    '''Base class for descriptors, holds a zero-copy view of the descriptor bytes'''
+
+    # Fixed part of the descriptor, decoded with a single unpack_from call
+    LAYOUT = struct.Struct('<BB')
+    FIELDS = ('_length', '_descriptor_type')
+    __slots__ = ('_data',) + FIELDS
+
     def __init__(self, data):
-        self._length = data[0]
-        self._descriptor_type = data[1]
+        self._data = memoryview(data)
+        for field, value in zip(self.FIELDS, self.LAYOUT.unpack_from(self._data)):
+            setattr(self, field, value)
+
+    @property
+    def raw(self):
+        '''View of the raw bytes of this descriptor'''
+        return self._data
 
     @property
     def bLength(self):
@@ -20,25 +47,18 @@ class Descriptor:
 class DeviceDescriptor(Descriptor):
     '''Class representing USB device descriptors'''
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._usb_version = data[2:4]
-        self._device_class = data[4]
-        self._device_sub_class = data[5]
-        self._device_protocol = data[6]
-        self._max_packet_size = data[7]
-        self._vid = data[8:10]
-        self._pid = data[10:12]
-        self._device_release_code = data[12:14]
-        self._mid_str_index = data[14]
-        self._product_name_index = data[15]
-        self._serial_number = data[16]
-        self._num_configs = data[17]
+    LAYOUT = struct.Struct('<BBHBBBBHHHBBBB')
+    FIELDS = Descriptor.FIELDS + (
+        '_usb_version', '_device_class', '_device_sub_class', '_device_protocol',
+        '_max_packet_size', '_vid', '_pid', '_device_release_code', '_mid_str_index',
+        '_product_name_index', '_serial_number', '_num_configs'
+    )
+    __slots__ = FIELDS[len(Descriptor.FIELDS):]
     
     @property
     def bcdUSB(self):
         '''USB Specification version'''
-        self._usb_version
+        return self._usb_version
     
     @property
     def bDeviceClass(self):
@@ -94,14 +114,12 @@ class DeviceDescriptor(Descriptor):
 class ConfigurationDescriptor(Descriptor):
     '''Class representing USB configuration descriptor'''
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._total_descriptor_length = data[2:4]
-        self._num_interfaces = data[4]
-        self._config_index = data[5]
-        self._configuration_descriptor_index = data[6]
-        self._power_capability = data[7]
-        self._max_power = data[8]
+    LAYOUT = struct.Struct('<BBHBBBBB')
+    FIELDS = Descriptor.FIELDS + (
+        '_total_descriptor_length', '_num_interfaces', '_config_index',
+        '_configuration_descriptor_index', '_power_capability', '_max_power'
+    )
+    __slots__ = FIELDS[len(Descriptor.FIELDS):]
     
     @property
     def wTotalLength(self):
@@ -111,7 +129,7 @@ class ConfigurationDescriptor(Descriptor):
     @property
     def bNumInterfaces(self):
         '''Number of interfaces in this configuration'''
-        return self._num_interface
+        return self._num_interfaces
     
     @property
     def bConfigurationValue(self):
@@ -137,20 +155,17 @@ class ConfigurationDescriptor(Descriptor):
 class InterfaceDescriptor(Descriptor):
     '''Class representing the standard usb interface'''
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._interface_number = data[2]
-        self._alternate_setting = data[3]
-        self._num_endpoints = data[4]
-        self._interface_class = data[5]
-        self._interface_sub_class = data[6]
-        self._interface_protocol = data[7]
-        self._interface_descriptor_index = data[8]
+    LAYOUT = struct.Struct('<BBBBBBBBB')
+    FIELDS = Descriptor.FIELDS + (
+        '_interface_number', '_alternate_setting', '_num_endpoints', '_interface_class',
+        '_interface_sub_class', '_interface_protocol', '_interface_descriptor_index'
+    )
+    __slots__ = FIELDS[len(Descriptor.FIELDS):]
     
     @property
     def bInterfaceNumber(self):
         '''Index of interface in array of all interfaces supported by this configuration'''
-        self._interface_number
+        return self._interface_number
     
     @property
     def bAlternateSetting(self):
@@ -186,14 +201,12 @@ class InterfaceDescriptor(Descriptor):
 class InterfaceAssociationDescriptor(Descriptor):
     '''Class representing the interface association descriptor for a given interface'''
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._first_interface = data[2]
-        self._interface_count = data[3]
-        self._function_class = data[4]
-        self._function_sub_class = data[5]
-        self._function_protocol = data[6]
-        self._function_descriptor_index = data[7]
+    LAYOUT = struct.Struct('<BBBBBBBB')
+    FIELDS = Descriptor.FIELDS + (
+        '_first_interface', '_interface_count', '_function_class', '_function_sub_class',
+        '_function_protocol', '_function_descriptor_index'
+    )
+    __slots__ = FIELDS[len(Descriptor.FIELDS):]
     
     @property
     def bFirstInterface(self):
@@ -229,11 +242,9 @@ class InterfaceAssociationDescriptor(Descriptor):
 class EndpointDescriptor(Descriptor):
     '''Class representing endpoint descriptors'''
 
-    def __init__(self, data):
-        self._endpoint_address = data[2]
-        self._attributes = data[3]
-        self._packet_size = data[4:6]
-        self._interval = data[6]
+    LAYOUT = struct.Struct('<BBBBHB')
+    FIELDS = Descriptor.FIELDS + ('_endpoint_address', '_attributes', '_packet_size', '_interval')
+    __slots__ = FIELDS[len(Descriptor.FIELDS):]
     
     @property
     def bEndpointAddress(self):
@@ -1,5 +1,6 @@
 import enum
-from .usb_descriptors import Descriptor
+import struct
+from .usb_descriptors import Descriptor, array_layout, decode_bitmap
 
 '''Module containing classes representing usb class-specific video control interface descriptors'''
 
@@ -7,9 +8,9 @@ from .usb_descriptors import Descriptor
 class VideoControlInterfaceDescriptor(Descriptor):
     '''Class representing a component in the video control interface descriptor'''
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._sub_type = data[2]
+    LAYOUT = struct.Struct('<BBB')
+    FIELDS = Descriptor.FIELDS + ('_sub_type',)
+    __slots__ = FIELDS[len(Descriptor.FIELDS):]
     
     @property
     def bDescriptorSubType(self):
@@ -19,9 +20,9 @@ class VideoControlInterfaceDescriptor(Descriptor):
 class VideoControlEndpointDescriptor(VideoControlInterfaceDescriptor):
     '''Class representing an endpoint descriptor for a video control interface'''
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._max_transfer_size = data[3:5]
+    LAYOUT = struct.Struct('<BBBH')
+    FIELDS = VideoControlInterfaceDescriptor.FIELDS + ('_max_transfer_size',)
+    __slots__ = FIELDS[len(VideoControlInterfaceDescriptor.FIELDS):]
     
     @property
     def wMaxTransferSize(self):
@@ -32,13 +33,18 @@ class VideoControlEndpointDescriptor(VideoControlInterfaceDescriptor):
 class VCInterfaceHeaderDescriptor(VideoControlInterfaceDescriptor):
     '''Class representing header descriptor for a video control interface'''
 
+    LAYOUT = struct.Struct('<BBBHHIB')
+    FIELDS = VideoControlInterfaceDescriptor.FIELDS + (
+        '_uvc_spec', '_total_length', '_clock_freq', '_num_streaming_interfaces'
+    )
+    __slots__ = FIELDS[len(VideoControlInterfaceDescriptor.FIELDS):] + (
+        '_streaming_interface_index',
+    )
+
     def __init__(self, data):
         super().__init__(data)
-        self._uvc_spec = data[3:5]
-        self._total_length = data[5:7]
-        self._clock_freq = data[7:11]
-        self._num_streaming_interfaces = data[11]
-        self._streaming_interface_index = data[12:]
+        layout = array_layout('B', self._num_streaming_interfaces)
+        self._streaming_interface_index = layout.unpack_from(self._data, self.LAYOUT.size)
     
     @property
     def bcdUVC(self):
@@ -69,11 +75,11 @@ class VCInterfaceHeaderDescriptor(VideoControlInterfaceDescriptor):
 class VCTerminalDescriptor(VideoControlInterfaceDescriptor):
     '''Class representing a terminal descriptor in the video-control interface'''
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._terminal_id = data[3]
-        self._terminal_type = data[4:6]
-        self._associated_terminal = data[6]
+    LAYOUT = struct.Struct('<BBBBHB')
+    FIELDS = VideoControlInterfaceDescriptor.FIELDS + (
+        '_terminal_id', '_terminal_type', '_associated_terminal'
+    )
+    __slots__ = FIELDS[len(VideoControlInterfaceDescriptor.FIELDS):]
 
     @property
     def bTerminalID(self):
@@ -88,7 +94,7 @@ class VCTerminalDescriptor(VideoControlInterfaceDescriptor):
     @property
     def bAssocTerminal(self):
         '''Terminal associated with this terminal (zero if none)'''
-        return self._output_terminal
+        return self._associated_terminal
 
 
 class VCInputTerminalDescriptor(VCTerminalDescriptor):
@@ -97,9 +103,9 @@ class VCInputTerminalDescriptor(VCTerminalDescriptor):
     # Length of the descriptor with no optional fields in bytes
     BASE_LEN = 8
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._terminal_descriptor_index = data[7]
+    LAYOUT = struct.Struct('<BBBBHBB')
+    FIELDS = VCTerminalDescriptor.FIELDS + ('_terminal_descriptor_index',)
+    __slots__ = FIELDS[len(VCTerminalDescriptor.FIELDS):]
     
     @property
     def iTerminal(self):
@@ -113,10 +119,9 @@ class VCOutputTerminalDescriptor(VCTerminalDescriptor):
     # Length of the descriptor with no optional fields in bytes
     BASE_LEN = 9
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._source_id = data[7]
-        self._terminal_descriptor_index = data[8]
+    LAYOUT = struct.Struct('<BBBBHBBB')
+    FIELDS = VCTerminalDescriptor.FIELDS + ('_source_id', '_terminal_descriptor_index')
+    __slots__ = FIELDS[len(VCTerminalDescriptor.FIELDS):]
     
     @property
     def bSourceID(self):
@@ -154,20 +159,33 @@ class CameraTerminalDescriptor(VCInputTerminalDescriptor):
         WINDOW = 20
         REGION_OF_INTEREST = 21
 
+    LAYOUT = struct.Struct('<BBBBHBBHHHB')
+    FIELDS = VCInputTerminalDescriptor.FIELDS + (
+        '_obj_focal_length_min', '_obj_focal_length_max', '_ocular_focal_length', '_control_size'
+    )
+    __slots__ = FIELDS[len(VCInputTerminalDescriptor.FIELDS):] + (
+        '_controls', '_controls_mask', '_supported_controls'
+    )
+
     def __init__(self, data):
         super().__init__(data)
-        self._obj_focal_length_min = data[8:10]
-        self._obj_focal_length_max = data[10:12]
-        self._ocular_focal_length = data[12:14]
-        self._control_size = data[14]
-        self._controls = data[15: 15 + int(self._control_size)]
+        self._controls = self._data[15:15 + self._control_size]
+        self._controls_mask, self._supported_controls = decode_bitmap(self._controls, self.CameraControls)
     
     def check_control_supported(self, control_id):
         '''Check if camera control is supported'''
-        ctrl_int = 0
-        for byte_index in range(self._control_size):
-            ctrl_int |= (self._controls[byte_index] << (byte_index * 8))
-        return bool((ctrl_int >> control_id) & 0x01)
+        return bool((self._controls_mask >> control_id) & 0x01)
+
+    def supported_controls(self, control_ids=None):
+        '''Subset of the given camera controls that are supported (all supported controls if None)'''
+        if control_ids is None:
+            return self._supported_controls
+        return self._supported_controls.intersection(control_ids)
+
+    @property
+    def controls_mask(self):
+        '''Camera controls bitmap as an integer'''
+        return self._controls_mask
     
     @property
     def wObjectiveFocalLengthMin(self):
@@ -198,8 +216,9 @@ class CameraTerminalDescriptor(VCInputTerminalDescriptor):
 class VCUnitDescriptor(VideoControlInterfaceDescriptor):
     '''Class representing a video control unit descriptor'''
 
-    def __init__(self, data):
-        self._unit_id = data[3]
+    LAYOUT = struct.Struct('<BBBB')
+    FIELDS = VideoControlInterfaceDescriptor.FIELDS + ('_unit_id',)
+    __slots__ = FIELDS[len(VideoControlInterfaceDescriptor.FIELDS):]
 
     @property
     def bUnitID(self):
@@ -210,10 +229,16 @@ class VCUnitDescriptor(VideoControlInterfaceDescriptor):
 class SelectorUnitDescriptor(VCUnitDescriptor):
     '''Class representing a selector unit descriptor'''
 
+    LAYOUT = struct.Struct('<BBBBB')
+    FIELDS = VCUnitDescriptor.FIELDS + ('_num_input_pins',)
+    __slots__ = FIELDS[len(VCUnitDescriptor.FIELDS):] + (
+        '_pin_addrs', '_selector_unit_descriptor_index'
+    )
+
     def __init__(self, data):
-        self._num_input_pins = data[4]
-        self._pin_addrs = data[5:5 + int(self._num_input_pins)]
-        self._selector_unit_descriptor_index = data[5 + int(self._num_input_pins)]
+        super().__init__(data)
+        self._pin_addrs = array_layout('B', self._num_input_pins).unpack_from(self._data, 5)
+        self._selector_unit_descriptor_index = self._data[5 + self._num_input_pins]
     
     @property
     def bNrInPins(self):
@@ -263,23 +288,32 @@ class ProcessingUnitDescriptor(VCUnitDescriptor):
         NTSC_2 = 4
         PAL_2 = 5
 
+    LAYOUT = struct.Struct('<BBBBBHB')
+    FIELDS = VCUnitDescriptor.FIELDS + ('_source_id', '_max_multiplier', '_control_size')
+    __slots__ = FIELDS[len(VCUnitDescriptor.FIELDS):] + (
+        '_controls', '_processing_unit_descriptor_index', '_video_standards', '_controls_mask',
+        '_supported_controls'
+    )
+
     def __init__(self, data):
-        self._source_id = data[4]
-        self._max_multiplier = data[5:7]
-        self._control_size = data[7]
-        self._controls = data[8:(8 + int(self._control_size))]
-        self._processing_unit_descriptor_index = data[8 + int(self._control_size)]
+        super().__init__(data)
+        self._controls = self._data[8:8 + self._control_size]
+        self._controls_mask, self._supported_controls = decode_bitmap(self._controls, self.ProcessorControls)
+        self._processing_unit_descriptor_index = self._data[8 + self._control_size]
         try:
-            self._video_standards = data[8 + int(self._control_size) + 1]
+            self._video_standards = self._data[8 + self._control_size + 1]
         except IndexError:
             self._video_standards = 0
     
     def check_control_supported(self, control_id):
         '''Check if control id is supported by processing unit'''
-        ctrl_int = 0
-        for byte_index in range(self._control_size):
-            ctrl_int |= (self._controls[byte_index] << (byte_index * 8))
-        return bool((ctrl_int >> control_id) & 0x01)
+        return bool((self._controls_mask >> control_id) & 0x01)
+
+    def supported_controls(self, control_ids=None):
+        '''Subset of the given processor controls that are supported (all supported controls if None)'''
+        if control_ids is None:
+            return self._supported_controls
+        return self._supported_controls.intersection(control_ids)
 
     def check_analog_standard_supported(self, analog_standard_id):
         '''Check if analog standard is supported by processing unit'''
@@ -304,6 +338,11 @@ class ProcessingUnitDescriptor(VCUnitDescriptor):
     def bmControls(self):
         '''Bitmap describing the supported controls for this processing unit'''
         return self._controls
+
+    @property
+    def controls_mask(self):
+        '''Processor controls bitmap as an integer'''
+        return self._controls_mask
     
     @property
     def iProcessing(self):
@@ -341,24 +380,42 @@ class EncodingUnitDescriptor(VCUnitDescriptor):
         START_STOP_LAYER = 18
         ERROR_RESILIENCY = 19
 
+    LAYOUT = struct.Struct('<BBBBBBB')
+    FIELDS = VCUnitDescriptor.FIELDS + (
+        '_source_id', '_encoding_unit_descriptor_index', '_control_size'
+    )
+    __slots__ = FIELDS[len(VCUnitDescriptor.FIELDS):] + (
+        '_controls', '_controls_runtime', '_controls_mask', '_supported_controls',
+        '_controls_runtime_mask', '_supported_runtime_controls'
+    )
+
     def __init__(self, data):
         super().__init__(data)
-        self._source_id = data[4]
-        self._encoding_unit_descriptor_index = data[5]
-        self._control_size = data[6]
-        self._controls = data[6:6 + int(self._control_size)]
-        self._controls_runtime = data[6 + int(self._control_size):6 + (2 * int(self._control_size))]
+        self._controls = self._data[7:7 + self._control_size]
+        self._controls_runtime = self._data[7 + self._control_size:7 + 2 * self._control_size]
+        self._controls_mask, self._supported_controls = decode_bitmap(self._controls, self.EncoderControls)
+        self._controls_runtime_mask, self._supported_runtime_controls = decode_bitmap(
+            self._controls_runtime, self.EncoderControls)
     
     def check_control_supported(self, control_id):
         '''Check if control is supported by this encoder unit'''
-        ctrl_int = 0
-        for byte_index in range(self._control_size):
-            ctrl_int |= (self._controls[byte_index] << (byte_index * 8))
-        return bool((ctrl_int >> control_id) & 0x01)
+        return bool((self._controls_mask >> control_id) & 0x01)
     
     def check_control_runtime_supported(self, control_id):
         '''Check if control is supported during run time'''
-        return bool((self._controls_runtime >> control_id) & 0x01)
+        return bool((self._controls_runtime_mask >> control_id) & 0x01)
+
+    def supported_controls(self, control_ids=None):
+        '''Subset of the given encoder controls that are supported (all supported controls if None)'''
+        if control_ids is None:
+            return self._supported_controls
+        return self._supported_controls.intersection(control_ids)
+
+    def supported_runtime_controls(self, control_ids=None):
+        '''Subset of the given encoder controls that are supported at run time (all if None)'''
+        if control_ids is None:
+            return self._supported_runtime_controls
+        return self._supported_runtime_controls.intersection(control_ids)
     
     @property
     def bSourceID(self):
@@ -385,19 +442,33 @@ class EncodingUnitDescriptor(VCUnitDescriptor):
         '''Bitmap representing set of controls supported by this encoder unit at runtime'''
         return self._controls_runtime
 
+    @property
+    def controls_mask(self):
+        '''Encoder controls bitmap as an integer'''
+        return self._controls_mask
+
+    @property
+    def controls_runtime_mask(self):
+        '''Encoder runtime controls bitmap as an integer'''
+        return self._controls_runtime_mask
+
 
 class ExtensionUnitDescriptor(VCUnitDescriptor):
     '''Class representing the extension unit descriptor'''
 
+    LAYOUT = struct.Struct('<BBBB16sBB')
+    FIELDS = VCUnitDescriptor.FIELDS + ('_extension_code', '_num_controls', '_num_input_pins')
+    __slots__ = FIELDS[len(VCUnitDescriptor.FIELDS):] + (
+        '_pin_addrs', '_control_size', '_controls', '_extension_unit_descriptor_index'
+    )
+
     def __init__(self, data):
         super().__init__(data)
-        self._extension_code = data[4 : 20]
-        self._num_controls = data[20]
-        self._num_input_pins = data[21]
-        self._pin_addrs = data[22:22 + int(self._num_input_pins)]
-        self._control_size = data[22 + int(self._num_input_pins)]
-        self._controls = data[23 + int(self._num_input_pins): 23 + int(self._num_input_pins) + int(self._control_size)]
-        self._extension_unit_descriptor_index = data[23 + int(self._num_input_pins) + int(self._control_size)]
+        controls_offset = 23 + self._num_input_pins
+        self._pin_addrs = array_layout('B', self._num_input_pins).unpack_from(self._data, 22)
+        self._control_size = self._data[22 + self._num_input_pins]
+        self._controls = self._data[controls_offset:controls_offset + self._control_size]
+        self._extension_unit_descriptor_index = self._data[controls_offset + self._control_size]
     
     @property
     def guidExtensionCode(self):
@@ -429,11 +500,16 @@ class ExtensionUnitDescriptor(VCUnitDescriptor):
         '''Bitmap representing the set of controls supported by the extension unit'''
         return self._controls
 
+    @property
+    def iExtension(self):
+        '''Index of the string descriptor describing this extension unit'''
+        return self._extension_unit_descriptor_index
+
 class VCInterruptEndpointDescriptor(VideoControlInterfaceDescriptor):
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._max_transfer_size = data[3:5]
+    LAYOUT = struct.Struct('<BBBH')
+    FIELDS = VideoControlInterfaceDescriptor.FIELDS + ('_max_transfer_size',)
+    __slots__ = FIELDS[len(VideoControlInterfaceDescriptor.FIELDS):]
     
     @property
     def wMaxTransferSize(self):
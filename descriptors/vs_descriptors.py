@@ -1,14 +1,15 @@
 '''This module contains classes modeling descriptors for the video-streaming interface'''
 import enum
-from .usb_descriptors import Descriptor
+import struct
+from .usb_descriptors import Descriptor, array_layout, decode_bitmap
 
 
 class VideoStreamingInterfaceDescriptor(Descriptor):
     '''Class representing a component in the video streaming interface descriptor'''
     
-    def __init__(self, data):
-        super().__init__(data)
-        self._descriptor_sub_type = data[2]
+    LAYOUT = struct.Struct('<BBB')
+    FIELDS = Descriptor.FIELDS + ('_descriptor_sub_type',)
+    __slots__ = FIELDS[len(Descriptor.FIELDS):]
     
     @property
     def bDescriptorSubType(self):
@@ -28,28 +29,37 @@ class VSHeaderDescriptor(VideoStreamingInterfaceDescriptor):
         GENERATE_KEY_FRAME = 4
         UPDATE_FRAME_SEGMENT = 5
 
+    LAYOUT = struct.Struct('<BBBBHBBBBBBB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_num_formats', '_total_length', '_endpoint_addr', '_info', '_terminal_link',
+        '_still_capture_method', '_trigger_support', '_trigger_usage', '_control_size'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):] + (
+        '_controls', '_controls_masks', '_supported_controls'
+    )
+
     def __init__(self, data):
         super().__init__(data)
-        self._num_formats = data[3]
-        self._total_length = data[4:6]
-        self._endpoint_addr = data[6]
-        self._info = data[7]
-        self._terminal_link = data[8]
-        self._still_capture_method = data[9]
-        self._trigger_support = data[10]
-        self._trigger_usage = data[11]
-        self._control_size = data[12]
         self._controls = []
+        self._controls_masks = []
+        self._supported_controls = []
         for format_index in range(self._num_formats):
-            self._controls.append(data[13 + format_index * self._control_size : 13 + (format_index + 1) * self._control_size])
+            controls_offset = 13 + format_index * self._control_size
+            controls = self._data[controls_offset:controls_offset + self._control_size]
+            mask, supported = decode_bitmap(controls, self.FrameControls)
+            self._controls.append(controls)
+            self._controls_masks.append(mask)
+            self._supported_controls.append(supported)
 
     def check_control_supported(self, control_id, frame_format):
         '''Check if control is supported by this encoder unit'''
-        controls = self._controls[frame_format]
-        cmd_int = 0
-        for byte_index in range(self._control_size):
-            cmd_int |= controls[byte_index] << (8 * byte_index)
-        return bool((cmd_int >> control_id) & 0x01)
+        return bool((self._controls_masks[frame_format] >> control_id) & 0x01)
+
+    def supported_controls(self, frame_format, control_ids=None):
+        '''Subset of the given frame controls supported for a format (all supported controls if None)'''
+        if control_ids is None:
+            return self._supported_controls[frame_format]
+        return self._supported_controls[frame_format].intersection(control_ids)
 
     @property
     def bNumFormats(self):
@@ -94,25 +104,28 @@ class VSHeaderDescriptor(VideoStreamingInterfaceDescriptor):
     @property
     def bControlSize(self):
         '''Size of the bitmal defining video interface controls'''
+        return self._control_size
     
     @property
     def bmaControls(self):
         '''Controls for each type of frame format supported'''
         return self._controls
 
+    @property
+    def controls_masks(self):
+        '''Controls bitmap of each format as an integer'''
+        return self._controls_masks
+
 class UncompressedVideoFormatDescriptor(VideoStreamingInterfaceDescriptor):
     '''Class representing uncompressed video format descriptor'''
 
-    def __init__(self, data):
-        self._format_index = data[3]
-        self._num_frame_descriptors = data[4]
-        self._format_guid = data[5:21]
-        self._bits_per_pixel = data[21]
-        self._default_frame_index = data[22]
-        self._aspect_ratio_x = data[23]
-        self._aspect_ratio_y = data[24]
-        self._interlace_flags = data[25]
-        self._copy_protect = data[26]
+    LAYOUT = struct.Struct('<BBBBB16sBBBBBB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_format_index', '_num_frame_descriptors', '_format_guid', '_bits_per_pixel',
+        '_default_frame_index', '_aspect_ratio_x', '_aspect_ratio_y', '_interlace_flags',
+        '_copy_protect'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):]
     
     @property
     def bFormatIndex(self):
@@ -162,15 +175,12 @@ class UncompressedVideoFormatDescriptor(VideoStreamingInterfaceDescriptor):
 class MJPEGVideoFormatDescriptor(VideoStreamingInterfaceDescriptor):
     '''Class representing MJPEG video format descriptor'''
 
-    def __init__(self, data):
-        self._format_index = data[3]
-        self._num_frame_descriptors = data[4]
-        self._flags = data[5]
-        self._default_frame_index = data[6]
-        self._aspect_ratio_x = data[7]
-        self._aspect_ratio_y = data[8]
-        self._interlace_flags = data[9]
-        self._copy_protect = data[10]
+    LAYOUT = struct.Struct('<BBBBBBBBBBB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_format_index', '_num_frame_descriptors', '_flags', '_default_frame_index',
+        '_aspect_ratio_x', '_aspect_ratio_y', '_interlace_flags', '_copy_protect'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):]
     
     @property
     def bFormatIndex(self):
@@ -181,6 +191,11 @@ class MJPEGVideoFormatDescriptor(VideoStreamingInterfaceDescriptor):
     def bNumFrameDescriptors(self):
         '''Number of frame descriptors that follow this one associated with this format'''
         return self._num_frame_descriptors
+
+    @property
+    def bmFlags(self):
+        '''Characteristics of this format (fixed size samples)'''
+        return self._flags
     
     @property
     def bDefaultFrameIndex(self):
@@ -211,28 +226,31 @@ class MJPEGVideoFormatDescriptor(VideoStreamingInterfaceDescriptor):
 class VideoFrameDescriptor(VideoStreamingInterfaceDescriptor):
     '''Class representing uncompressed video frame descriptor'''
 
+    LAYOUT = struct.Struct('<BBBBBHHIIIIB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_frame_index', '_capabilities', '_width', '_height', '_min_bit_rate', '_max_bit_rate',
+        '_max_video_frame_buff_size', '_default_frame_interval', '_frame_interval_type'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):] + (
+        '_min_frame_interval', '_max_frame_interval', '_frame_interval_step', '_frame_interval'
+    )
+
+    # Layout of the continuous frame interval range (min, max, step)
+    CONTINUOUS_INTERVAL_LAYOUT = struct.Struct('<III')
+
     def __init__(self, data):
-        self._frame_index = data[3]
-        self._capabilities = data[4]
-        self._width = data[5:7]
-        self._height = data[7:9]
-        self._min_bit_rate = data[9:13]
-        self._max_bit_rate = data[13:17]
-        self._max_video_frame_buff_size = data[21:25]
-        self._default_frame_interval = data[21:25]
-        self._frame_interval_type = data[25]
+        super().__init__(data)
         self._min_frame_interval = None
         self._max_frame_interval = None
         self._frame_interval_step = None
         self._frame_interval = None
         if self._frame_interval_type == 0:
-            self._min_frame_interval = data[26]
-            self._max_frame_interval = data[27]
-            self._frame_interval_step = data[28]
+            (self._min_frame_interval,
+             self._max_frame_interval,
+             self._frame_interval_step) = self.CONTINUOUS_INTERVAL_LAYOUT.unpack_from(self._data, self.LAYOUT.size)
         else:
-            self._frame_interval = []
-            for interval_index in range(int(self._frame_interval_type)):
-                self._frame_interval.append(data[26 + (interval_index * 4) : 26 + ((interval_index + 1) * 4)])
+            layout = array_layout('I', self._frame_interval_type)
+            self._frame_interval = layout.unpack_from(self._data, self.LAYOUT.size)
         
     @property
     def bFrameIndex(self):
@@ -292,7 +310,7 @@ class VideoFrameDescriptor(VideoStreamingInterfaceDescriptor):
     @property
     def dwFrameIntervalStep(self):
         '''The granularity of frame interval supported'''
-        return self._frame_itnerval_step
+        return self._frame_interval_step
     
     @property
     def dwFrameInterval(self):
@@ -301,11 +319,11 @@ class VideoFrameDescriptor(VideoStreamingInterfaceDescriptor):
 
 class VSColorMatchingDescriptor(VideoStreamingInterfaceDescriptor):
 
-    def __init__(self, data):
-        super().__init__(data)
-        self._color_primaries = data[3]
-        self._taransfer_characteristics = data[4]
-        self._matrix_coefficients = data[5]
+    LAYOUT = struct.Struct('<BBBBBB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_color_primaries', '_taransfer_characteristics', '_matrix_coefficients'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):]
     
     @property
     def bColorPrimaries(self):
@@ -320,4 +338,514 @@ class VSColorMatchingDescriptor(VideoStreamingInterfaceDescriptor):
     @property
     def bMatrixCoefficients(self):
         '''Matrix used to compute luma and chroma values from the color primaries'''
-        return self._matrix_coefficients
\ No newline at end of file
+        return self._matrix_coefficients
+
+
+class VSOutputHeaderDescriptor(VideoStreamingInterfaceDescriptor):
+    '''Class representing a video streaming interface output header component'''
+
+    LAYOUT = struct.Struct('<BBBBHBBB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_num_formats', '_total_length', '_endpoint_addr', '_terminal_link', '_control_size'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):] + ('_controls',)
+
+    def __init__(self, data):
+        super().__init__(data)
+        self._controls = []
+        for format_index in range(self._num_formats):
+            controls_offset = 9 + format_index * self._control_size
+            self._controls.append(self._data[controls_offset:controls_offset + self._control_size])
+
+    @property
+    def bNumFormats(self):
+        '''The number of video formats supported by this video streaming interface'''
+        return self._num_formats
+
+    @property
+    def wTotalLength(self):
+        '''The total length of the class specific descriptors of this interface in bytes'''
+        return self._total_length
+
+    @property
+    def bEndpointAddress(self):
+        '''Address of the isochronous or bulk endpoint used for video data'''
+        return self._endpoint_addr
+
+    @property
+    def bTerminalLink(self):
+        '''The terminal ID of the input terminal that the video endpoint of this interface is connected to'''
+        return self._terminal_link
+
+    @property
+    def bControlSize(self):
+        '''Size of the bitmap defining video interface controls'''
+        return self._control_size
+
+    @property
+    def bmaControls(self):
+        '''Controls for each type of frame format supported'''
+        return self._controls
+
+
+class StillImageFrameDescriptor(VideoStreamingInterfaceDescriptor):
+    '''Class representing the still image frame descriptor of a format'''
+
+    LAYOUT = struct.Struct('<BBBBB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + ('_endpoint_addr', '_num_image_size_patterns')
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):] + (
+        '_image_sizes', '_num_compression_patterns', '_compression'
+    )
+
+    def __init__(self, data):
+        super().__init__(data)
+        sizes = array_layout('H', 2 * self._num_image_size_patterns).unpack_from(self._data, 5)
+        self._image_sizes = tuple(zip(sizes[0::2], sizes[1::2]))
+        compression_offset = 5 + 4 * self._num_image_size_patterns
+        self._num_compression_patterns = self._data[compression_offset]
+        layout = array_layout('B', self._num_compression_patterns)
+        self._compression = layout.unpack_from(self._data, compression_offset + 1)
+
+    @property
+    def bEndpointAddress(self):
+        '''Address of the bulk endpoint used for still image transfer (zero for method 2)'''
+        return self._endpoint_addr
+
+    @property
+    def bNumImageSizePatterns(self):
+        '''Number of still image sizes supported'''
+        return self._num_image_size_patterns
+
+    @property
+    def wImageSizes(self):
+        '''Supported still image sizes as (wWidth, wHeight) pairs'''
+        return self._image_sizes
+
+    @property
+    def bNumCompressionPattern(self):
+        '''Number of compression ratios supported'''
+        return self._num_compression_patterns
+
+    @property
+    def bCompression(self):
+        '''Supported compression ratios'''
+        return self._compression
+
+
+class MPEG2TSFormatDescriptor(VideoStreamingInterfaceDescriptor):
+    '''Class representing MPEG-2 transport stream format descriptor'''
+
+    LAYOUT = struct.Struct('<BBBBBBB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_format_index', '_data_offset', '_packet_length', '_stride_length'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):] + ('_stride_format_guid',)
+
+    def __init__(self, data):
+        super().__init__(data)
+        # The stride format GUID was added in UVC 1.1
+        self._stride_format_guid = bytes(self._data[7:23]) if self._length >= 23 else None
+
+    @property
+    def bFormatIndex(self):
+        '''Index of this format descriptor'''
+        return self._format_index
+
+    @property
+    def bDataOffset(self):
+        '''Offset to TSP packet within MPEG-2 TS transport stride in bytes'''
+        return self._data_offset
+
+    @property
+    def bPacketLength(self):
+        '''Length of TSP packet in bytes'''
+        return self._packet_length
+
+    @property
+    def bStrideLength(self):
+        '''Length of MPEG-2 TS transport stride'''
+        return self._stride_length
+
+    @property
+    def guidStrideFormat(self):
+        '''Globally unique identifier of the MPEG-2 TS stride format (None before UVC 1.1)'''
+        return self._stride_format_guid
+
+
+class DVFormatDescriptor(VideoStreamingInterfaceDescriptor):
+    '''Class representing DV format descriptor'''
+
+    LAYOUT = struct.Struct('<BBBBIB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_format_index', '_max_video_frame_buff_size', '_format_type'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):]
+
+    @property
+    def bFormatIndex(self):
+        '''Index of this format descriptor'''
+        return self._format_index
+
+    @property
+    def dwMaxVideoFrameBufferSize(self):
+        '''Maximum number of bytes in a video frame'''
+        return self._max_video_frame_buff_size
+
+    @property
+    def bFormatType(self):
+        '''Format type of the DV stream (SD-DV, SDL-DV, HD-DV) and 50/60 Hz flag'''
+        return self._format_type
+
+
+class FrameBasedFormatDescriptor(UncompressedVideoFormatDescriptor):
+    '''Class representing frame based payload video format descriptor'''
+
+    LAYOUT = struct.Struct('<BBBBB16sBBBBBBB')
+    FIELDS = UncompressedVideoFormatDescriptor.FIELDS + ('_variable_size',)
+    __slots__ = FIELDS[len(UncompressedVideoFormatDescriptor.FIELDS):]
+
+    @property
+    def bVariableSize(self):
+        '''Whether the data within the frame is of variable length from frame to frame'''
+        return self._variable_size
+
+
+class FrameBasedFrameDescriptor(VideoFrameDescriptor):
+    '''Class representing frame based payload video frame descriptor'''
+
+    LAYOUT = struct.Struct('<BBBBBHHIIIBI')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_frame_index', '_capabilities', '_width', '_height', '_min_bit_rate', '_max_bit_rate',
+        '_default_frame_interval', '_frame_interval_type', '_bytes_per_line'
+    )
+    __slots__ = ('_bytes_per_line',)
+
+    def __init__(self, data):
+        super().__init__(data)
+        # Frame based formats negotiate the frame buffer size through probe / commit
+        self._max_video_frame_buff_size = None
+
+    @property
+    def dwBytesPerLine(self):
+        '''Number of bytes per line of video for packed fixed frame size formats (zero otherwise)'''
+        return self._bytes_per_line
+
+
+class StreamBasedFormatDescriptor(VideoStreamingInterfaceDescriptor):
+    '''Class representing stream based payload format descriptor'''
+
+    LAYOUT = struct.Struct('<BBBB16sI')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + ('_format_index', '_format_guid', '_packet_length')
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):]
+
+    @property
+    def bFormatIndex(self):
+        '''Index of this format descriptor'''
+        return self._format_index
+
+    @property
+    def guidFormat(self):
+        '''Globally unique identifier used to identify stream-encoding format'''
+        return self._format_guid
+
+    @property
+    def dwPacketLength(self):
+        '''Size of the format specific packet in bytes (zero if not applicable)'''
+        return self._packet_length
+
+
+class H264VideoFormatDescriptor(VideoStreamingInterfaceDescriptor):
+    '''Class representing H.264 payload video format descriptor (also used for simulcast)'''
+
+    LAYOUT = struct.Struct('<BBBBBBBBBBBB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_format_index', '_num_frame_descriptors', '_default_frame_index', '_max_codec_config_delay',
+        '_supported_slice_modes', '_supported_sync_frame_types', '_resolution_scaling', '_reserved',
+        '_supported_rate_control_modes'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):] + ('_max_mb_per_sec',)
+
+    # Number of wMaxMBperSec fields following bmSupportedRateControlModes
+    MAX_MB_PER_SEC_COUNT = 20
+
+    def __init__(self, data):
+        super().__init__(data)
+        layout = array_layout('H', self.MAX_MB_PER_SEC_COUNT)
+        self._max_mb_per_sec = layout.unpack_from(self._data, self.LAYOUT.size)
+
+    @property
+    def bFormatIndex(self):
+        '''Index of this format descriptor'''
+        return self._format_index
+
+    @property
+    def bNumFrameDescriptors(self):
+        '''Number of frame descriptors that follow this one associated with this format'''
+        return self._num_frame_descriptors
+
+    @property
+    def bDefaultFrameIndex(self):
+        '''Optimum frame index for this stream (used to select resolution)'''
+        return self._default_frame_index
+
+    @property
+    def bMaxCodecConfigDelay(self):
+        '''Maximum number of frames the encoder takes to respond to a configuration change'''
+        return self._max_codec_config_delay
+
+    @property
+    def bmSupportedSliceModes(self):
+        '''Bitmap of the supported slice modes'''
+        return self._supported_slice_modes
+
+    @property
+    def bmSupportedSyncFrameTypes(self):
+        '''Bitmap of the supported sync frame types'''
+        return self._supported_sync_frame_types
+
+    @property
+    def bResolutionScaling(self):
+        '''Resolution scaling capabilities of the encoder'''
+        return self._resolution_scaling
+
+    @property
+    def bmSupportedRateControlModes(self):
+        '''Bitmap of the supported rate control modes'''
+        return self._supported_rate_control_modes
+
+    @property
+    def wMaxMBperSec(self):
+        '''Maximum macroblocks per second for each resolution count and scalability mode (20 values)'''
+        return self._max_mb_per_sec
+
+
+class H264VideoFrameDescriptor(VideoStreamingInterfaceDescriptor):
+    '''Class representing H.264 payload video frame descriptor'''
+
+    LAYOUT = struct.Struct('<BBBBHHHHHBHIHIIIIIB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_frame_index', '_width', '_height', '_sar_width', '_sar_height', '_profile', '_level_idc',
+        '_constrained_toolset', '_supported_usages', '_capabilities', '_svc_capabilities',
+        '_mvc_capabilities', '_min_bit_rate', '_max_bit_rate', '_default_frame_interval',
+        '_num_frame_intervals'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):] + ('_frame_interval',)
+
+    def __init__(self, data):
+        super().__init__(data)
+        layout = array_layout('I', self._num_frame_intervals)
+        self._frame_interval = layout.unpack_from(self._data, self.LAYOUT.size)
+
+    @property
+    def bFrameIndex(self):
+        '''Index of frame descriptor in array of frame descriptors of the same format'''
+        return self._frame_index
+
+    @property
+    def wWidth(self):
+        '''Width of the decoded frame in pixels'''
+        return self._width
+
+    @property
+    def wHeight(self):
+        '''Height of the decoded frame in pixels'''
+        return self._height
+
+    @property
+    def wSARwidth(self):
+        '''Sample aspect ratio width'''
+        return self._sar_width
+
+    @property
+    def wSARheight(self):
+        '''Sample aspect ratio height'''
+        return self._sar_height
+
+    @property
+    def wProfile(self):
+        '''H.264 profile (profile_idc and constraint flags)'''
+        return self._profile
+
+    @property
+    def bLevelIDC(self):
+        '''H.264 level_idc'''
+        return self._level_idc
+
+    @property
+    def wConstrainedToolset(self):
+        '''Reserved for constrained toolsets'''
+        return self._constrained_toolset
+
+    @property
+    def bmSupportedUsages(self):
+        '''Bitmap of the supported usage modes (real time, broadcast, file storage...)'''
+        return self._supported_usages
+
+    @property
+    def bmCapabilities(self):
+        '''Capabilities of this frame type'''
+        return self._capabilities
+
+    @property
+    def bmSVCCapabilities(self):
+        '''Scalable video coding capabilities'''
+        return self._svc_capabilities
+
+    @property
+    def bmMVCCapabilities(self):
+        '''Multiview video coding capabilities'''
+        return self._mvc_capabilities
+
+    @property
+    def dwMinBitRate(self):
+        '''Minimum bit rate in bits per second'''
+        return self._min_bit_rate
+
+    @property
+    def dwMaxBitRate(self):
+        '''Maximum bit rate in bits per second'''
+        return self._max_bit_rate
+
+    @property
+    def dwDefaultFrameInterval(self):
+        '''Specifies the frame interval the device would like to indicate for use as a default'''
+        return self._default_frame_interval
+
+    @property
+    def bNumFrameIntervals(self):
+        '''Number of discrete frame intervals supported'''
+        return self._num_frame_intervals
+
+    @property
+    def dwFrameInterval(self):
+        '''Supported frame intervals'''
+        return self._frame_interval
+
+
+class VP8VideoFormatDescriptor(VideoStreamingInterfaceDescriptor):
+    '''Class representing VP8 payload video format descriptor (also used for simulcast)'''
+
+    LAYOUT = struct.Struct('<BBBBBBBBBBBH')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_format_index', '_num_frame_descriptors', '_default_frame_index', '_max_codec_config_delay',
+        '_supported_partition_count', '_supported_sync_frame_types', '_resolution_scaling',
+        '_supported_rate_control_modes', '_max_mb_per_sec'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):]
+
+    @property
+    def bFormatIndex(self):
+        '''Index of this format descriptor'''
+        return self._format_index
+
+    @property
+    def bNumFrameDescriptors(self):
+        '''Number of frame descriptors that follow this one associated with this format'''
+        return self._num_frame_descriptors
+
+    @property
+    def bDefaultFrameIndex(self):
+        '''Optimum frame index for this stream (used to select resolution)'''
+        return self._default_frame_index
+
+    @property
+    def bMaxCodecConfigDelay(self):
+        '''Maximum number of frames the encoder takes to respond to a configuration change'''
+        return self._max_codec_config_delay
+
+    @property
+    def bSupportedPartitionCount(self):
+        '''Maximum number of DCT partitions supported'''
+        return self._supported_partition_count
+
+    @property
+    def bmSupportedSyncFrameTypes(self):
+        '''Bitmap of the supported sync frame types'''
+        return self._supported_sync_frame_types
+
+    @property
+    def bResolutionScaling(self):
+        '''Resolution scaling capabilities of the encoder'''
+        return self._resolution_scaling
+
+    @property
+    def bmSupportedRateControlModes(self):
+        '''Bitmap of the supported rate control modes'''
+        return self._supported_rate_control_modes
+
+    @property
+    def wMaxMBperSec(self):
+        '''Maximum macroblocks per second'''
+        return self._max_mb_per_sec
+
+
+class VP8VideoFrameDescriptor(VideoStreamingInterfaceDescriptor):
+    '''Class representing VP8 payload video frame descriptor'''
+
+    LAYOUT = struct.Struct('<BBBBHHIHIIIIB')
+    FIELDS = VideoStreamingInterfaceDescriptor.FIELDS + (
+        '_frame_index', '_width', '_height', '_supported_usages', '_capabilities',
+        '_scalability_capabilities', '_min_bit_rate', '_max_bit_rate', '_default_frame_interval',
+        '_num_frame_intervals'
+    )
+    __slots__ = FIELDS[len(VideoStreamingInterfaceDescriptor.FIELDS):] + ('_frame_interval',)
+
+    def __init__(self, data):
+        super().__init__(data)
+        layout = array_layout('I', self._num_frame_intervals)
+        self._frame_interval = layout.unpack_from(self._data, self.LAYOUT.size)
+
+    @property
+    def bFrameIndex(self):
+        '''Index of frame descriptor in array of frame descriptors of the same format'''
+        return self._frame_index
+
+    @property
+    def wWidth(self):
+        '''Width of the decoded frame in pixels'''
+        return self._width
+
+    @property
+    def wHeight(self):
+        '''Height of the decoded frame in pixels'''
+        return self._height
+
+    @property
+    def bmSupportedUsages(self):
+        '''Bitmap of the supported usage modes'''
+        return self._supported_usages
+
+    @property
+    def bmCapabilities(self):
+        '''Capabilities of this frame type'''
+        return self._capabilities
+
+    @property
+    def bmScalabilityCapabilities(self):
+        '''Scalability capabilities of this frame type'''
+        return self._scalability_capabilities
+
+    @property
+    def dwMinBitRate(self):
+        '''Minimum bit rate in bits per second'''
+        return self._min_bit_rate
+
+    @property
+    def dwMaxBitRate(self):
+        '''Maximum bit rate in bits per second'''
+        return self._max_bit_rate
+
+    @property
+    def dwDefaultFrameInterval(self):
+        '''Specifies the frame interval the device would like to indicate for use as a default'''
+        return self._default_frame_interval
+
+    @property
+    def bNumFrameIntervals(self):
+        '''Number of discrete frame intervals supported'''
+        return self._num_frame_intervals
+
+    @property
+    def dwFrameInterval(self):
+        '''Supported frame intervals'''
+        return self._frame_interval
@@ -1,6 +1,6 @@
 import usb
-import struct
 import pickle
+from descriptors import DT_CONFIG, ConfigurationDescriptor
 
 info_file = open('info.txt', 'w+')
 dev = usb.core.find(find_all=True, bDeviceClass=239)
@@ -28,8 +28,7 @@ for intf in interfaces:
 info_file.write(info)
 info_file.close()
 
-desc = usb.control.get_descriptor(cam, 18, 0x02, 0)
-data = struct.unpack(f'<BBHBBBBHHHBBBB', desc)
+config = ConfigurationDescriptor(usb.control.get_descriptor(cam, ConfigurationDescriptor.LAYOUT.size, DT_CONFIG, 0))
 print(usb.control.get_status(cam))
 requestType = usb.util.build_request_type(
     usb.util.CTRL_IN,
@@ -41,7 +40,7 @@ desc_type = 0x02 << 8
 desc = cam.ctrl_transfer(requestType,
                          0x06,
                          wValue = desc_type,
-                         data_or_wLength = data[2],\
+                         data_or_wLength = config.wTotalLength,\
                          wIndex=0)
 
 output_file = open(f'config_desc', 'wb')
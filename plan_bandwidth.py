@@ -0,0 +1,34 @@
+'''Plan camera modes for shared USB buses offline from descriptor dumps
+
+Usage: python plan_bandwidth.py [bus:dump ...] (defaults to eight copies of config_desc on two buses)
+'''
+import pickle
+import sys
+import time
+from descriptors import DescriptorParser
+from streaming.bandwidth import BandwidthPlanner
+
+arguments = sys.argv[1:] or [f'{index % 2}:config_desc' for index in range(8)]
+planner = BandwidthPlanner()
+buses = {}
+for index, argument in enumerate(arguments):
+    bus, path = argument.split(':', 1)
+    with open(path, 'rb') as dump_file:
+        configuration = DescriptorParser(pickle.load(dump_file), lazy=True).configuration
+    name = f'camera{index} ({path})'
+    buses[name] = bus
+    planner.add_camera(name, configuration, bus)
+
+start = time.perf_counter()
+plan = planner.plan()
+elapsed = time.perf_counter() - start
+used = {}
+for name, placement in sorted(plan.items(), key=lambda item: buses[item[0]]):
+    bus = buses[name]
+    used[bus] = used.get(bus, 0) + placement.microframe_bytes
+    mode = placement.mode
+    print(f"bus {bus} {name}: format {mode.bFormatIndex} {mode.wWidth}x{mode.wHeight}@{mode.fps:.1f}, "
+          f"alt {placement.alternate_setting}, {placement.microframe_bytes} B/uframe")
+for bus, total in sorted(used.items()):
+    print(f"bus {bus}: {total}/{planner.budget} bytes per microframe")
+print(f"planned in {elapsed * 1000:.1f} ms")
@@ -0,0 +1,38 @@
+from .payload import HEADER_FID, HEADER_EOF, HEADER_PTS, HEADER_SCR, HEADER_RES, HEADER_STI, HEADER_ERR, HEADER_EOH
+from .payload import PTS_LAYOUT, SCR_LAYOUT, SOF_MASK
+from .payload import Frame
+from .payload import FrameAssembler
+from .payload import parse_payload_header
+from .buffer_pool import FrameBufferPool
+from .reader import StreamReader
+from .engine import TransferEngine
+from .engine import open_libusb
+from .engine import packet_size
+from .loopback import LoopbackContext
+from .loopback import LoopbackDeviceHandle
+from .camera import OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST
+from .camera import EventThread
+from .camera import FrameQueue
+from .camera import Camera
+from .mjpeg import find_jpeg
+from .mjpeg import extract_jpeg
+from .mjpeg import MJPEGDecodePool
+from .negotiation import StreamingControl
+from .negotiation import StreamMode
+from .negotiation import Negotiation
+from .negotiation import StreamNegotiator
+from .negotiation import find_modes
+from .negotiation import select_alternate_setting
+from .capture import CameraStats
+from .capture import CaptureManager
+from .capture import open_cameras
+from .clock import ClockRecovery
+from .clock import clock_frequency
+from .sync import FrameSynchronizer
+from .metrics import Metrics
+from .metrics import Histogram
+from .metrics import rates
+from .recorder import RECORD_FRAMES, RECORD_PAYLOADS
+from .recorder import Recorder
+from .recorder import Recording
+from .replay import ReplayDevice
@@ -0,0 +1,206 @@
+'''This module contains the USB bus bandwidth planner placing several cameras on shared buses
+
+Planning only needs the parsed descriptor trees, so it runs offline on descriptor dumps.
+'''
+import math
+from descriptors.descriptor_constants import *
+from .engine import packet_size
+from .negotiation import (INTERVALS_PER_SECOND, FORMAT_FRAME_SUB_TYPES, TRANSFER_TYPE_MASK, TRANSFER_TYPE_BULK,
+                          TRANSFER_TYPE_ISOCHRONOUS, StreamMode, frame_bandwidth, streaming_interfaces)
+
+# High speed: 8000 microframes per second, at most 80% of a microframe for periodic transfers
+MICROFRAMES_PER_SECOND = 8000
+HS_MICROFRAME_BYTES = 7500
+HS_PERIODIC_BUDGET = HS_MICROFRAME_BYTES * 80 // 100
+
+# Bytes of payload header assumed per service interval
+PAYLOAD_HEADER_SIZE = 12
+
+# Frame rates tried for frames with a continuous frame interval range
+CONTINUOUS_FPS = (120, 90, 60, 50, 30, 25, 20, 15, 10, 5, 1)
+
+
+def pixel_rate(mode):
+    '''Default quality of a mode: pixels per second'''
+    return mode.wWidth * mode.wHeight * mode.fps
+
+
+def frame_intervals(frame):
+    '''Frame intervals offered by a frame descriptor, continuous ranges are sampled at common rates'''
+    if frame.bFrameIntervalType:
+        return sorted(set(frame.dwFrameInterval))
+    step = frame.dwFrameIntervalStep or 1
+    intervals = {frame.dwMinFrameInterval, frame.dwMaxFrameInterval}
+    for fps in CONTINUOUS_FPS:
+        interval = INTERVALS_PER_SECOND // fps
+        if frame.dwMinFrameInterval <= interval <= frame.dwMaxFrameInterval:
+            # Round up to the interval grid so the rate never exceeds the one asked for
+            steps = -(-(interval - frame.dwMinFrameInterval) // step)
+            intervals.add(min(frame.dwMinFrameInterval + steps * step, frame.dwMaxFrameInterval))
+    return sorted(intervals)
+
+
+class Placement:
+    '''Mode of a camera together with the alternate setting and periodic bandwidth it needs'''
+
+    __slots__ = ('_mode', '_alternate_setting', '_microframe_bytes', '_quality')
+
+    def __init__(self, mode, alternate_setting, microframe_bytes, quality):
+        self._mode = mode
+        self._alternate_setting = alternate_setting
+        self._microframe_bytes = microframe_bytes
+        self._quality = quality
+
+    @property
+    def mode(self):
+        '''The stream mode'''
+        return self._mode
+
+    @property
+    def alternate_setting(self):
+        '''bAlternateSetting streaming the mode'''
+        return self._alternate_setting
+
+    @property
+    def microframe_bytes(self):
+        '''Periodic bandwidth reserved on the bus in bytes per microframe (0 for bulk)'''
+        return self._microframe_bytes
+
+    @property
+    def quality(self):
+        '''Score of the mode, higher is better'''
+        return self._quality
+
+    def __repr__(self):
+        return f"Placement({self._mode!r}, alt {self._alternate_setting}, {self._microframe_bytes} B/uframe)"
+
+
+def endpoint_options(interface):
+    '''(bAlternateSetting, bytes per service interval, microframes per service interval, bulk) per streaming setting
+
+    bInterval is read as a high speed endpoint's, 2^(bInterval-1) microframes. On a full speed
+    device it counts 1 ms frames, so its periodic bandwidth comes out eight times too high.
+    '''
+    options = []
+    for number, setting in interface.alternate_settings.items():
+        for endpoint in setting.endpoints:
+            descriptor = endpoint.descriptor
+            transfer_type = descriptor.bmAttributes & TRANSFER_TYPE_MASK
+            if transfer_type == TRANSFER_TYPE_BULK:
+                options.append((number, 0, 1, True))
+            elif transfer_type == TRANSFER_TYPE_ISOCHRONOUS:
+                # High speed service interval in microframes
+                period = 1 << (max(descriptor.bInterval, 1) - 1)
+                options.append((number, packet_size(descriptor.wMaxPacketSize), period, False))
+    return options
+
+
+def placements(configuration, min_width=0, min_height=0, min_fps=0, formats=None, quality=pixel_rate):
+    '''Every feasible placement of a camera, the cheapest alternate setting for each mode
+
+    formats restricts the format sub types considered (e.g. (VS_FORMAT_MJPEG,)).
+    '''
+    interfaces = streaming_interfaces(configuration)
+    if not interfaces:
+        return []
+    interface = interfaces[0]
+    options = endpoint_options(interface)
+    setting = interface.alternate_setting(min(interface.alternate_settings))
+    result = []
+    for format_node in setting.formats.values():
+        sub_type = format_node.bDescriptorSubType
+        if sub_type not in FORMAT_FRAME_SUB_TYPES or (formats is not None and sub_type not in formats):
+            continue
+        for frame_node in format_node.frames.values():
+            frame = frame_node.descriptor
+            if frame.wWidth < min_width or frame.wHeight < min_height:
+                continue
+            for interval in frame_intervals(frame):
+                if min_fps and INTERVALS_PER_SECOND / interval < min_fps:
+                    continue
+                mode = StreamMode(format_node, frame_node, interval, frame_bandwidth(frame, interval))
+                best = None
+                for number, size, period, bulk in options:
+                    if bulk:
+                        cost = 0
+                    else:
+                        needed = math.ceil(mode.bandwidth * period / MICROFRAMES_PER_SECOND) + PAYLOAD_HEADER_SIZE
+                        if size < needed:
+                            continue
+                        cost = math.ceil(size / period)
+                    if best is None or cost < best[1]:
+                        best = (number, cost)
+                if best is not None:
+                    result.append(Placement(mode, best[0], best[1], quality(mode)))
+    return result
+
+
+def _utility(quality):
+    return math.log(quality) if quality > 0 else -math.inf
+
+
+class BandwidthPlanner:
+    '''Assigns a mode to every camera within each bus's periodic budget, sharing quality fairly
+
+    Each bus is solved independently as a multiple choice knapsack over bytes per microframe:
+    every camera must get exactly one of its placements. The sum of the logarithms of the
+    qualities is maximized (their product), so no camera is starved to raise the total of the
+    others, ties go to the highest total quality. quality must be positive.
+    '''
+
+    def __init__(self, budget=HS_PERIODIC_BUDGET, quality=pixel_rate):
+        self._budget = budget
+        self._quality = quality
+        self._cameras = {}
+
+    def add_camera(self, name, configuration, bus, min_width=0, min_height=0, min_fps=0, formats=None):
+        '''Add a camera from its parsed configuration node, cameras with the same bus share a budget'''
+        options = placements(configuration, min_width, min_height, min_fps, formats, self._quality)
+        self._cameras[name] = (bus, options)
+
+    def candidates(self, name):
+        '''Feasible placements of a camera'''
+        return self._cameras[name][1]
+
+    def plan(self):
+        '''Placement for every camera, raises ValueError if some bus cannot fit its cameras'''
+        buses = {}
+        for name, (bus, options) in self._cameras.items():
+            buses.setdefault(bus, []).append((name, options))
+        assignment = {}
+        for bus, cameras in buses.items():
+            assignment.update(self._plan_bus(bus, cameras))
+        return assignment
+
+    def _plan_bus(self, bus, cameras):
+        # states: bytes used -> ((sum of utilities, total quality), placements chosen so far)
+        states = {0: ((0.0, 0), ())}
+        for name, options in cameras:
+            # Only the best quality placement per cost matters
+            by_cost = {}
+            for option in options:
+                current = by_cost.get(option.microframe_bytes)
+                if current is None or option.quality > current.quality:
+                    by_cost[option.microframe_bytes] = option
+            next_states = {}
+            for used, ((utility, total), chosen) in states.items():
+                for cost, option in by_cost.items():
+                    new_used = used + cost
+                    if new_used > self._budget:
+                        continue
+                    new_total = (utility + _utility(option.quality), total + option.quality)
+                    current = next_states.get(new_used)
+                    if current is None or new_total > current[0]:
+                        next_states[new_used] = (new_total, chosen + (option,))
+            if not next_states:
+                raise ValueError(f"Cameras on bus {bus} do not fit in {self._budget} bytes per microframe "
+                                 f"(failed at {name})")
+            states = next_states
+        # Highest utility, then highest total quality, then least bandwidth used
+        used, (_, chosen) = max(states.items(), key=lambda state: (state[1][0], -state[0]))
+        return {name: option for (name, _), option in zip(cameras, chosen)}
+
+    @property
+    def budget(self):
+        '''Periodic bytes per microframe available on each bus'''
+        return self._budget
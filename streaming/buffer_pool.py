@@ -0,0 +1,60 @@
+'''This module contains the pool of reusable frame buffers'''
+import collections
+
+
+class FrameBufferPool:
+    '''Fixed set of preallocated frame buffers handed out to the assembler and returned by consumers
+
+    Buffers are bytearrays of buffer_size bytes, e.g. the dwMaxVideoFrameBufferSize of the
+    negotiated VideoFrameDescriptor. When all buffers are in use acquire() returns None,
+    unless grow is set in which case a new buffer is allocated and counted.
+    '''
+
+    def __init__(self, buffer_size, count, grow=False):
+        self._buffer_size = buffer_size
+        self._grow = grow
+        # deque append / pop are atomic so buffers can be released from any thread
+        self._free = collections.deque(bytearray(buffer_size) for _ in range(count))
+        self._allocations = count
+        self._exhausted = 0
+
+    @classmethod
+    def for_frames(cls, frame_descriptors, count, grow=False):
+        '''Pool sized for the largest of the given VideoFrameDescriptors'''
+        return cls(max(frame.dwMaxVideoFrameBufferSize for frame in frame_descriptors), count, grow)
+
+    def acquire(self):
+        '''Take a free buffer from the pool (None if the pool is exhausted)'''
+        try:
+            return self._free.pop()
+        except IndexError:
+            pass
+        self._exhausted += 1
+        if not self._grow:
+            return None
+        self._allocations += 1
+        return bytearray(self._buffer_size)
+
+    def release(self, buffer):
+        '''Return a buffer to the pool'''
+        self._free.append(buffer)
+
+    @property
+    def buffer_size(self):
+        '''Size of every buffer in the pool'''
+        return self._buffer_size
+
+    @property
+    def free(self):
+        '''Number of buffers available'''
+        return len(self._free)
+
+    @property
+    def allocations(self):
+        '''Number of buffers allocated since the pool was created, constant in steady state'''
+        return self._allocations
+
+    @property
+    def exhausted(self):
+        '''Number of times a buffer was requested while none was free'''
+        return self._exhausted
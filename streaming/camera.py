@@ -0,0 +1,212 @@
+'''This module contains the asyncio frame iterator of a camera stream
+
+USB completions run on an event thread per libusb context, shared by every camera opened on
+that context. Completed frames cross into the asyncio event loop through a bounded queue per
+camera, so one event loop can serve many cameras.
+'''
+import asyncio
+import collections
+import concurrent.futures
+import threading
+
+# What a full frame queue does with a new frame
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_DROP_OLDEST = 'drop-oldest'
+OVERFLOW_DROP_NEWEST = 'drop-newest'
+
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST)
+
+# Longest time the event thread blocks in libusb before looking at its pending commands
+_EVENT_TIMEOUT = 0.05
+
+
+class EventThread:
+    '''Thread handling the USB events of one libusb context
+
+    Engines are started and stopped on this thread so their transfers are only touched from
+    one place. Share one EventThread between the cameras of a context.
+    '''
+
+    def __init__(self, context):
+        self._context = context
+        self._commands = collections.deque()
+        # Engines started successfully and not stopped yet
+        self._engines = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def call(self, function, *args):
+        '''Run function on the event thread, returns a concurrent.futures.Future of its result'''
+        future = concurrent.futures.Future()
+        self._commands.append((future, function, args))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='usb-events', daemon=True)
+                self._thread.start()
+        return future
+
+    def start_engine(self, engine):
+        '''Start an engine on the event thread'''
+        return self.call(self._start_engine, engine)
+
+    def stop_engine(self, engine):
+        '''Stop an engine on the event thread, the thread exits once no engine is left'''
+        return self.call(self._stop_engine, engine)
+
+    def _start_engine(self, engine):
+        engine.start()
+        self._engines.add(engine)
+
+    def _stop_engine(self, engine):
+        # An engine whose start failed never claimed its interface
+        if engine not in self._engines:
+            return
+        self._engines.discard(engine)
+        engine.stop()
+
+    def _run(self):
+        while True:
+            while self._commands:
+                future, function, args = self._commands.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(function(*args))
+                except BaseException as error:
+                    future.set_exception(error)
+            with self._lock:
+                if not self._engines and not self._commands:
+                    self._thread = None
+                    return
+            self._context.handleEventsTimeout(_EVENT_TIMEOUT)
+
+    @property
+    def running(self):
+        '''Whether the event thread is running'''
+        return self._thread is not None
+
+
+class FrameQueue:
+    '''Bounded queue handing frames from the event thread to an asyncio consumer
+
+    When full, OVERFLOW_BLOCK holds the event thread until the consumer catches up (stalling
+    every engine on that thread), OVERFLOW_DROP_OLDEST discards the oldest queued frame and
+    OVERFLOW_DROP_NEWEST discards the incoming frame. Discarded frames are released to their pool.
+    '''
+
+    def __init__(self, loop, max_size, overflow=OVERFLOW_DROP_OLDEST):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow}")
+        self._loop = loop
+        self._max_size = max_size
+        self._overflow = overflow
+        self._frames = collections.deque()
+        self._not_full = threading.Condition()
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._dropped = 0
+
+    def put(self, frame):
+        '''Queue a frame, called from the event thread'''
+        with self._not_full:
+            if self._closed:
+                frame.release()
+                return
+            if len(self._frames) >= self._max_size:
+                if self._overflow == OVERFLOW_BLOCK:
+                    while len(self._frames) >= self._max_size and not self._closed:
+                        self._not_full.wait()
+                elif self._overflow == OVERFLOW_DROP_OLDEST:
+                    self._frames.popleft().release()
+                    self._dropped += 1
+                if self._closed:
+                    frame.release()
+                    return
+                if len(self._frames) >= self._max_size:
+                    frame.release()
+                    self._dropped += 1
+                    return
+            self._frames.append(frame)
+        self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def get(self):
+        '''Next frame, waits for one to arrive'''
+        while True:
+            with self._not_full:
+                if self._frames:
+                    frame = self._frames.popleft()
+                    self._not_full.notify()
+                    return frame
+                self._ready.clear()
+            await self._ready.wait()
+
+    def close(self):
+        '''Stop accepting frames and release the queued ones'''
+        with self._not_full:
+            self._closed = True
+            while self._frames:
+                self._frames.popleft().release()
+            self._not_full.notify_all()
+
+    def __len__(self):
+        return len(self._frames)
+
+    @property
+    def dropped(self):
+        '''Number of frames discarded because the queue was full'''
+        return self._dropped
+
+
+class Camera:
+    '''Camera stream exposed as an asynchronous frame iterator
+
+    async for frame in camera.frames() starts the engine. Closing the iterator (cancellation,
+    an exception, or contextlib.aclosing around a loop left with break) stops it and returns
+    the streaming interface to alternate setting 0. Frames must be released by the consumer.
+    '''
+
+    def __init__(self, engine, events, queue_size=4, overflow=OVERFLOW_DROP_OLDEST):
+        self._engine = engine
+        self._events = events
+        self._queue_size = queue_size
+        self._overflow = overflow
+        self._queue = None
+        self._streaming = False
+
+    async def frames(self):
+        '''Asynchronous iterator over the frames of the stream'''
+        if self._streaming:
+            raise RuntimeError("Camera is already streaming")
+        self._streaming = True
+        queue = FrameQueue(asyncio.get_running_loop(), self._queue_size, self._overflow)
+        self._queue = queue
+        self._engine.on_frame = queue.put
+        started = False
+        try:
+            await asyncio.wrap_future(self._events.start_engine(self._engine))
+            started = True
+            while True:
+                yield await queue.get()
+        finally:
+            # Unblock the event thread before asking it to stop the engine
+            queue.close()
+            try:
+                if started:
+                    await asyncio.shield(asyncio.wrap_future(self._events.stop_engine(self._engine)))
+            finally:
+                self._streaming = False
+
+    @property
+    def engine(self):
+        '''The transfer engine of this camera'''
+        return self._engine
+
+    @property
+    def queued(self):
+        '''Number of frames waiting for the consumer'''
+        return len(self._queue) if self._queue is not None else 0
+
+    @property
+    def dropped(self):
+        '''Number of frames discarded by the overflow policy in the last stream'''
+        return self._queue.dropped if self._queue is not None else 0
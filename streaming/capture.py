@@ -0,0 +1,322 @@
+'''This module contains the capture manager running several cameras into one timestamp ordered stream'''
+import errno
+import heapq
+import itertools
+import threading
+import time
+from descriptors import DT_CONFIG, VS_FORMAT_UNCOMPRESSED, ConfigurationDescriptor, DescriptorParser
+from descriptors.descriptor_constants import REQUEST_TYPE_GET_DEVICE, GET_DESCRIPTOR
+from .buffer_pool import FrameBufferPool
+from .camera import OVERFLOW_BLOCK, OVERFLOW_DROP_NEWEST
+from .clock import ClockRecovery, clock_frequency
+from .negotiation import StreamNegotiator
+from .payload import FrameAssembler
+from .reader import StreamReader
+
+# Weight of the newest sample in the moving averages of the statistics
+_SMOOTHING = 0.1
+
+
+class CameraStats:
+    '''Running statistics of one camera'''
+
+    __slots__ = ('_assembler', '_frames', '_dropped', '_queued', '_last_timestamp', '_interval', '_latency',
+                 '_max_latency', '_error')
+
+    def __init__(self, assembler=None):
+        self._assembler = assembler
+        self._frames = 0
+        self._dropped = 0
+        self._queued = 0
+        self._last_timestamp = None
+        self._interval = None
+        self._latency = None
+        self._max_latency = 0.0
+        self._error = None
+
+    def _frame_captured(self, timestamp):
+        self._frames += 1
+        if self._last_timestamp is not None:
+            interval = timestamp - self._last_timestamp
+            self._interval = interval if self._interval is None else (
+                self._interval + _SMOOTHING * (interval - self._interval))
+        self._last_timestamp = timestamp
+
+    def _frame_delivered(self, latency):
+        self._latency = latency if self._latency is None else self._latency + _SMOOTHING * (latency - self._latency)
+        self._max_latency = max(self._max_latency, latency)
+
+    @property
+    def frames(self):
+        '''Number of frames captured'''
+        return self._frames
+
+    @property
+    def dropped(self):
+        '''Number of frames dropped by backpressure'''
+        return self._dropped
+
+    @property
+    def assembler_dropped(self):
+        '''Number of frames dropped by the assembler of the reader (0 without one)'''
+        return self._assembler.dropped if self._assembler is not None else 0
+
+    @property
+    def queued(self):
+        '''Number of frames waiting in the merged queue'''
+        return self._queued
+
+    @property
+    def fps(self):
+        '''Moving average of the capture frame rate (None before two frames)'''
+        return 1 / self._interval if self._interval else None
+
+    @property
+    def latency(self):
+        '''Moving average of the time from frame completion to delivery in seconds'''
+        return self._latency
+
+    @property
+    def max_latency(self):
+        '''Longest time from frame completion to delivery in seconds'''
+        return self._max_latency
+
+    @property
+    def error(self):
+        '''Exception that stopped the camera worker (None while running)'''
+        return self._error
+
+    def snapshot(self):
+        '''Statistics as a dict'''
+        return {
+            'frames': self._frames, 'dropped': self._dropped,
+            'assembler_dropped': self.assembler_dropped, 'queued': self._queued, 'fps': self.fps,
+            'latency': self._latency, 'max_latency': self._max_latency,
+            'error': repr(self._error) if self._error is not None else None,
+        }
+
+
+class CaptureManager:
+    '''Runs every camera reader on its own worker thread and merges their frames by timestamp
+
+    A reader is anything with a read() method returning completed frames, such as StreamReader.
+    Frames are handed out by get() in host timestamp order. With reorder_delay a frame is only
+    handed out once it is that many seconds old, so a late frame of a slower camera can still be
+    ordered before it. Each camera may have at most max_queued frames in the merged queue, beyond
+    that its worker blocks (OVERFLOW_BLOCK) or drops the new frame (OVERFLOW_DROP_NEWEST).
+    '''
+
+    def __init__(self, max_queued=4, overflow=OVERFLOW_BLOCK, reorder_delay=0.0, clock=time.monotonic):
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP_NEWEST):
+            raise ValueError(f"Unsupported overflow policy {overflow}")
+        self._max_queued = max_queued
+        self._overflow = overflow
+        self._reorder_delay = reorder_delay
+        self._clock = clock
+        self._readers = {}
+        self._layouts = {}
+        self._stop_callbacks = {}
+        self._stats = {}
+        self._threads = []
+        self._heap = []
+        # Tie breaker so frames with equal timestamps never compare each other
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+
+    def add(self, name, reader, on_stop=None, layout=None):
+        '''Add a camera reader, on_stop is called on its worker when the worker exits
+
+        layout is the FrameLayout of the camera's uncompressed frames, if known.
+        '''
+        if self._running:
+            raise RuntimeError("Cameras must be added before start()")
+        self._readers[name] = reader
+        self._layouts[name] = layout
+        self._stop_callbacks[name] = on_stop
+        self._stats[name] = CameraStats(getattr(reader, 'assembler', None))
+
+    def start(self):
+        '''Start one worker thread per camera'''
+        self._running = True
+        for name, reader in self._readers.items():
+            thread = threading.Thread(target=self._work, args=(name, reader), name=f'capture-{name}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        '''Stop the workers and release the frames still queued'''
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+        with self._condition:
+            while self._heap:
+                heapq.heappop(self._heap)[3].release()
+            for stats in self._stats.values():
+                stats._queued = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _work(self, name, reader):
+        stats = self._stats[name]
+        try:
+            while self._running:
+                try:
+                    frames = reader.read()
+                except Exception as error:
+                    # Read timeouts only give the worker a chance to notice stop()
+                    if getattr(error, 'errno', None) == errno.ETIMEDOUT:
+                        continue
+                    raise
+                for frame in frames:
+                    self._publish(name, stats, frame)
+        except Exception as error:
+            stats._error = error
+        finally:
+            on_stop = self._stop_callbacks[name]
+            if on_stop is not None:
+                on_stop()
+            with self._condition:
+                self._condition.notify_all()
+
+    def _publish(self, name, stats, frame):
+        if frame.timestamp is None:
+            frame.timestamp = self._clock()
+        with self._condition:
+            stats._frame_captured(frame.timestamp)
+            if stats._queued >= self._max_queued:
+                if self._overflow == OVERFLOW_BLOCK:
+                    while stats._queued >= self._max_queued and self._running:
+                        self._condition.wait()
+                if stats._queued >= self._max_queued or not self._running:
+                    stats._dropped += 1
+                    frame.release()
+                    return
+            stats._queued += 1
+            heapq.heappush(self._heap, (frame.timestamp, next(self._order), name, frame))
+            self._condition.notify_all()
+
+    def get(self, timeout=None):
+        '''Next (camera name, frame) in timestamp order, None on timeout or once every worker has stopped
+
+        The frame must be released by the caller.
+        '''
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._condition:
+            while True:
+                now = self._clock()
+                wait = None
+                if self._heap:
+                    ready_at = self._heap[0][0] + self._reorder_delay
+                    if ready_at <= now or not self._running:
+                        timestamp, _, name, frame = heapq.heappop(self._heap)
+                        stats = self._stats[name]
+                        stats._queued -= 1
+                        stats._frame_delivered(now - timestamp)
+                        self._condition.notify_all()
+                        return name, frame
+                    wait = ready_at - now
+                elif not self._running or not any(thread.is_alive() for thread in self._threads):
+                    return None
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self._condition.wait(wait)
+
+    def __iter__(self):
+        '''(camera name, frame) pairs until the manager is stopped'''
+        while True:
+            item = self.get()
+            if item is None:
+                return
+            yield item
+
+    def reader(self, name):
+        '''Reader of a camera'''
+        return self._readers[name]
+
+    def stats(self, name):
+        '''Statistics of a camera'''
+        return self._stats[name]
+
+    def layout(self, name):
+        '''FrameLayout of the frames of a camera (None if not uncompressed or unknown)'''
+        return self._layouts[name]
+
+    def array(self, name, frame):
+        '''NumPy view of a frame of a camera shaped by its negotiated format, valid until the frame is released'''
+        layout = self._layouts[name]
+        if layout is None:
+            raise ValueError(f"Camera {name} has no frame layout")
+        return layout.array(frame)
+
+    def snapshot(self):
+        '''Statistics of every camera as a dict of dicts'''
+        with self._condition:
+            return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+    @property
+    def cameras(self):
+        '''Names of the cameras'''
+        return list(self._readers)
+
+
+def _get_descriptor(device, length, descriptor_type, index=0):
+    '''Standard GET_DESCRIPTOR request through a pyusb style device'''
+    return device.ctrl_transfer(REQUEST_TYPE_GET_DEVICE, GET_DESCRIPTOR, (descriptor_type << 8) | index, 0, length)
+
+
+def _frame_layout(mode):
+    '''FrameLayout of an uncompressed stream mode, None without NumPy or for an unsupported layout'''
+    try:
+        from .frame_views import FrameLayout
+        return FrameLayout(mode.format.descriptor, mode.frame.descriptor)
+    except (ImportError, ValueError):
+        return None
+
+
+def open_cameras(manager, min_width=0, min_height=0, min_fps=0, preferred_formats=(), pool_size=4, timeout=100,
+                 devices=None):
+    '''Add every video class camera to the manager, returns the names of the cameras added
+
+    devices defaults to the cameras found by pyusb, any pyusb style devices such as
+    ReplayDevice can be given instead. Each camera is negotiated for the requirement and read
+    through a StreamReader. Frames are stamped with their recovered capture time when the camera
+    reports its clock frequency. Uncompressed frames can be viewed as NumPy arrays through
+    manager.array() when NumPy is installed. Cameras are named bus-address. Keep the manager's max_queued
+    below pool_size, or queued frames hold every buffer and the assemblers drop frames.
+    '''
+
+    if devices is None:
+        import usb
+        devices = usb.core.find(find_all=True, bDeviceClass=239)
+    names = []
+    for device in devices:
+        device.set_configuration()
+        configuration = device.get_active_configuration()
+        header = ConfigurationDescriptor(_get_descriptor(device, ConfigurationDescriptor.LAYOUT.size, DT_CONFIG))
+        parser = DescriptorParser(_get_descriptor(device, header.wTotalLength, DT_CONFIG), lazy=True)
+        negotiator = StreamNegotiator(device, parser.configuration)
+        stream = negotiator.negotiate(min_width, min_height, min_fps, preferred_formats)
+        endpoint = configuration[(negotiator.interface.interface_number, stream.alternate_setting)][0]
+        # Sized from the commit control, frame based frame descriptors carry no frame buffer size
+        pool = FrameBufferPool(stream.max_frame_size, pool_size)
+        uncompressed = stream.mode.format_sub_type == VS_FORMAT_UNCOMPRESSED
+        expected_size = stream.max_frame_size if uncompressed else None
+        frequency = clock_frequency(parser.configuration)
+        recovery = ClockRecovery(frequency) if frequency else None
+        assembler = FrameAssembler(pool.buffer_size, expected_size, pool, clock_recovery=recovery)
+        reader = StreamReader(endpoint, assembler, stream.payload_size, timeout)
+        name = f'{device.bus}-{device.address}'
+        manager.add(name, reader, negotiator.stop, _frame_layout(stream.mode) if uncompressed else None)
+        names.append(name)
+    return names
@@ -0,0 +1,151 @@
+'''This module contains the recovery of host capture times from the PTS and SCR of payload headers
+
+The device stamps each frame with a PTS in ticks of its clock (dwClockFrequency of the video
+control header) and sends SCR samples pairing that clock with the 1 kHz USB frame number (SOF).
+Two running linear fits map the device clock to SOF and SOF to the host clock. Both are least
+squares fits over a window of samples, which averages out the quantization of the frame
+number and the scheduling jitter of the host side samples.
+'''
+import collections
+import time
+from descriptors.descriptor_constants import *
+
+STC_MODULUS = 1 << 32
+SOF_MODULUS = 1 << 11
+SOF_PER_SECOND = 1000
+NS_PER_SECOND = 1000000000
+
+# Samples kept in the fits, the SCR is sampled at most once per USB frame
+DEFAULT_WINDOW = 512
+
+
+def clock_frequency(configuration):
+    '''dwClockFrequency of the video control interface of a configuration node, None if there is none'''
+    for interface in configuration.interfaces.values():
+        settings = interface.alternate_settings
+        if not settings:
+            continue
+        setting = settings[min(settings)]
+        if setting.bInterfaceSubClass == SC_VIDEOCONTROL and setting.header is not None:
+            return setting.header.descriptor.dwClockFrequency or None
+    return None
+
+
+class _LinearFit:
+    '''Least squares fit of y over x on a sliding window of integer samples
+
+    The sums are kept relative to the first sample as Python integers, so adding and removing
+    samples is exact however long the fit runs.
+    '''
+
+    __slots__ = ('_window', '_samples', '_x0', '_y0', '_sx', '_sy', '_sxx', '_sxy')
+
+    def __init__(self, window):
+        self._window = window
+        self._samples = collections.deque()
+        self.reset()
+
+    def reset(self):
+        self._samples.clear()
+        self._x0 = None
+        self._y0 = None
+        self._sx = self._sy = self._sxx = self._sxy = 0
+
+    def add(self, x, y):
+        if self._x0 is None:
+            self._x0 = x
+            self._y0 = y
+        x -= self._x0
+        y -= self._y0
+        self._samples.append((x, y))
+        self._sx += x
+        self._sy += y
+        self._sxx += x * x
+        self._sxy += x * y
+        if len(self._samples) > self._window:
+            x, y = self._samples.popleft()
+            self._sx -= x
+            self._sy -= y
+            self._sxx -= x * x
+            self._sxy -= x * y
+
+    def __call__(self, x, slope):
+        '''y at x, slope is used until the samples span more than one x value'''
+        n = len(self._samples)
+        denominator = n * self._sxx - self._sx * self._sx
+        if denominator:
+            slope = (n * self._sxy - self._sx * self._sy) / denominator
+        # Evaluate around the mean of the window to keep the float part small
+        return self._y0 + self._sy / n + slope * ((n * (x - self._x0) - self._sx) / n)
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class ClockRecovery:
+    '''Maps the PTS of frames to host time using the SCR of the payload headers
+
+    sample() is fed the SCR of every payload (the frame assembler does it when given this object)
+    and host_time() converts a PTS to seconds of clock(). Host times are taken when payloads are
+    fed, so timestamps include the constant delivery latency of the transfers but not its jitter.
+    '''
+
+    def __init__(self, clock_frequency, window=DEFAULT_WINDOW, clock=time.monotonic):
+        if not clock_frequency:
+            raise ValueError("The device clock frequency must be known")
+        self._clock_frequency = clock_frequency
+        self._clock = clock
+        self._device_to_sof = _LinearFit(window)
+        self._sof_to_host = _LinearFit(window)
+        self._samples = 0
+        self.reset()
+
+    def reset(self):
+        '''Forget the samples (e.g. after the stream was stopped)'''
+        self._device_to_sof.reset()
+        self._sof_to_host.reset()
+        self._stc = None
+        self._sof = None
+        self._stc_unwrapped = 0
+        self._sof_unwrapped = 0
+
+    def sample(self, stc, sof):
+        '''Add the SCR of a payload, only the first sample of each USB frame is kept'''
+        sof &= SOF_MODULUS - 1
+        if sof == self._sof:
+            return
+        host = self._clock()
+        if self._stc is not None:
+            self._stc_unwrapped += (stc - self._stc) % STC_MODULUS
+            self._sof_unwrapped += (sof - self._sof) % SOF_MODULUS
+        self._stc = stc
+        self._sof = sof
+        self._samples += 1
+        self._device_to_sof.add(self._stc_unwrapped, self._sof_unwrapped)
+        self._sof_to_host.add(self._sof_unwrapped, round(host * NS_PER_SECOND))
+
+    def host_time(self, pts):
+        '''Host time in seconds of clock() at which the device clock read pts, None before the first sample'''
+        if self._stc is None:
+            return None
+        # The PTS lies close to the latest SCR, either side of it
+        delta = (pts - self._stc) % STC_MODULUS
+        if delta >= STC_MODULUS // 2:
+            delta -= STC_MODULUS
+        sof = self._device_to_sof(self._stc_unwrapped + delta, SOF_PER_SECOND / self._clock_frequency)
+        return self._sof_to_host(sof, NS_PER_SECOND / SOF_PER_SECOND) / NS_PER_SECOND
+
+    @property
+    def clock_frequency(self):
+        '''Frequency of the device clock in Hz'''
+        return self._clock_frequency
+
+    @property
+    def locked(self):
+        '''Whether both fits are estimated from samples rather than the nominal clock rates'''
+        return len(self._sof_to_host) >= 2
+
+    @property
+    def samples(self):
+        '''Number of SCR samples taken'''
+        return self._samples
@@ -0,0 +1,164 @@
+'''This module contains vectorized pixel format conversion of YUY2 and NV12 frames
+
+It depends on NumPy and is therefore not imported by the streaming package itself.
+Conversions use BT.601 limited range coefficients in 8 bit fixed point.
+'''
+import concurrent.futures
+import numpy as np
+
+SOURCE_FORMATS = (b'YUY2', b'NV12')
+
+# Fixed point BT.601 coefficients scaled by 256
+_Y_SCALE = 298
+_V_TO_R = 409
+_U_TO_G = 100
+_V_TO_G = 208
+_U_TO_B = 516
+
+
+class _Scratch:
+    '''Intermediate arrays of one row band'''
+
+    __slots__ = ('luma', 'u', 'v', 'chroma', 'chroma_tmp', 'channel')
+
+    def __init__(self, rows, width, chroma_rows):
+        self.luma = np.empty((rows, width), dtype=np.int32)
+        self.u = np.empty((chroma_rows, width // 2), dtype=np.int32)
+        self.v = np.empty((chroma_rows, width // 2), dtype=np.int32)
+        self.chroma = np.empty((chroma_rows, width // 2), dtype=np.int32)
+        self.chroma_tmp = np.empty((chroma_rows, width // 2), dtype=np.int32)
+        self.channel = np.empty((rows, width), dtype=np.int32)
+
+
+class FrameConverter:
+    '''Converts YUY2 or NV12 frames of a fixed size to gray, RGB or BGR
+
+    Input frames are arrays shaped like FrameLayout.array() returns them: (height, width, 2)
+    for YUY2 and (height * 3 / 2, width) for NV12. Results are written into the caller's out
+    array when given. With workers > 1 frames are split into row bands converted on a
+    thread pool, NumPy releases the GIL inside the kernels. A converter handles one frame at
+    a time.
+    '''
+
+    def __init__(self, source, width, height, workers=0):
+        if source not in SOURCE_FORMATS:
+            raise ValueError(f"Unsupported source format {source}")
+        if width % 2 or height % 2:
+            raise ValueError("Frame width and height must be even")
+        self._source = source
+        self._width = width
+        self._height = height
+        band_count = max(1, min(workers, height // 2))
+        # Bands start on even rows so NV12 chroma rows are never split
+        edges = [2 * (height // 2 * band // band_count) for band in range(band_count + 1)]
+        self._bands = list(zip(edges[:-1], edges[1:]))
+        # One set of intermediates per band, created on the first color conversion
+        self._scratch = [None] * band_count
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=band_count) if band_count > 1 else None
+
+    def close(self):
+        '''Shut the worker threads down'''
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def gray(self, frame, out=None):
+        '''Luma of the frame as a (height, width) uint8 array'''
+        if out is None:
+            out = np.empty((self._height, self._width), dtype=np.uint8)
+        self._run(self._gray_band, frame, out)
+        return out
+
+    def rgb(self, frame, out=None):
+        '''Frame as a (height, width, 3) uint8 RGB array'''
+        if out is None:
+            out = np.empty((self._height, self._width, 3), dtype=np.uint8)
+        self._run(self._color_band, frame, out, 0, 2)
+        return out
+
+    def bgr(self, frame, out=None):
+        '''Frame as a (height, width, 3) uint8 BGR array'''
+        if out is None:
+            out = np.empty((self._height, self._width, 3), dtype=np.uint8)
+        self._run(self._color_band, frame, out, 2, 0)
+        return out
+
+    def _run(self, kernel, frame, out, *args):
+        if self._executor is None:
+            for band, (first, last) in enumerate(self._bands):
+                kernel(frame, out, band, first, last, *args)
+            return
+        futures = [self._executor.submit(kernel, frame, out, band, first, last, *args)
+                   for band, (first, last) in enumerate(self._bands)]
+        for future in futures:
+            future.result()
+
+    def _planes(self, frame, first, last):
+        '''Luma rows and the U, V samples covering them'''
+        if self._source == b'YUY2':
+            return frame[first:last, :, 0], frame[first:last, 0::2, 1], frame[first:last, 1::2, 1]
+        luma = frame[first:last]
+        chroma = frame[self._height + first // 2:self._height + last // 2].reshape(-1, self._width // 2, 2)
+        return luma, chroma[:, :, 0], chroma[:, :, 1]
+
+    def _gray_band(self, frame, out, band, first, last):
+        np.copyto(out[first:last], self._planes(frame, first, last)[0])
+
+    def _color_band(self, frame, out, band, first, last, red, blue):
+        luma, u, v = self._planes(frame, first, last)
+        scratch = self._scratch[band]
+        if scratch is None:
+            rows = last - first
+            scratch = _Scratch(rows, self._width, rows if self._source == b'YUY2' else rows // 2)
+            self._scratch[band] = scratch
+        c, d, e = scratch.luma, scratch.u, scratch.v
+        np.copyto(c, luma)
+        c -= 16
+        c *= _Y_SCALE
+        c += 128
+        np.copyto(d, u)
+        d -= 128
+        np.copyto(e, v)
+        e -= 128
+        chroma = scratch.chroma
+        out = out[first:last]
+        np.multiply(e, _V_TO_R, out=chroma)
+        self._store(c, chroma, scratch.channel, out[:, :, red])
+        np.multiply(d, -_U_TO_G, out=chroma)
+        np.multiply(e, _V_TO_G, out=scratch.chroma_tmp)
+        chroma -= scratch.chroma_tmp
+        self._store(c, chroma, scratch.channel, out[:, :, 1])
+        np.multiply(d, _U_TO_B, out=chroma)
+        self._store(c, chroma, scratch.channel, out[:, :, blue])
+
+    def _store(self, luma, chroma, channel, out):
+        '''out = clip((luma + chroma upsampled) >> 8), chroma is shared by 2 (YUY2) or 2x2 (NV12) pixels'''
+        # One strided add per pixel of the chroma block is faster than a broadcasting add
+        row_step = 1 if self._source == b'YUY2' else 2
+        for row in range(row_step):
+            for column in range(2):
+                np.add(luma[row::row_step, column::2], chroma, out=channel[row::row_step, column::2])
+        channel >>= 8
+        np.clip(channel, 0, 255, out=channel)
+        np.copyto(out, channel, casting='unsafe')
+
+    @property
+    def source(self):
+        '''FourCC of the input frames'''
+        return self._source
+
+    @property
+    def width(self):
+        '''Width of the frames in pixels'''
+        return self._width
+
+    @property
+    def height(self):
+        '''Height of the frames in pixels'''
+        return self._height
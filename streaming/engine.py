@@ -0,0 +1,241 @@
+'''This module contains the streaming engine keeping several transfers in flight on the video endpoint
+
+It drives libusb's asynchronous API through python-libusb1 (usb1) handles, or any object with
+the same transfer interface such as the loopback backend.
+'''
+import collections
+import time
+
+# libusb transfer status codes
+TRANSFER_COMPLETED = 0
+TRANSFER_ERROR = 1
+TRANSFER_TIMED_OUT = 2
+TRANSFER_CANCELLED = 3
+TRANSFER_STALL = 4
+TRANSFER_NO_DEVICE = 5
+TRANSFER_OVERFLOW = 6
+
+# Time spent waiting for cancelled transfers to come back when stopping
+_STOP_EVENT_TIMEOUT = 0.1
+
+
+def open_libusb(vendor_id, product_id):
+    '''Open a camera through python-libusb1, returns (context, handle)
+
+    Requires the optional usb1 package.
+    '''
+    import usb1
+    context = usb1.USBContext()
+    handle = context.openByVendorIDAndProductID(vendor_id, product_id)
+    if handle is None:
+        context.close()
+        raise ValueError(f"No device {vendor_id:04x}:{product_id:04x}")
+    # uvcvideo is detached from an interface when the engine claims it
+    handle.setAutoDetachKernelDriver(True)
+    return context, handle
+
+
+def packet_size(w_max_packet_size):
+    '''Bytes per service interval of an endpoint, including high bandwidth additional transactions'''
+    return (w_max_packet_size & 0x07FF) * (1 + ((w_max_packet_size >> 11) & 0x03))
+
+
+class TransferEngine:
+    '''Keeps queue_depth transfers outstanding on the video endpoint and feeds completions to an assembler
+
+    Bulk transfers carry one payload of up to transfer_size bytes. With iso_packets the
+    transfers are isochronous, transfer_size is split evenly over the packets and each
+    packet carries one payload. Transfers and their buffers are allocated once and
+    resubmitted from the completion callback.
+
+    Completed frames are passed to on_frame, or collected and returned by poll() when no
+    callback is given. Events are handled on the thread calling poll() or run().
+    '''
+
+    def __init__(self, context, handle, endpoint_address, assembler, queue_depth=8, transfer_size=32768,
+                 iso_packets=0, on_frame=None, interface=None, alternate_setting=None, timeout=0):
+        self._context = context
+        self._handle = handle
+        self._endpoint_address = endpoint_address
+        self._assembler = assembler
+        self._queue_depth = queue_depth
+        self._transfer_size = transfer_size
+        self._iso_packets = iso_packets
+        self._on_frame = on_frame
+        self._interface = interface
+        self._alternate_setting = alternate_setting
+        self._timeout = timeout
+        self._transfers = []
+        self._ready = collections.deque()
+        self._running = False
+        self._in_flight = 0
+        self._completed = 0
+        self._bytes = 0
+        self._transfer_errors = 0
+        self._packet_errors = 0
+        self._latency = None
+        self._submitted = {}
+
+    def start(self):
+        '''Select the streaming alternate setting and submit queue_depth transfers
+
+        If the start fails half way the engine is stopped again before the error is raised.
+        '''
+        if self._running:
+            return
+        if self._interface is not None:
+            self._handle.claimInterface(self._interface)
+        try:
+            self._start()
+        except BaseException:
+            self.stop()
+            raise
+
+    def _start(self):
+        if self._interface is not None and self._alternate_setting is not None:
+            self._handle.setInterfaceAltSetting(self._interface, self._alternate_setting)
+        if not self._transfers:
+            for _ in range(self._queue_depth):
+                transfer = self._handle.getTransfer(iso_packets=self._iso_packets)
+                if self._iso_packets:
+                    transfer.setIsochronous(self._endpoint_address, self._transfer_size,
+                                            callback=self._complete, timeout=self._timeout)
+                else:
+                    transfer.setBulk(self._endpoint_address, self._transfer_size,
+                                     callback=self._complete, timeout=self._timeout)
+                self._transfers.append(transfer)
+        self._running = True
+        for transfer in self._transfers:
+            self._submit(transfer)
+
+    def stop(self):
+        '''Cancel the outstanding transfers, wait for them and return the interface to alternate setting 0'''
+        self._running = False
+        for transfer in self._transfers:
+            if transfer.isSubmitted():
+                transfer.cancel()
+        while self._in_flight:
+            self._context.handleEventsTimeout(_STOP_EVENT_TIMEOUT)
+        if self._interface is not None:
+            self._handle.setInterfaceAltSetting(self._interface, 0)
+            self._handle.releaseInterface(self._interface)
+        self._assembler.reset()
+
+    def _submit(self, transfer):
+        if self._latency is not None:
+            self._submitted[transfer] = time.perf_counter()
+        transfer.submit()
+        self._in_flight += 1
+
+    def _complete(self, transfer):
+        '''Completion callback, feeds the payloads to the assembler and resubmits the transfer'''
+        self._in_flight -= 1
+        if self._latency is not None:
+            submitted = self._submitted.pop(transfer, None)
+            if submitted is not None:
+                self._latency.record(time.perf_counter() - submitted)
+        status = transfer.getStatus()
+        if status == TRANSFER_COMPLETED:
+            self._completed += 1
+            if self._iso_packets:
+                for packet_status, packet in transfer.iterISO():
+                    if packet_status != TRANSFER_COMPLETED:
+                        # The payload of the packet is lost, so is the frame it belonged to
+                        self._packet_errors += 1
+                        self._assembler.mark_error()
+                    elif packet:
+                        self._bytes += len(packet)
+                        self._deliver(self._assembler.feed(memoryview(packet).cast('B')))
+            else:
+                length = transfer.getActualLength()
+                if length:
+                    self._bytes += length
+                    self._deliver(self._assembler.feed(memoryview(transfer.getBuffer()).cast('B')[:length]))
+        elif status == TRANSFER_CANCELLED:
+            return
+        elif status == TRANSFER_NO_DEVICE:
+            self._running = False
+            return
+        else:
+            self._transfer_errors += 1
+            self._assembler.mark_error()
+        if self._running:
+            self._submit(transfer)
+
+    def _deliver(self, frames):
+        for frame in frames:
+            if self._on_frame is not None:
+                self._on_frame(frame)
+            else:
+                self._ready.append(frame)
+
+    def poll(self, timeout=0):
+        '''Handle pending USB events, returns the frames completed since the last poll'''
+        self._context.handleEventsTimeout(timeout)
+        frames = list(self._ready)
+        self._ready.clear()
+        return frames
+
+    def run(self, timeout=_STOP_EVENT_TIMEOUT):
+        '''Handle USB events until stop() is called or the device goes away (use with on_frame)'''
+        while self._running:
+            self._context.handleEventsTimeout(timeout)
+
+    @property
+    def running(self):
+        '''Whether transfers are being resubmitted'''
+        return self._running
+
+    @property
+    def on_frame(self):
+        '''Callback receiving completed frames (None to collect them for poll())'''
+        return self._on_frame
+
+    @on_frame.setter
+    def on_frame(self, on_frame):
+        self._on_frame = on_frame
+
+    @property
+    def latency(self):
+        '''Histogram recording the time from submission to completion of each transfer (None for none)'''
+        return self._latency
+
+    @latency.setter
+    def latency(self, latency):
+        self._submitted.clear()
+        self._latency = latency
+
+    @property
+    def assembler(self):
+        '''The frame assembler fed by this engine'''
+        return self._assembler
+
+    @property
+    def queue_depth(self):
+        '''Number of transfers kept outstanding'''
+        return self._queue_depth
+
+    @property
+    def in_flight(self):
+        '''Number of transfers currently submitted'''
+        return self._in_flight
+
+    @property
+    def transfers(self):
+        '''Number of transfers completed successfully'''
+        return self._completed
+
+    @property
+    def bytes(self):
+        '''Number of bytes received, payload headers included'''
+        return self._bytes
+
+    @property
+    def transfer_errors(self):
+        '''Number of transfers completed with an error status'''
+        return self._transfer_errors
+
+    @property
+    def packet_errors(self):
+        '''Number of isochronous packets completed with an error status'''
+        return self._packet_errors
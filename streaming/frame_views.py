@@ -0,0 +1,125 @@
+'''This module contains zero-copy NumPy views of uncompressed frames
+
+It depends on NumPy and is therefore not imported by the streaming package itself.
+'''
+import numpy as np
+
+# Uncompressed format GUIDs are a FourCC followed by this fixed suffix
+GUID_SUFFIX = bytes((0x00, 0x00, 0x10, 0x00, 0x80, 0x00, 0x00, 0xAA, 0x00, 0x38, 0x9B, 0x71))
+
+# Packed formats: FourCC -> (channels, dtype), the array shape is (height, width, channels)
+PACKED_FORMATS = {
+    b'YUY2': (2, np.uint8),
+    b'YUYV': (2, np.uint8),
+    b'UYVY': (2, np.uint8),
+    b'Y800': (1, np.uint8),
+    b'GREY': (1, np.uint8),
+    b'Y8  ': (1, np.uint8),
+    b'Y16 ': (1, np.uint16),
+    b'RGBP': (1, np.uint16),
+    b'BGR3': (3, np.uint8),
+    b'RGB3': (3, np.uint8),
+}
+
+# Planar 4:2:0 formats, the array shape is (height * 3 / 2, width)
+PLANAR_FORMATS = frozenset((b'NV12', b'NV21', b'I420', b'IYUV', b'YV12'))
+
+
+def fourcc(guid):
+    '''FourCC of an uncompressed format GUID (None if the GUID is not FourCC based)'''
+    guid = bytes(guid)
+    if len(guid) != 16 or guid[4:] != GUID_SUFFIX:
+        return None
+    return guid[:4]
+
+
+class FrameLayout:
+    '''Shape and type of the frames of an uncompressed format and frame descriptor pair
+
+    The layout comes from the FourCC of guidFormat, falling back to bBitsPerPixel for
+    unknown GUIDs. Arrays are views of the frame buffer: they are only valid until the frame
+    is released to its pool.
+    '''
+
+    __slots__ = ('_fourcc', '_width', '_height', '_shape', '_dtype', '_frame_size', '_planar')
+
+    def __init__(self, format_descriptor, frame_descriptor):
+        self._fourcc = fourcc(format_descriptor.guidFormat)
+        self._width = width = frame_descriptor.wWidth
+        self._height = height = frame_descriptor.wHeight
+        self._planar = self._fourcc in PLANAR_FORMATS
+        if self._planar:
+            self._shape = (height * 3 // 2, width)
+            self._dtype = np.dtype(np.uint8)
+        elif self._fourcc in PACKED_FORMATS:
+            channels, dtype = PACKED_FORMATS[self._fourcc]
+            self._shape = (height, width, channels) if channels > 1 else (height, width)
+            self._dtype = np.dtype(dtype)
+        else:
+            bits_per_pixel = format_descriptor.bBitsPerPixel
+            if bits_per_pixel == 12:
+                self._planar = True
+                self._shape = (height * 3 // 2, width)
+            elif bits_per_pixel in (8, 16, 24, 32):
+                channels = bits_per_pixel // 8
+                self._shape = (height, width, channels) if channels > 1 else (height, width)
+            else:
+                raise ValueError(f"Unsupported pixel layout with {bits_per_pixel} bits per pixel")
+            self._dtype = np.dtype(np.uint8)
+        self._frame_size = int(np.prod(self._shape)) * self._dtype.itemsize
+
+    def array(self, frame):
+        '''View of the frame (or any buffer holding one) as an array of the layout shape, no copy is made'''
+        buffer = frame.buffer if hasattr(frame, 'buffer') else frame
+        if len(frame) < self._frame_size:
+            raise ValueError(f"Frame of {len(frame)} bytes is shorter than {self._frame_size}")
+        count = self._frame_size // self._dtype.itemsize
+        return np.frombuffer(buffer, dtype=self._dtype, count=count).reshape(self._shape)
+
+    def planes(self, frame):
+        '''Views of the luma and chroma planes of a planar frame
+
+        NV12 / NV21 return (Y, UV) with UV of shape (height / 2, width / 2, 2), I420 / IYUV
+        return (Y, U, V) and YV12 returns (Y, V, U) with chroma planes of shape (height / 2, width / 2).
+        '''
+        if not self._planar:
+            raise ValueError("Frame layout is not planar")
+        flat = self.array(frame).reshape(-1)
+        height, width = self._height, self._width
+        luma = flat[:height * width].reshape(height, width)
+        chroma = flat[height * width:]
+        if self._fourcc in (b'NV12', b'NV21', None):
+            return luma, chroma.reshape(height // 2, width // 2, 2)
+        quarter = (height // 2) * (width // 2)
+        return (luma, chroma[:quarter].reshape(height // 2, width // 2),
+                chroma[quarter:].reshape(height // 2, width // 2))
+
+    @property
+    def fourcc(self):
+        '''FourCC of the format (None if the GUID is not FourCC based)'''
+        return self._fourcc
+
+    @property
+    def width(self):
+        '''Width of the frames in pixels'''
+        return self._width
+
+    @property
+    def height(self):
+        '''Height of the frames in pixels'''
+        return self._height
+
+    @property
+    def shape(self):
+        '''Shape of the frame arrays'''
+        return self._shape
+
+    @property
+    def dtype(self):
+        '''Element type of the frame arrays'''
+        return self._dtype
+
+    @property
+    def frame_size(self):
+        '''Bytes in one frame, usable as the expected size of the frame assembler'''
+        return self._frame_size
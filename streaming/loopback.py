@@ -0,0 +1,224 @@
+'''This module contains an in-process stand-in for the python-libusb1 transfer API
+
+A loopback device produces payloads from an iterable as if the camera were sending them. It
+only fills transfers that were submitted before the payloads arrived, payloads arriving while
+no transfer is queued are lost the same way isochronous packets are lost on a real bus. A
+payload of None arrives as a transmission error: a failed isochronous packet or a failed bulk
+transfer.
+'''
+import collections
+import time
+from .engine import TRANSFER_COMPLETED, TRANSFER_ERROR, TRANSFER_CANCELLED, TRANSFER_OVERFLOW
+
+
+class LoopbackTransfer:
+    '''Subset of usb1.USBTransfer used by the streaming engine'''
+
+    def __init__(self, handle, iso_packets):
+        self._handle = handle
+        self._iso_packets = iso_packets
+        self._buffer = None
+        self._callback = None
+        self._user_data = None
+        self._packet_size = 0
+        self._packets = []
+        self._status = TRANSFER_COMPLETED
+        self._actual_length = 0
+        self._submitted = False
+
+    def setBulk(self, endpoint, buffer_or_len, callback=None, user_data=None, timeout=0):
+        self._set_buffer(buffer_or_len)
+        self._callback = callback
+        self._user_data = user_data
+
+    def setIsochronous(self, endpoint, buffer_or_len, callback=None, user_data=None, timeout=0,
+                       iso_transfer_length_list=None):
+        self._set_buffer(buffer_or_len)
+        self._packet_size = len(self._buffer) // self._iso_packets
+        self._callback = callback
+        self._user_data = user_data
+
+    def _set_buffer(self, buffer_or_len):
+        if isinstance(buffer_or_len, int):
+            self._buffer = bytearray(buffer_or_len)
+        else:
+            self._buffer = buffer_or_len
+
+    def submit(self):
+        self._submitted = True
+        self._status = TRANSFER_COMPLETED
+        self._actual_length = 0
+        self._packets.clear()
+        self._handle._submit(self)
+
+    def cancel(self):
+        self._handle._cancel(self)
+
+    def isSubmitted(self):
+        return self._submitted
+
+    def getStatus(self):
+        return self._status
+
+    def getActualLength(self):
+        return self._actual_length
+
+    def getBuffer(self):
+        return self._buffer
+
+    def getUserData(self):
+        return self._user_data
+
+    def iterISO(self):
+        view = memoryview(self._buffer)
+        for index, (status, length) in enumerate(self._packets):
+            offset = index * self._packet_size
+            yield status, view[offset:offset + length]
+
+    def _fill(self, payload):
+        '''Place one payload, returns True once the transfer is complete'''
+        if payload is None:
+            return self._fail()
+        if not self._iso_packets:
+            length = min(len(payload), len(self._buffer))
+            self._buffer[:length] = payload[:length]
+            self._actual_length = length
+            if length < len(payload):
+                self._status = TRANSFER_OVERFLOW
+            return True
+        offset = len(self._packets) * self._packet_size
+        length = min(len(payload), self._packet_size)
+        self._buffer[offset:offset + length] = payload[:length]
+        self._packets.append((TRANSFER_OVERFLOW if length < len(payload) else TRANSFER_COMPLETED, length))
+        self._actual_length += length
+        return len(self._packets) == self._iso_packets
+
+    def _fail(self):
+        if not self._iso_packets:
+            self._status = TRANSFER_ERROR
+            return True
+        self._packets.append((TRANSFER_ERROR, 0))
+        return len(self._packets) == self._iso_packets
+
+    def _finish(self):
+        self._submitted = False
+        if self._callback is not None:
+            self._callback(self)
+
+
+class LoopbackDeviceHandle:
+    '''Subset of usb1.USBDeviceHandle serving payloads from an iterable
+
+    Every time the context handles events the device sends payloads_per_event payloads
+    into the transfers queued at that moment. The device starts sending once the first
+    transfer is submitted.
+    '''
+
+    def __init__(self, context, payloads, payloads_per_event=1):
+        self._payloads = iter(payloads)
+        self._payloads_per_event = payloads_per_event
+        self._queued = collections.deque()
+        self._finished = collections.deque()
+        self._claimed = set()
+        self._alternate_settings = {}
+        self._started = False
+        self._exhausted = False
+        self._sent = 0
+        self._lost = 0
+        context._handles.append(self)
+
+    def getTransfer(self, iso_packets=0):
+        return LoopbackTransfer(self, iso_packets)
+
+    def claimInterface(self, interface):
+        self._claimed.add(interface)
+
+    def releaseInterface(self, interface):
+        self._claimed.discard(interface)
+
+    def setInterfaceAltSetting(self, interface, alt_setting):
+        self._alternate_settings[interface] = alt_setting
+
+    def _submit(self, transfer):
+        self._started = True
+        self._queued.append(transfer)
+
+    def _cancel(self, transfer):
+        if transfer in self._queued:
+            self._queued.remove(transfer)
+            transfer._status = TRANSFER_CANCELLED
+            self._finished.append(transfer)
+
+    def _service(self):
+        '''Send the next payloads into the queued transfers, then run the completion callbacks
+
+        Returns False if there was nothing to do.
+        '''
+        if not self._started or self._exhausted and not self._finished:
+            return False
+        # Only the transfers queued before the payloads arrive can receive them
+        queued = len(self._queued)
+        for _ in range(self._payloads_per_event):
+            try:
+                payload = next(self._payloads)
+            except StopIteration:
+                self._exhausted = True
+                self._flush()
+                break
+            self._sent += 1
+            if not queued:
+                self._lost += 1
+                continue
+            if self._queued[0]._fill(payload):
+                self._finished.append(self._queued.popleft())
+                queued -= 1
+        while self._finished:
+            self._finished.popleft()._finish()
+        return True
+
+    def _flush(self):
+        '''Complete a partly filled isochronous transfer with empty packets once the stream ends'''
+        if self._queued and self._queued[0]._packets:
+            transfer = self._queued.popleft()
+            while not transfer._fill(b''):
+                pass
+            self._finished.append(transfer)
+
+    def alternate_setting(self, interface):
+        '''Alternate setting last selected on the interface (0 if never set)'''
+        return self._alternate_settings.get(interface, 0)
+
+    @property
+    def claimed(self):
+        '''Interfaces currently claimed'''
+        return frozenset(self._claimed)
+
+    @property
+    def exhausted(self):
+        '''Whether every payload has been sent'''
+        return self._exhausted
+
+    @property
+    def sent(self):
+        '''Number of payloads the device sent'''
+        return self._sent
+
+    @property
+    def lost(self):
+        '''Number of payloads sent while no transfer was queued'''
+        return self._lost
+
+
+class LoopbackContext:
+    '''Subset of usb1.USBContext driving loopback device handles'''
+
+    def __init__(self):
+        self._handles = []
+
+    def handleEventsTimeout(self, tv=0):
+        busy = False
+        for handle in self._handles:
+            busy |= handle._service()
+        if not busy and tv:
+            # Nothing left to send, block like libusb would until the timeout
+            time.sleep(tv)
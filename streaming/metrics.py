@@ -0,0 +1,190 @@
+'''This module contains the low overhead metrics of the capture path
+
+Most counters already live on the reader, engine, assembler and pool objects, the registry reads
+them only when a snapshot is taken. Only latency histograms record on the hot path, one bucket
+increment per transfer. Snapshots are plain dicts so they can be logged or exported as JSON.
+'''
+import math
+import time
+
+# Histogram buckets are powers of two from 2**MIN_EXPONENT to 2**MAX_EXPONENT (about 1 us to 64 s)
+MIN_EXPONENT = -20
+MAX_EXPONENT = 6
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Counter:
+    '''Monotonic counter updated by application code'''
+
+    __slots__ = ('_value',)
+
+    def __init__(self):
+        self._value = 0
+
+    def add(self, count=1):
+        '''Increase the counter'''
+        self._value += count
+
+    @property
+    def value(self):
+        '''Current count'''
+        return self._value
+
+
+class Histogram:
+    '''Histogram of positive values in power of two buckets'''
+
+    __slots__ = ('_buckets', '_count', '_sum', '_min', '_max')
+
+    def __init__(self):
+        self._buckets = [0] * (MAX_EXPONENT - MIN_EXPONENT + 1)
+        self.reset()
+
+    def reset(self):
+        '''Forget every value recorded'''
+        for index in range(len(self._buckets)):
+            self._buckets[index] = 0
+        self._count = 0
+        self._sum = 0.0
+        self._min = math.inf
+        self._max = 0.0
+
+    def record(self, value):
+        '''Add a value, values beyond the bucket range land in the first or last bucket'''
+        # frexp gives value = m * 2**e with 0.5 <= m < 1, so the value is below 2**e
+        exponent = math.frexp(value)[1]
+        if exponent < MIN_EXPONENT:
+            exponent = MIN_EXPONENT
+        elif exponent > MAX_EXPONENT:
+            exponent = MAX_EXPONENT
+        self._buckets[exponent - MIN_EXPONENT] += 1
+        self._count += 1
+        self._sum += value
+        if value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+
+    def quantile(self, fraction):
+        '''Upper bound of the bucket holding the given fraction of the values (None when empty)'''
+        if not self._count:
+            return None
+        rank = fraction * self._count
+        seen = 0
+        for index, count in enumerate(self._buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(math.ldexp(1.0, index + MIN_EXPONENT), self._max)
+        return self._max
+
+    @property
+    def count(self):
+        '''Number of values recorded'''
+        return self._count
+
+    @property
+    def mean(self):
+        '''Mean of the values (None when empty)'''
+        return self._sum / self._count if self._count else None
+
+    def snapshot(self):
+        '''Summary of the histogram as a dict, buckets as (upper bound, count) pairs'''
+        empty = not self._count
+        summary = {
+            'count': self._count, 'sum': self._sum, 'mean': self.mean,
+            'min': None if empty else self._min, 'max': None if empty else self._max,
+            'buckets': [(math.ldexp(1.0, index + MIN_EXPONENT), count)
+                        for index, count in enumerate(self._buckets) if count],
+        }
+        for fraction in QUANTILES:
+            summary[f'p{round(fraction * 100)}'] = self.quantile(fraction)
+        return summary
+
+
+class Metrics:
+    '''Registry of counters, gauges and histograms with dotted names
+
+    Counters are monotonic, either Counter objects or callables reading a count kept elsewhere.
+    Gauges are callables reading a current level such as a queue depth.
+    '''
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def counter(self, name, read=None):
+        '''Register a counter, returns a new Counter unless read is given'''
+        counter = read if read is not None else Counter()
+        self._counters[name] = counter
+        return counter
+
+    def gauge(self, name, read):
+        '''Register a gauge read by calling read()'''
+        self._gauges[name] = read
+
+    def histogram(self, name):
+        '''Register and return a new histogram'''
+        histogram = Histogram()
+        self._histograms[name] = histogram
+        return histogram
+
+    def snapshot(self):
+        '''Current values as a dict with the time, counters, gauges and histogram summaries'''
+        return {
+            'time': self._clock(),
+            'counters': {name: counter.value if isinstance(counter, Counter) else counter()
+                         for name, counter in self._counters.items()},
+            'gauges': {name: read() for name, read in self._gauges.items()},
+            'histograms': {name: histogram.snapshot() for name, histogram in self._histograms.items()},
+        }
+
+
+def rates(previous, current):
+    '''Per second rates of the counters between two snapshots'''
+    elapsed = current['time'] - previous['time']
+    if elapsed <= 0:
+        return {}
+    before = previous['counters']
+    return {name: (value - before.get(name, 0)) / elapsed for name, value in current['counters'].items()}
+
+
+def instrument_assembler(metrics, prefix, assembler):
+    '''Register the frame and payload counters of an assembler and the occupancy of its pool'''
+    metrics.counter(f'{prefix}.frames', lambda: assembler.frames)
+    metrics.counter(f'{prefix}.dropped', lambda: assembler.dropped)
+    metrics.counter(f'{prefix}.missing_eof', lambda: assembler.missing_eof)
+    metrics.counter(f'{prefix}.invalid_payloads', lambda: assembler.invalid_payloads)
+    metrics.counter(f'{prefix}.error_payloads', lambda: assembler.error_payloads)
+    pool = assembler.pool
+    metrics.gauge(f'{prefix}.pool_in_use', lambda: pool.allocations - pool.free)
+    metrics.gauge(f'{prefix}.pool_free', lambda: pool.free)
+
+
+def instrument_reader(metrics, prefix, reader):
+    '''Register the counters of a StreamReader and its assembler, records the transfer latency'''
+    metrics.counter(f'{prefix}.transfers', lambda: reader.transfers)
+    metrics.counter(f'{prefix}.bytes', lambda: reader.bytes)
+    reader.latency = metrics.histogram(f'{prefix}.transfer_latency')
+    instrument_assembler(metrics, prefix, reader.assembler)
+
+
+def instrument_engine(metrics, prefix, engine):
+    '''Register the counters of a TransferEngine and its assembler, records the transfer latency'''
+    metrics.counter(f'{prefix}.transfers', lambda: engine.transfers)
+    metrics.counter(f'{prefix}.bytes', lambda: engine.bytes)
+    metrics.counter(f'{prefix}.transfer_errors', lambda: engine.transfer_errors)
+    metrics.counter(f'{prefix}.packet_errors', lambda: engine.packet_errors)
+    metrics.gauge(f'{prefix}.in_flight', lambda: engine.in_flight)
+    engine.latency = metrics.histogram(f'{prefix}.transfer_latency')
+    instrument_assembler(metrics, prefix, engine.assembler)
+
+
+def instrument_capture(metrics, manager):
+    '''Register the readers and merged queue statistics of every camera of a CaptureManager'''
+    for name in manager.cameras:
+        stats = manager.stats(name)
+        instrument_reader(metrics, name, manager.reader(name))
+        metrics.counter(f'{name}.queue_dropped', lambda stats=stats: stats.dropped)
+        metrics.gauge(f'{name}.queued', lambda stats=stats: stats.queued)
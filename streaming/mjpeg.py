@@ -0,0 +1,224 @@
+'''This module contains MJPEG frame extraction, Huffman table fix-up and the ordered decode pool
+
+Many UVC cameras send MJPEG frames without DHT segments and rely on the decoder to use the
+standard Huffman tables of the JPEG specification (ITU T.81 K.3), which are inserted here.
+Decoding uses a pluggable callable, the decoders provided need OpenCV or Pillow.
+'''
+import collections
+import concurrent.futures
+
+SOI = b'\xff\xd8'
+EOI = b'\xff\xd9'
+
+# Markers
+MARKER_DHT = 0xC4
+MARKER_SOS = 0xDA
+MARKER_TEM = 0x01
+MARKER_RST0 = 0xD0
+MARKER_RST7 = 0xD7
+
+# Standard Huffman tables: (table class and id, code counts per length, symbol values)
+_DC_LUMINANCE = (0x00, (0, 1, 5, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0), tuple(range(12)))
+_DC_CHROMINANCE = (0x01, (0, 3, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0), tuple(range(12)))
+_AC_LUMINANCE = (0x10, (0, 2, 1, 3, 3, 2, 4, 3, 5, 5, 4, 4, 0, 0, 1, 0x7D), (
+    0x01, 0x02, 0x03, 0x00, 0x04, 0x11, 0x05, 0x12, 0x21, 0x31, 0x41, 0x06, 0x13, 0x51, 0x61, 0x07,
+    0x22, 0x71, 0x14, 0x32, 0x81, 0x91, 0xA1, 0x08, 0x23, 0x42, 0xB1, 0xC1, 0x15, 0x52, 0xD1, 0xF0,
+    0x24, 0x33, 0x62, 0x72, 0x82, 0x09, 0x0A, 0x16, 0x17, 0x18, 0x19, 0x1A, 0x25, 0x26, 0x27, 0x28,
+    0x29, 0x2A, 0x34, 0x35, 0x36, 0x37, 0x38, 0x39, 0x3A, 0x43, 0x44, 0x45, 0x46, 0x47, 0x48, 0x49,
+    0x4A, 0x53, 0x54, 0x55, 0x56, 0x57, 0x58, 0x59, 0x5A, 0x63, 0x64, 0x65, 0x66, 0x67, 0x68, 0x69,
+    0x6A, 0x73, 0x74, 0x75, 0x76, 0x77, 0x78, 0x79, 0x7A, 0x83, 0x84, 0x85, 0x86, 0x87, 0x88, 0x89,
+    0x8A, 0x92, 0x93, 0x94, 0x95, 0x96, 0x97, 0x98, 0x99, 0x9A, 0xA2, 0xA3, 0xA4, 0xA5, 0xA6, 0xA7,
+    0xA8, 0xA9, 0xAA, 0xB2, 0xB3, 0xB4, 0xB5, 0xB6, 0xB7, 0xB8, 0xB9, 0xBA, 0xC2, 0xC3, 0xC4, 0xC5,
+    0xC6, 0xC7, 0xC8, 0xC9, 0xCA, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9, 0xDA, 0xE1, 0xE2,
+    0xE3, 0xE4, 0xE5, 0xE6, 0xE7, 0xE8, 0xE9, 0xEA, 0xF1, 0xF2, 0xF3, 0xF4, 0xF5, 0xF6, 0xF7, 0xF8,
+    0xF9, 0xFA
+))
+_AC_CHROMINANCE = (0x11, (0, 2, 1, 2, 4, 4, 3, 4, 7, 5, 4, 4, 0, 1, 2, 0x77), (
+    0x00, 0x01, 0x02, 0x03, 0x11, 0x04, 0x05, 0x21, 0x31, 0x06, 0x12, 0x41, 0x51, 0x07, 0x61, 0x71,
+    0x13, 0x22, 0x32, 0x81, 0x08, 0x14, 0x42, 0x91, 0xA1, 0xB1, 0xC1, 0x09, 0x23, 0x33, 0x52, 0xF0,
+    0x15, 0x62, 0x72, 0xD1, 0x0A, 0x16, 0x24, 0x34, 0xE1, 0x25, 0xF1, 0x17, 0x18, 0x19, 0x1A, 0x26,
+    0x27, 0x28, 0x29, 0x2A, 0x35, 0x36, 0x37, 0x38, 0x39, 0x3A, 0x43, 0x44, 0x45, 0x46, 0x47, 0x48,
+    0x49, 0x4A, 0x53, 0x54, 0x55, 0x56, 0x57, 0x58, 0x59, 0x5A, 0x63, 0x64, 0x65, 0x66, 0x67, 0x68,
+    0x69, 0x6A, 0x73, 0x74, 0x75, 0x76, 0x77, 0x78, 0x79, 0x7A, 0x82, 0x83, 0x84, 0x85, 0x86, 0x87,
+    0x88, 0x89, 0x8A, 0x92, 0x93, 0x94, 0x95, 0x96, 0x97, 0x98, 0x99, 0x9A, 0xA2, 0xA3, 0xA4, 0xA5,
+    0xA6, 0xA7, 0xA8, 0xA9, 0xAA, 0xB2, 0xB3, 0xB4, 0xB5, 0xB6, 0xB7, 0xB8, 0xB9, 0xBA, 0xC2, 0xC3,
+    0xC4, 0xC5, 0xC6, 0xC7, 0xC8, 0xC9, 0xCA, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9, 0xDA,
+    0xE2, 0xE3, 0xE4, 0xE5, 0xE6, 0xE7, 0xE8, 0xE9, 0xEA, 0xF2, 0xF3, 0xF4, 0xF5, 0xF6, 0xF7, 0xF8,
+    0xF9, 0xFA
+))
+
+
+def _dht_segment(tables):
+    body = bytearray()
+    for table_id, counts, values in tables:
+        body.append(table_id)
+        body += bytes(counts)
+        body += bytes(values)
+    return b'\xff' + bytes((MARKER_DHT,)) + (len(body) + 2).to_bytes(2, 'big') + bytes(body)
+
+
+# DHT segment holding the four standard tables
+STANDARD_DHT = _dht_segment((_DC_LUMINANCE, _AC_LUMINANCE, _DC_CHROMINANCE, _AC_CHROMINANCE))
+
+
+def find_jpeg(buffer, length=None):
+    '''(start, end) of the JPEG image between the first SOI and the last EOI, None if there is none'''
+    if length is None:
+        length = len(buffer)
+    start = buffer.find(SOI, 0, length)
+    if start < 0:
+        return None
+    end = buffer.rfind(EOI, start + 2, length)
+    if end < 0:
+        return None
+    return start, end + 2
+
+
+def scan_header(jpeg):
+    '''Walk the marker segments before the scan, returns (has DHT, offset of SOS) or None if malformed'''
+    length = len(jpeg)
+    position = 2
+    has_dht = False
+    while position + 4 <= length:
+        if jpeg[position] != 0xFF:
+            return None
+        marker = jpeg[position + 1]
+        if marker == 0xFF:
+            # Fill byte
+            position += 1
+            continue
+        if marker == MARKER_SOS:
+            return has_dht, position
+        if marker == MARKER_TEM or MARKER_RST0 <= marker <= MARKER_RST7:
+            position += 2
+            continue
+        if marker == MARKER_DHT:
+            has_dht = True
+        position += 2 + ((jpeg[position + 2] << 8) | jpeg[position + 3])
+    return None
+
+
+def extract_jpeg(frame):
+    '''JPEG image of an assembled MJPEG frame with the standard Huffman tables inserted if missing
+
+    Returns a view of the frame buffer when no fix-up is needed, bytes otherwise, and None if
+    the frame holds no complete JPEG image.
+    '''
+    buffer = frame.buffer
+    bounds = find_jpeg(buffer, len(frame))
+    if bounds is None:
+        return None
+    jpeg = memoryview(buffer)[bounds[0]:bounds[1]]
+    header = scan_header(jpeg)
+    if header is None:
+        return None
+    has_dht, sos = header
+    if has_dht:
+        return jpeg
+    return b''.join((jpeg[:sos], STANDARD_DHT, jpeg[sos:]))
+
+
+def decode_with_opencv(jpeg):
+    '''Decode a JPEG image to a BGR array with OpenCV'''
+    import cv2
+    import numpy as np
+    return cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def decode_with_pillow(jpeg):
+    '''Decode a JPEG image to an RGB array with Pillow'''
+    import io
+    import numpy as np
+    from PIL import Image
+    with Image.open(io.BytesIO(jpeg)) as image:
+        return np.asarray(image.convert('RGB'))
+
+
+class MJPEGDecodePool:
+    '''Decodes MJPEG frames on a bounded pool of workers delivering the images in frame order
+
+    At most depth frames are in flight, submit() blocks on the oldest one beyond that. Frames
+    are released to their pool once their image is decoded. Results are (frame, image, error)
+    triples: error is None when the frame was decoded, otherwise it is the exception decode
+    raised and image is None. decode must be a module level function when use_processes is set.
+    '''
+
+    def __init__(self, decode=decode_with_opencv, workers=4, use_processes=False, depth=None):
+        self._decode = decode
+        self._use_processes = use_processes
+        self._depth = depth if depth is not None else 2 * workers
+        if use_processes:
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self._pending = collections.deque()
+        self._invalid = 0
+
+    def submit(self, frame):
+        '''Queue a frame for decoding, returns the (frame, image, error) triples completed in order so far
+
+        The returned frames are already released, only their metadata may be used.
+        '''
+        jpeg = extract_jpeg(frame)
+        if jpeg is None:
+            self._invalid += 1
+            frame.release()
+            return self._collect(False)
+        if self._use_processes and isinstance(jpeg, memoryview):
+            # Process workers get a pickled copy, the buffer can go back to the pool at once
+            jpeg = jpeg.tobytes()
+        if not isinstance(jpeg, memoryview):
+            # The image no longer refers to the frame buffer
+            frame.release()
+        self._pending.append((frame, self._executor.submit(self._decode, jpeg)))
+        return self._collect(len(self._pending) > self._depth)
+
+    def _collect(self, wait):
+        '''Pop the finished decodes at the head of the queue, waiting for the first one if asked'''
+        completed = []
+        while self._pending and (wait or self._pending[0][1].done()):
+            frame, future = self._pending.popleft()
+            image = error = None
+            try:
+                image = future.result()
+            except Exception as exception:
+                # Delivered in order with its frame, the frames completed with it are not lost
+                error = exception
+            frame.release()
+            completed.append((frame, image, error))
+            wait = False
+        return completed
+
+    def drain(self):
+        '''Wait for every queued frame, returns the remaining (frame, image, error) triples in order'''
+        completed = []
+        while self._pending:
+            completed += self._collect(True)
+        return completed
+
+    def map(self, frames):
+        '''Generator of (frame, image, error) triples in frame order'''
+        for frame in frames:
+            yield from self.submit(frame)
+        yield from self.drain()
+
+    def close(self):
+        '''Wait for the queued frames and shut the workers down'''
+        self.drain()
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def pending(self):
+        '''Number of frames queued or being decoded'''
+        return len(self._pending)
+
+    @property
+    def invalid(self):
+        '''Number of frames without a complete JPEG image'''
+        return self._invalid
@@ -0,0 +1,362 @@
+'''This module contains the video probe / commit negotiation and streaming mode selection'''
+import struct
+from descriptors.descriptor_constants import *
+from .engine import packet_size
+
+# Frame intervals are in 100 ns units
+INTERVALS_PER_SECOND = 10000000
+
+# bmHint bit asking the device to keep dwFrameInterval fixed
+HINT_FRAME_INTERVAL = 0x0001
+
+# Endpoint transfer types in bmAttributes
+TRANSFER_TYPE_MASK = 0x03
+TRANSFER_TYPE_ISOCHRONOUS = 0x01
+TRANSFER_TYPE_BULK = 0x02
+
+# Frame descriptor sub type of every format that can be negotiated
+FORMAT_FRAME_SUB_TYPES = {
+    VS_FORMAT_UNCOMPRESSED: VS_FRAME_UNCOMPRESSED,
+    VS_FORMAT_MJPEG: VS_FRAME_MJPEG,
+    VS_FORMAT_FRAME_BASED: VS_FRAME_FRAME_BASED,
+}
+
+
+class StreamingControl:
+    '''Video probe and commit control block, its size depends on the UVC version of the device'''
+
+    LAYOUT_10 = struct.Struct('<HBBIHHHHHII')
+    LAYOUT_11 = struct.Struct('<HBBIHHHHHIIIBBBB')
+    LAYOUT_15 = struct.Struct('<HBBIHHHHHIIIBBBBBBBBHQ')
+    FIELDS_10 = (
+        'bmHint', 'bFormatIndex', 'bFrameIndex', 'dwFrameInterval', 'wKeyFrameRate', 'wPFrameRate',
+        'wCompQuality', 'wCompWindowSize', 'wDelay', 'dwMaxVideoFrameSize', 'dwMaxPayloadTransferSize'
+    )
+    FIELDS_11 = FIELDS_10 + ('dwClockFrequency', 'bmFramingInfo', 'bPreferedVersion', 'bMinVersion', 'bMaxVersion')
+    FIELDS_15 = FIELDS_11 + (
+        'bUsage', 'bBitDepthLuma', 'bmSettings', 'bMaxNumberOfRefFramesPlus1', 'bmRateControlModes',
+        'bmLayoutPerStream'
+    )
+    __slots__ = FIELDS_15 + ('_layout',)
+
+    def __init__(self, bcd_uvc=0x0110, **fields):
+        if bcd_uvc >= 0x0150:
+            self._layout = self.LAYOUT_15
+        elif bcd_uvc >= 0x0110:
+            self._layout = self.LAYOUT_11
+        else:
+            self._layout = self.LAYOUT_10
+        for field in self.FIELDS_15:
+            setattr(self, field, fields.pop(field, 0))
+        if fields:
+            raise TypeError(f"Unknown streaming control fields {sorted(fields)}")
+
+    @classmethod
+    def Unpack(cls, data, bcd_uvc):
+        '''Control block from the bytes returned by GET_CUR'''
+        control = cls(bcd_uvc)
+        # Some devices return a UVC 1.0 sized block whatever their version
+        layout = control._layout
+        for candidate in (cls.LAYOUT_15, cls.LAYOUT_11, cls.LAYOUT_10):
+            if candidate.size <= layout.size and candidate.size <= len(data):
+                layout = candidate
+                break
+        fields = cls.FIELDS_15[:len(layout.format) - 1]
+        for field, value in zip(fields, layout.unpack_from(bytes(data))):
+            setattr(control, field, value)
+        return control
+
+    def pack(self):
+        '''Bytes of the control block sent with SET_CUR'''
+        return self._layout.pack(*(getattr(self, field) for field in self.FIELDS_15[:len(self._layout.format) - 1]))
+
+    @property
+    def size(self):
+        '''wLength of the control block'''
+        return self._layout.size
+
+
+class StreamMode:
+    '''Format, frame and frame interval that can be requested from the device'''
+
+    __slots__ = ('_format_index', '_format_sub_type', '_frame_index', '_width', '_height', '_frame_interval',
+                 '_bandwidth', '_format', '_frame')
+
+    def __init__(self, format_node, frame_node, frame_interval, bandwidth):
+        frame = frame_node.descriptor
+        self._format = format_node
+        self._frame = frame_node
+        self._format_index = format_node.descriptor.bFormatIndex
+        self._format_sub_type = format_node.bDescriptorSubType
+        self._frame_index = frame.bFrameIndex
+        self._width = frame.wWidth
+        self._height = frame.wHeight
+        self._frame_interval = frame_interval
+        self._bandwidth = bandwidth
+
+    @property
+    def format(self):
+        '''Format node of the mode'''
+        return self._format
+
+    @property
+    def frame(self):
+        '''Frame node of the mode'''
+        return self._frame
+
+    @property
+    def bFormatIndex(self):
+        '''Index of the format descriptor'''
+        return self._format_index
+
+    @property
+    def format_sub_type(self):
+        '''Descriptor sub type of the format (e.g. VS_FORMAT_MJPEG)'''
+        return self._format_sub_type
+
+    @property
+    def bFrameIndex(self):
+        '''Index of the frame descriptor'''
+        return self._frame_index
+
+    @property
+    def wWidth(self):
+        '''Width of the frames in pixels'''
+        return self._width
+
+    @property
+    def wHeight(self):
+        '''Height of the frames in pixels'''
+        return self._height
+
+    @property
+    def dwFrameInterval(self):
+        '''Frame interval in 100 ns units'''
+        return self._frame_interval
+
+    @property
+    def fps(self):
+        '''Frames per second'''
+        return INTERVALS_PER_SECOND / self._frame_interval
+
+    @property
+    def bandwidth(self):
+        '''Upper bound of the stream data rate in bytes per second'''
+        return self._bandwidth
+
+    def __repr__(self):
+        return (f"StreamMode(format={self._format_index}, frame={self._frame_index}, "
+                f"{self._width}x{self._height}@{self.fps:.2f}, {self._bandwidth / 1e6:.1f} MB/s)")
+
+
+def select_interval(frame, max_interval=None):
+    '''Longest frame interval of the frame descriptor that is at most max_interval (None if there is none)
+
+    Without max_interval the longest interval of the frame is returned.
+    '''
+    if frame.bFrameIntervalType:
+        intervals = [interval for interval in frame.dwFrameInterval
+                     if max_interval is None or interval <= max_interval]
+        return max(intervals) if intervals else None
+    if max_interval is not None and frame.dwMinFrameInterval > max_interval:
+        return None
+    longest = frame.dwMaxFrameInterval if max_interval is None else min(frame.dwMaxFrameInterval, int(max_interval))
+    step = frame.dwFrameIntervalStep
+    if not step:
+        return frame.dwMinFrameInterval
+    return frame.dwMinFrameInterval + (longest - frame.dwMinFrameInterval) // step * step
+
+
+def shortest_interval(frame):
+    '''Shortest frame interval of the frame descriptor, the one dwMaxBitRate applies to'''
+    if frame.bFrameIntervalType:
+        return min(frame.dwFrameInterval)
+    return frame.dwMinFrameInterval
+
+
+def frame_bandwidth(frame, frame_interval):
+    '''Upper bound of the data rate in bytes per second of a frame descriptor at the given interval'''
+    return frame.dwMaxBitRate / 8 * shortest_interval(frame) / frame_interval
+
+
+def streaming_interfaces(configuration):
+    '''Interface nodes of the video streaming interfaces of a configuration node'''
+    interfaces = []
+    for interface in configuration.interfaces.values():
+        settings = interface.alternate_settings
+        if settings and settings[min(settings)].bInterfaceSubClass == SC_VIDEOSTREAMING:
+            interfaces.append(interface)
+    return interfaces
+
+
+def find_modes(interface, min_width=0, min_height=0, min_fps=0, preferred_formats=()):
+    '''Modes of a video streaming interface node meeting the requirement, best candidate first
+
+    Modes are ordered by the rank of their format in preferred_formats (formats not listed
+    come last), then by bandwidth, then by resolution. Each frame contributes its longest
+    frame interval that still reaches min_fps.
+    '''
+    max_interval = int(INTERVALS_PER_SECOND // min_fps) if min_fps else None
+    setting = interface.alternate_setting(min(interface.alternate_settings))
+    ranked = []
+    for format_node in setting.formats.values():
+        sub_type = format_node.bDescriptorSubType
+        if sub_type not in FORMAT_FRAME_SUB_TYPES:
+            continue
+        rank = preferred_formats.index(sub_type) if sub_type in preferred_formats else len(preferred_formats)
+        for frame_node in format_node.frames.values():
+            frame = frame_node.descriptor
+            if frame.wWidth < min_width or frame.wHeight < min_height:
+                continue
+            interval = select_interval(frame, max_interval)
+            if interval is None:
+                continue
+            mode = StreamMode(format_node, frame_node, interval, frame_bandwidth(frame, interval))
+            ranked.append(((rank, mode.bandwidth, mode.wWidth * mode.wHeight), mode))
+    ranked.sort(key=lambda entry: entry[0])
+    return [mode for _, mode in ranked]
+
+
+def select_alternate_setting(interface, payload_size):
+    '''(bAlternateSetting, endpoint node) able to carry payload_size bytes per service interval
+
+    A bulk endpoint carries any payload size. Among isochronous alternate settings the one
+    with the smallest sufficient packet size wins. Returns None if no setting fits.
+    '''
+    best = None
+    for number, setting in interface.alternate_settings.items():
+        for endpoint in setting.endpoints:
+            descriptor = endpoint.descriptor
+            transfer_type = descriptor.bmAttributes & TRANSFER_TYPE_MASK
+            if transfer_type == TRANSFER_TYPE_BULK:
+                return number, endpoint
+            if transfer_type != TRANSFER_TYPE_ISOCHRONOUS:
+                continue
+            size = packet_size(descriptor.wMaxPacketSize)
+            if size >= payload_size and (best is None or size < best[0]):
+                best = (size, number, endpoint)
+    if best is None:
+        return None
+    return best[1], best[2]
+
+
+class Negotiation:
+    '''Outcome of a probe / commit negotiation'''
+
+    __slots__ = ('_mode', '_control', '_alternate_setting', '_endpoint')
+
+    def __init__(self, mode, control, alternate_setting, endpoint):
+        self._mode = mode
+        self._control = control
+        self._alternate_setting = alternate_setting
+        self._endpoint = endpoint
+
+    @property
+    def mode(self):
+        '''The mode requested'''
+        return self._mode
+
+    @property
+    def control(self):
+        '''The committed control block as returned by the device'''
+        return self._control
+
+    @property
+    def alternate_setting(self):
+        '''bAlternateSetting selected for streaming'''
+        return self._alternate_setting
+
+    @property
+    def endpoint(self):
+        '''Endpoint node of the selected alternate setting'''
+        return self._endpoint
+
+    @property
+    def payload_size(self):
+        '''Largest payload the device sends (dwMaxPayloadTransferSize)'''
+        return self._control.dwMaxPayloadTransferSize
+
+    @property
+    def max_frame_size(self):
+        '''Largest frame the device sends (dwMaxVideoFrameSize)'''
+        return self._control.dwMaxVideoFrameSize
+
+
+class StreamNegotiator:
+    '''Runs VS_PROBE_CONTROL / VS_COMMIT_CONTROL on a device through pyusb style control transfers
+
+    device needs ctrl_transfer() and set_interface_altsetting(), configuration is the root
+    node of the parsed descriptor tree of the device.
+    '''
+
+    def __init__(self, device, configuration, interface_number=None, timeout=1000):
+        self._device = device
+        self._configuration = configuration
+        if interface_number is None:
+            interfaces = streaming_interfaces(configuration)
+            if not interfaces:
+                raise ValueError("Configuration has no video streaming interface")
+            self._interface = interfaces[0]
+        else:
+            self._interface = configuration.interface(interface_number)
+        self._bcd_uvc = self._find_bcd_uvc()
+        self._timeout = timeout
+
+    def _find_bcd_uvc(self):
+        for interface in self._configuration.interfaces.values():
+            for setting in interface.alternate_settings.values():
+                if setting.bInterfaceSubClass == SC_VIDEOCONTROL and setting.header is not None:
+                    return setting.header.descriptor.bcdUVC
+        return 0x0100
+
+    def get(self, selector=VS_PROBE_CONTROL, request=GET_CUR):
+        '''Read a probe or commit control block'''
+        data = self._device.ctrl_transfer(REQUEST_TYPE_GET_INTERFACE, request, selector << 8,
+                                          self._interface.interface_number,
+                                          StreamingControl(self._bcd_uvc).size, self._timeout)
+        return StreamingControl.Unpack(data, self._bcd_uvc)
+
+    def set(self, control, selector=VS_PROBE_CONTROL):
+        '''Write a probe or commit control block'''
+        self._device.ctrl_transfer(REQUEST_TYPE_SET_INTERFACE, SET_CUR, selector << 8,
+                                   self._interface.interface_number, control.pack(), self._timeout)
+
+    def probe(self, mode):
+        '''Propose a mode, returns the control block the device settled on'''
+        control = StreamingControl(self._bcd_uvc, bmHint=HINT_FRAME_INTERVAL, bFormatIndex=mode.bFormatIndex,
+                                   bFrameIndex=mode.bFrameIndex, dwFrameInterval=mode.dwFrameInterval)
+        self.set(control, VS_PROBE_CONTROL)
+        return self.get(VS_PROBE_CONTROL)
+
+    def negotiate(self, min_width=0, min_height=0, min_fps=0, preferred_formats=()):
+        '''Commit the lowest bandwidth mode meeting the requirement and select its alternate setting
+
+        Modes the device changes during probe or whose payload size no alternate setting can
+        carry are skipped. Raises ValueError if no mode can be committed.
+        '''
+        for mode in find_modes(self._interface, min_width, min_height, min_fps, preferred_formats):
+            control = self.probe(mode)
+            if control.bFormatIndex != mode.bFormatIndex or control.bFrameIndex != mode.bFrameIndex:
+                continue
+            selected = select_alternate_setting(self._interface, control.dwMaxPayloadTransferSize)
+            if selected is None:
+                continue
+            self.set(control, VS_COMMIT_CONTROL)
+            alternate_setting, endpoint = selected
+            self._device.set_interface_altsetting(self._interface.interface_number, alternate_setting)
+            return Negotiation(mode, control, alternate_setting, endpoint)
+        raise ValueError("No streaming mode meets the requirement")
+
+    def stop(self):
+        '''Return the streaming interface to the zero bandwidth alternate setting'''
+        self._device.set_interface_altsetting(self._interface.interface_number, 0)
+
+    @property
+    def interface(self):
+        '''Interface node of the video streaming interface'''
+        return self._interface
+
+    @property
+    def bcdUVC(self):
+        '''UVC version the control blocks are sized for'''
+        return self._bcd_uvc
@@ -0,0 +1,290 @@
+'''This module contains the UVC payload header decoding and the frame assembler'''
+import struct
+import time
+from .buffer_pool import FrameBufferPool
+
+# Payload header bmHeaderInfo bits
+HEADER_FID = 0x01
+HEADER_EOF = 0x02
+HEADER_PTS = 0x04
+HEADER_SCR = 0x08
+HEADER_RES = 0x10
+HEADER_STI = 0x20
+HEADER_ERR = 0x40
+HEADER_EOH = 0x80
+
+# Optional header fields, PTS is followed by SCR when both are present
+PTS_LAYOUT = struct.Struct('<I')
+SCR_LAYOUT = struct.Struct('<IH')
+
+# Mask of the 11 bit USB start of frame counter carried in the SCR
+SOF_MASK = 0x07FF
+
+# Returned by FrameAssembler.feed when no frame was completed, avoids allocating per payload
+_NO_FRAMES = ()
+
+
+def parse_payload_header(payload):
+    '''Decode a payload header into (header length, bmHeaderInfo, PTS, SCR STC, SCR SOF)
+
+    Fields that are not present are None. Returns None if the payload does not start
+    with a valid header.
+    '''
+    if len(payload) < 2:
+        return None
+    header_length = payload[0]
+    if header_length < 2 or header_length > len(payload):
+        return None
+    info = payload[1]
+    pts = stc = sof = None
+    offset = 2
+    if info & HEADER_PTS and header_length >= offset + 4:
+        pts, = PTS_LAYOUT.unpack_from(payload, offset)
+        offset += 4
+    if info & HEADER_SCR and header_length >= offset + 6:
+        stc, sof = SCR_LAYOUT.unpack_from(payload, offset)
+        sof &= SOF_MASK
+    return header_length, info, pts, stc, sof
+
+
+class Frame:
+    '''A video frame assembled from one or more payloads'''
+
+    __slots__ = ('_buffer', '_length', '_fid', '_pts', '_stc', '_sof', '_sequence', '_eof', '_pool', '_timestamp')
+
+    def __init__(self, buffer, length, fid, pts, stc, sof, sequence, eof, pool=None, timestamp=None):
+        self._buffer = buffer
+        self._length = length
+        self._fid = fid
+        self._pts = pts
+        self._stc = stc
+        self._sof = sof
+        self._sequence = sequence
+        self._eof = eof
+        self._pool = pool
+        self._timestamp = timestamp
+
+    def release(self):
+        '''Return the buffer to its pool, the frame data must not be used afterwards'''
+        if self._pool is not None and self._buffer is not None:
+            self._pool.release(self._buffer)
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    @property
+    def data(self):
+        '''View of the frame bytes'''
+        return memoryview(self._buffer)[:self._length]
+
+    @property
+    def buffer(self):
+        '''The buffer holding the frame (may be larger than the frame)'''
+        return self._buffer
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def fid(self):
+        '''Frame ID bit of the payloads making up this frame'''
+        return self._fid
+
+    @property
+    def pts(self):
+        '''Presentation time stamp in device clock ticks (None if the device sent none)'''
+        return self._pts
+
+    @property
+    def scr(self):
+        '''Last source clock reference of the frame as (STC, SOF), None if the device sent none'''
+        if self._stc is None:
+            return None
+        return self._stc, self._sof
+
+    @property
+    def sequence(self):
+        '''Number of the frame in the stream, counting dropped frames'''
+        return self._sequence
+
+    @property
+    def timestamp(self):
+        '''Host time of the frame in seconds of the assembler clock (time.monotonic by default)
+
+        This is the recovered capture time of the PTS when the assembler has a clock recovery,
+        the completion time of the frame otherwise.
+        '''
+        return self._timestamp
+
+    @timestamp.setter
+    def timestamp(self, timestamp):
+        self._timestamp = timestamp
+
+    @property
+    def eof(self):
+        '''Whether the frame was ended by an EOF bit rather than a FID toggle'''
+        return self._eof
+
+
+class FrameAssembler:
+    '''Reassembles frames from UVC payloads
+
+    Payload headers are stripped and the payload data is copied straight into a frame buffer
+    taken from the pool. Frame boundaries are detected from the EOF bit and from FID toggles.
+    Frames with the ERR bit set on any payload, frames the transport lost data of
+    (mark_error()), frames overflowing the buffer, frames shorter than expected_size (when
+    given) and frames arriving while the pool is exhausted are dropped, their buffer is
+    reused for the next frame.
+
+    Without a pool frames get a fresh buffer each, consumers release() frames to reuse them.
+    Frames are stamped with clock() when they complete. With a clock_recovery (ClockRecovery)
+    the SCR of the payloads is fed to it and frames are stamped with the host time of their PTS
+    instead, the recovery should use the same clock.
+    '''
+
+    def __init__(self, max_frame_size, expected_size=None, pool=None, clock=time.monotonic, clock_recovery=None):
+        self._pool = pool if pool is not None else FrameBufferPool(max_frame_size, 0, grow=True)
+        self._max_frame_size = min(max_frame_size, self._pool.buffer_size)
+        self._expected_size = expected_size
+        self._clock = clock
+        self._clock_recovery = clock_recovery
+        self._buffer = None
+        self._view = None
+        self._length = 0
+        self._fid = None
+        self._pts = None
+        self._stc = None
+        self._sof = None
+        self._error = False
+        # Data was lost before any of the frame in progress arrived, it may have opened the next frame
+        self._lost_start = False
+        self._sequence = 0
+        self._frames = 0
+        self._dropped = 0
+        self._missing_eof = 0
+        self._invalid_payloads = 0
+        self._error_payloads = 0
+
+    def feed(self, payload):
+        '''Add one payload (header included), returns the frames it completed'''
+        header = parse_payload_header(payload)
+        if header is None:
+            self._invalid_payloads += 1
+            return _NO_FRAMES
+        header_length, info, pts, stc, sof = header
+        fid = info & HEADER_FID
+        completed = _NO_FRAMES
+        if fid != self._fid and self._fid is not None and (self._length or self._error and not self._lost_start):
+            # The FID toggled without an EOF, the frame in progress is finished
+            self._missing_eof += 1
+            completed = self._finish(False)
+        self._fid = fid
+        if info & HEADER_ERR:
+            self._error_payloads += 1
+            self._error = True
+        if self._pts is None:
+            self._pts = pts
+        if stc is not None:
+            self._stc = stc
+            self._sof = sof
+            if self._clock_recovery is not None:
+                self._clock_recovery.sample(stc, sof)
+        data_length = len(payload) - header_length
+        if data_length and not self._error:
+            if self._buffer is None:
+                self._buffer = self._pool.acquire()
+                self._view = memoryview(self._buffer) if self._buffer is not None else None
+            end = self._length + data_length
+            if self._buffer is None or end > self._max_frame_size:
+                self._error = True
+            else:
+                self._view[self._length:end] = memoryview(payload)[header_length:]
+                self._length = end
+        if info & HEADER_EOF:
+            frame = self._finish(True)
+            completed = completed + frame if completed else frame
+        return completed
+
+    def _finish(self, eof):
+        '''Close the frame in progress, returns a one element tuple with it or nothing if dropped'''
+        sequence = self._sequence
+        self._sequence += 1
+        length = self._length
+        short = self._expected_size is not None and length != self._expected_size
+        if self._error or short or not length:
+            self._dropped += 1
+            frame = _NO_FRAMES
+        else:
+            self._frames += 1
+            timestamp = None
+            if self._clock_recovery is not None and self._pts is not None:
+                timestamp = self._clock_recovery.host_time(self._pts)
+            if timestamp is None:
+                timestamp = self._clock()
+            frame = (Frame(self._buffer, length, self._fid, self._pts, self._stc, self._sof, sequence, eof,
+                           self._pool, timestamp),)
+            self._buffer = None
+            self._view = None
+        self._length = 0
+        self._pts = None
+        self._stc = None
+        self._sof = None
+        self._error = False
+        self._lost_start = False
+        return frame
+
+    def mark_error(self):
+        '''Drop the frame in progress like an ERR bit would, for data the transport lost
+
+        When nothing of the frame in progress arrived yet, the frame the next payload starts is
+        dropped instead.
+        '''
+        self._error = True
+        if not self._length:
+            self._lost_start = True
+
+    def reset(self):
+        '''Discard the frame in progress (e.g. after changing the alternate setting)'''
+        if self._clock_recovery is not None:
+            self._clock_recovery.reset()
+        self._length = 0
+        self._fid = None
+        self._pts = None
+        self._stc = None
+        self._sof = None
+        self._error = False
+        self._lost_start = False
+
+    @property
+    def pool(self):
+        '''Pool the frame buffers are taken from'''
+        return self._pool
+
+    @property
+    def frames(self):
+        '''Number of frames completed'''
+        return self._frames
+
+    @property
+    def dropped(self):
+        '''Number of frames dropped for errors, overflow, short length or an exhausted pool'''
+        return self._dropped
+
+    @property
+    def missing_eof(self):
+        '''Number of frames ended by a FID toggle without an EOF'''
+        return self._missing_eof
+
+    @property
+    def invalid_payloads(self):
+        '''Number of payloads without a valid header'''
+        return self._invalid_payloads
+
+    @property
+    def error_payloads(self):
+        '''Number of payloads with the ERR bit set'''
+        return self._error_payloads
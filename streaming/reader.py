@@ -0,0 +1,69 @@
+'''This module contains the synchronous reader of the video streaming endpoint'''
+import array
+import time
+
+
+class StreamReader:
+    '''Reads payloads from the video endpoint and feeds them to a frame assembler
+
+    pyusb only reads into array.array objects, so every transfer lands in one reusable
+    staging array and the assembler copies the payload data (without its header) into a
+    pooled frame buffer. No memory is allocated per transfer or per frame in steady state.
+
+    tap, when given, is called with every transfer before assembly (e.g. Recorder.write_payload),
+    the view is only valid during the call.
+    '''
+
+    def __init__(self, endpoint, assembler, transfer_size, timeout=None, latency=None, tap=None):
+        self._endpoint = endpoint
+        self._assembler = assembler
+        self._transfer = array.array('B', bytes(transfer_size))
+        self._view = memoryview(self._transfer)
+        self._timeout = timeout
+        self._transfers = 0
+        self._bytes = 0
+        self._latency = latency
+        self._tap = tap
+
+    def read(self):
+        '''Issue one transfer, returns the frames it completed'''
+        if self._latency is None:
+            length = self._endpoint.read(self._transfer, self._timeout)
+        else:
+            start = time.perf_counter()
+            length = self._endpoint.read(self._transfer, self._timeout)
+            self._latency.record(time.perf_counter() - start)
+        self._transfers += 1
+        self._bytes += length
+        if self._tap is not None:
+            self._tap(self._view[:length])
+        return self._assembler.feed(self._view[:length])
+
+    def __iter__(self):
+        '''Completed frames, forever'''
+        while True:
+            yield from self.read()
+
+    @property
+    def assembler(self):
+        '''The frame assembler fed by this reader'''
+        return self._assembler
+
+    @property
+    def latency(self):
+        '''Histogram recording the duration of each transfer (None for none)'''
+        return self._latency
+
+    @latency.setter
+    def latency(self, latency):
+        self._latency = latency
+
+    @property
+    def transfers(self):
+        '''Number of transfers completed'''
+        return self._transfers
+
+    @property
+    def bytes(self):
+        '''Number of bytes received, payload headers included'''
+        return self._bytes
@@ -0,0 +1,314 @@
+'''This module contains the recorder of raw streams to segmented memory mapped files and its reader
+
+A recording is a directory holding:
+
+- descriptors.bin: the raw configuration descriptor blob of the device
+- segment-NNNNN.dat: the frame or payload bytes, back to back, in preallocated fixed size segments
+- index.bin: a header and one fixed size record per frame or payload (segment, offset, length,
+  timestamp and the stream metadata), so any record is found in O(1)
+'''
+import collections
+import mmap
+import os
+import struct
+import threading
+import time
+from .payload import Frame
+
+INDEX_NAME = 'index.bin'
+DESCRIPTORS_NAME = 'descriptors.bin'
+SEGMENT_NAME = 'segment-{:05}.dat'
+
+INDEX_MAGIC = b'UVCR'
+INDEX_VERSION = 1
+# magic, version, kind, segment size
+INDEX_HEADER = struct.Struct('<4sHHQ')
+# segment, length, offset, timestamp, sequence, pts, stc, sof, flags
+INDEX_RECORD = struct.Struct('<IIQdIIIHBx')
+
+# Kinds of recording
+RECORD_FRAMES = 0
+RECORD_PAYLOADS = 1
+
+# Index record flags
+RECORD_FID = 0x01
+RECORD_EOF = 0x02
+RECORD_PTS = 0x04
+RECORD_SCR = 0x08
+
+DEFAULT_SEGMENT_SIZE = 256 * 1024 * 1024
+
+
+def _preallocate(file, size):
+    try:
+        os.posix_fallocate(file.fileno(), 0, size)
+    except (AttributeError, OSError):
+        file.truncate(size)
+
+
+class Recorder:
+    '''Appends frames or raw payloads to a recording on a background writer thread
+
+    write_frame() and write_payload() only queue the data, the writer copies it into the
+    memory mapped segment. Capture never waits for the disk: once max_pending records are
+    queued new ones are dropped and counted. Frames are owned by the recorder once written
+    and released after the copy, payloads are copied when queued.
+    '''
+
+    def __init__(self, path, descriptors, kind=RECORD_FRAMES, segment_size=DEFAULT_SEGMENT_SIZE, max_pending=64,
+                 clock=time.monotonic):
+        os.makedirs(path, exist_ok=True)
+        self._path = path
+        self._kind = kind
+        self._segment_size = segment_size
+        self._max_pending = max_pending
+        self._clock = clock
+        with open(os.path.join(path, DESCRIPTORS_NAME), 'wb') as file:
+            file.write(bytes(descriptors))
+        self._index = open(os.path.join(path, INDEX_NAME), 'wb')
+        self._index.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, kind, segment_size))
+        self._segment = -1
+        self._segment_file = None
+        self._map = None
+        self._position = 0
+        self._pending = collections.deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._error = None
+        self._recorded = 0
+        self._dropped = 0
+        self._sequence = 0
+        self._thread = threading.Thread(target=self._write, name='recorder', daemon=True)
+        self._thread.start()
+
+    def write_frame(self, frame):
+        '''Queue an assembled frame, returns False if it was dropped'''
+        flags = (RECORD_FID if frame.fid else 0) | (RECORD_EOF if frame.eof else 0)
+        pts = frame.pts
+        if pts is not None:
+            flags |= RECORD_PTS
+        scr = frame.scr
+        if scr is not None:
+            flags |= RECORD_SCR
+        timestamp = frame.timestamp if frame.timestamp is not None else self._clock()
+        return self._queue(frame.data, frame, timestamp, frame.sequence, pts or 0, scr[0] if scr else 0,
+                           scr[1] if scr else 0, flags)
+
+    def write_payload(self, payload, timestamp=None):
+        '''Queue a copy of a raw payload (header included), returns False if it was dropped'''
+        sequence = self._sequence
+        self._sequence += 1
+        return self._queue(bytes(payload), None, self._clock() if timestamp is None else timestamp, sequence, 0, 0, 0,
+                           0)
+
+    def _queue(self, data, frame, *metadata):
+        if len(data) > self._segment_size:
+            raise ValueError(f"A record of {len(data)} bytes does not fit a segment of {self._segment_size} bytes")
+        with self._condition:
+            if self._closed or self._error is not None or len(self._pending) >= self._max_pending:
+                self._dropped += 1
+                if frame is not None:
+                    frame.release()
+                return False
+            self._pending.append((data, frame, metadata))
+            self._condition.notify()
+        return True
+
+    def _write(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    break
+                data, frame, metadata = self._pending[0]
+            try:
+                if self._error is None:
+                    self._store(data, metadata)
+            except Exception as error:
+                self._error = error
+            finally:
+                if frame is not None:
+                    frame.release()
+                with self._condition:
+                    self._pending.popleft()
+                    self._condition.notify_all()
+        self._close_segment()
+
+    def _store(self, data, metadata):
+        length = len(data)
+        if self._map is None or self._position + length > self._segment_size:
+            self._close_segment()
+            self._open_segment()
+        position = self._position
+        self._map[position:position + length] = data
+        timestamp, sequence, pts, stc, sof, flags = metadata
+        self._index.write(INDEX_RECORD.pack(self._segment, length, position, timestamp, sequence, pts, stc, sof,
+                                            flags))
+        self._position = position + length
+        self._recorded += 1
+
+    def _open_segment(self):
+        self._segment += 1
+        self._segment_file = open(os.path.join(self._path, SEGMENT_NAME.format(self._segment)), 'w+b')
+        _preallocate(self._segment_file, self._segment_size)
+        self._map = mmap.mmap(self._segment_file.fileno(), self._segment_size)
+        self._position = 0
+
+    def _close_segment(self):
+        if self._map is None:
+            return
+        self._map.close()
+        # The unused preallocated tail is given back
+        self._segment_file.truncate(self._position)
+        self._segment_file.close()
+        self._map = None
+        self._segment_file = None
+        self._index.flush()
+
+    def close(self):
+        '''Write the queued records and close the files, raises the error that stopped the writer if any'''
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        if not self._index.closed:
+            self._index.close()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def recorded(self):
+        '''Number of records written'''
+        return self._recorded
+
+    @property
+    def dropped(self):
+        '''Number of records dropped because the writer fell behind or failed'''
+        return self._dropped
+
+    @property
+    def pending(self):
+        '''Number of records waiting for the writer'''
+        return len(self._pending)
+
+    @property
+    def segments(self):
+        '''Number of segment files started'''
+        return self._segment + 1
+
+
+class Recording:
+    '''Reads a recording, every record is located in O(1) through the index and read without a copy'''
+
+    def __init__(self, path):
+        self._path = path
+        with open(os.path.join(path, DESCRIPTORS_NAME), 'rb') as file:
+            self._descriptors = file.read()
+        with open(os.path.join(path, INDEX_NAME), 'rb') as file:
+            self._index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._kind, self._segment_size = INDEX_HEADER.unpack_from(self._index)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._index.close()
+            raise ValueError(f"{path} is not a recording")
+        self._count = (len(self._index) - INDEX_HEADER.size) // INDEX_RECORD.size
+        self._maps = {}
+
+    def _record(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"Record {index} out of range")
+        return INDEX_RECORD.unpack_from(self._index, INDEX_HEADER.size + index * INDEX_RECORD.size)
+
+    def _segment(self, segment):
+        segment_map = self._maps.get(segment)
+        if segment_map is None:
+            with open(os.path.join(self._path, SEGMENT_NAME.format(segment)), 'rb') as file:
+                segment_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = segment_map
+        return segment_map
+
+    def _view(self, segment, offset, length):
+        if not length:
+            # The segment of an empty record may itself be empty, which cannot be mapped
+            return memoryview(b'')
+        return memoryview(self._segment(segment))[offset:offset + length]
+
+    def data(self, index):
+        '''View of the bytes of a record'''
+        segment, length, offset = self._record(index)[:3]
+        return self._view(segment, offset, length)
+
+    def timestamp(self, index):
+        '''Host timestamp of a record'''
+        return self._record(index)[3]
+
+    def frame(self, index):
+        '''Record as a Frame viewing the recording, release() is not needed'''
+        segment, length, offset, timestamp, sequence, pts, stc, sof, flags = self._record(index)
+        view = self._view(segment, offset, length)
+        has_scr = flags & RECORD_SCR
+        return Frame(view, length, flags & RECORD_FID, pts if flags & RECORD_PTS else None,
+                     stc if has_scr else None, sof if has_scr else None, sequence, bool(flags & RECORD_EOF),
+                     timestamp=timestamp)
+
+    def find(self, timestamp):
+        '''Index of the first record at or after timestamp (len() if there is none)'''
+        low = 0
+        high = self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        '''Frames of the recording in order'''
+        for index in range(self._count):
+            yield self.frame(index)
+
+    def close(self):
+        '''Unmap the index and segments, views returned earlier must no longer be used
+
+        A segment still viewed by a frame or data() view is unmapped once the last view is gone.
+        '''
+        for segment_map in self._maps.values():
+            try:
+                segment_map.close()
+            except BufferError:
+                pass
+        self._maps.clear()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def descriptors(self):
+        '''Raw configuration descriptor blob of the device'''
+        return self._descriptors
+
+    @property
+    def kind(self):
+        '''RECORD_FRAMES or RECORD_PAYLOADS'''
+        return self._kind
+
+    @property
+    def segment_size(self):
+        '''Size of the segment files while recording'''
+        return self._segment_size
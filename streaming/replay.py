@@ -0,0 +1,381 @@
+'''This module contains the replay device serving a descriptor dump and a recording as a virtual camera
+
+ReplayDevice implements the part of the pyusb Device, Configuration, Interface and Endpoint
+interface the project uses, so negotiation, readers and the capture manager run unchanged
+without a camera. Payloads are served from a recording made by Recorder, frame recordings are
+split back into payloads, at the recorded pace or as fast as they are read.
+'''
+import array
+import errno
+import pickle
+import struct
+import time
+from descriptors import DescriptorParser, DeviceDescriptor
+from descriptors.descriptor_constants import *
+from .clock import clock_frequency
+from .engine import packet_size
+from .negotiation import TRANSFER_TYPE_MASK, TRANSFER_TYPE_BULK, StreamingControl, streaming_interfaces
+from .payload import HEADER_FID, HEADER_EOF, HEADER_PTS, HEADER_SCR, HEADER_EOH
+from .recorder import RECORD_PAYLOADS, Recording
+
+# pyusb's default timeout in milliseconds
+DEFAULT_TIMEOUT = 1000
+
+
+def load_descriptor_dump(path):
+    '''Configuration descriptor blob pickled by get_usb_data.py (e.g. config_desc)'''
+    with open(path, 'rb') as file:
+        return bytes(pickle.load(file))
+
+
+def _timeout_error():
+    return TimeoutError(errno.ETIMEDOUT, "Operation timed out")
+
+
+class ReplayEndpoint:
+    '''Endpoint of a replay device, read() serves the replayed payloads'''
+
+    def __init__(self, device, interface_number, descriptor):
+        self._device = device
+        self._interface_number = interface_number
+        self.bEndpointAddress = descriptor.bEndpointAddress
+        self.bmAttributes = descriptor.bmAttributes
+        self.wMaxPacketSize = descriptor.wMaxPacketSize
+        self.bInterval = descriptor.bInterval
+
+    def read(self, size_or_buffer, timeout=None):
+        '''Next payload into the buffer (returns its length) or as a new array when given a size'''
+        if isinstance(size_or_buffer, int):
+            buffer = array.array('B', bytes(size_or_buffer))
+            return buffer[:self._device._read(self._interface_number, buffer, timeout)]
+        return self._device._read(self._interface_number, size_or_buffer, timeout)
+
+    def __str__(self):
+        return (f"ENDPOINT 0x{self.bEndpointAddress:02X}: bmAttributes 0x{self.bmAttributes:02X}, "
+                f"wMaxPacketSize {packet_size(self.wMaxPacketSize)}, bInterval {self.bInterval}")
+
+
+class ReplayInterface:
+    '''Alternate setting of a replay device interface, indexing gives its endpoints'''
+
+    def __init__(self, device, interface_number, alternate_setting, setting_node):
+        self.bInterfaceNumber = interface_number
+        self.bAlternateSetting = alternate_setting
+        self.bInterfaceSubClass = setting_node.bInterfaceSubClass
+        self._endpoints = [ReplayEndpoint(device, interface_number, endpoint.descriptor)
+                           for endpoint in setting_node.endpoints]
+
+    def endpoints(self):
+        '''Endpoints of the alternate setting'''
+        return tuple(self._endpoints)
+
+    def __getitem__(self, index):
+        return self._endpoints[index]
+
+
+class ReplayConfiguration:
+    '''Active configuration of a replay device, indexed by (interface number, alternate setting)'''
+
+    def __init__(self, device, configuration):
+        self.bConfigurationValue = configuration.descriptor.bConfigurationValue
+        self._interfaces = {}
+        for interface in configuration.interfaces.values():
+            for number, setting in interface.alternate_settings.items():
+                self._interfaces[(interface.interface_number, number)] = ReplayInterface(
+                    device, interface.interface_number, number, setting)
+
+    def interfaces(self):
+        '''Alternate setting 0 of every interface'''
+        return tuple(interface for (_, alternate_setting), interface in self._interfaces.items()
+                     if alternate_setting == 0)
+
+    def __getitem__(self, index):
+        return self._interfaces[index]
+
+
+class ReplayDevice:
+    '''Virtual camera serving a configuration descriptor blob and optionally a recording
+
+    speed scales the recorded pace (1.0 is real time), None serves payloads as fast as they are
+    read. Payloads are served once the streaming interface is committed and, for isochronous
+    streaming, switched to a non zero alternate setting; each start replays from the first
+    record. With loop the recording starts over at its end, otherwise reads fail with ENODEV
+    once it is exhausted, like a device that went away. Reads with nothing to serve within the
+    timeout raise TimeoutError (errno ETIMEDOUT, as pyusb's USBTimeoutError).
+    '''
+
+    def __init__(self, descriptors, recording=None, speed=1.0, loop=False, payload_size=None, bus=1, address=1,
+                 id_vendor=0, id_product=0):
+        self._descriptors = bytes(descriptors)
+        self._parser = DescriptorParser(self._descriptors)
+        self._configuration_node = self._parser.configuration
+        self._recording = recording
+        self._speed = speed
+        self._loop = loop
+        self.bus = bus
+        self.address = address
+        self.idVendor = id_vendor
+        self.idProduct = id_product
+        self.bDeviceClass = 0xEF
+        self.bDeviceSubClass = 0x02
+        self.bDeviceProtocol = 0x01
+        self._configuration = None
+        self._alternate_settings = {}
+        interfaces = streaming_interfaces(self._configuration_node)
+        self._streaming_interface = interfaces[0] if interfaces else None
+        self._bcd_uvc = self._find_bcd_uvc()
+        self._bulk = self._find_bulk()
+        self._clock_frequency = clock_frequency(self._configuration_node) or 0
+        if payload_size is None:
+            payload_size = self._largest_packet()
+        self._payload_size = payload_size
+        self._controls = {}
+        self._committed = False
+        self._payloads = None
+        self._next = None
+        self._exhausted = False
+        self._start = None
+        self._first_timestamp = None
+        self._served = 0
+
+    @classmethod
+    def from_recording(cls, path, **options):
+        '''Replay device serving the descriptors and records of a recording directory'''
+        recording = Recording(path)
+        return cls(recording.descriptors, recording, **options)
+
+    def _find_bcd_uvc(self):
+        for interface in self._configuration_node.interfaces.values():
+            for setting in interface.alternate_settings.values():
+                if setting.bInterfaceSubClass == SC_VIDEOCONTROL and setting.header is not None:
+                    return setting.header.descriptor.bcdUVC
+        return 0x0100
+
+    def _largest_packet(self):
+        largest = 0
+        if self._streaming_interface is not None:
+            for setting in self._streaming_interface.alternate_settings.values():
+                for endpoint in setting.endpoints:
+                    largest = max(largest, packet_size(endpoint.descriptor.wMaxPacketSize))
+        return largest or 1024
+
+    def set_configuration(self, configuration=None):
+        '''Select the configuration, every interface returns to alternate setting 0'''
+        self._configuration = ReplayConfiguration(self, self._configuration_node)
+        self._alternate_settings.clear()
+        self._stop()
+
+    def get_active_configuration(self):
+        '''The configuration set by set_configuration()'''
+        if self._configuration is None:
+            raise OSError(errno.EIO, "Configuration not set")
+        return self._configuration
+
+    def set_interface_altsetting(self, interface=None, alternate_setting=None):
+        '''Select an alternate setting, alternate setting 0 of an isochronous stream stops it
+
+        interface may be a number or a pyusb style Interface object, whose own alternate setting is
+        used when none is given, as pyusb does.
+        '''
+        if alternate_setting is None:
+            alternate_setting = getattr(interface, 'bAlternateSetting', 0)
+        interface = getattr(interface, 'bInterfaceNumber', interface) or 0
+        if self._configuration is not None and (interface, alternate_setting) not in self._configuration._interfaces:
+            raise OSError(errno.EPIPE, "Pipe error")
+        self._alternate_settings[interface] = alternate_setting
+        if self._streaming_interface is not None and interface == self._streaming_interface.interface_number:
+            if alternate_setting == 0 and not self._bulk:
+                self._stop()
+
+    def reset(self):
+        '''Return every interface to alternate setting 0 and stop the stream'''
+        self._alternate_settings.clear()
+        self._stop()
+
+    def ctrl_transfer(self, bmRequestType, bRequest, wValue=0, wIndex=0, data_or_wLength=None, timeout=None):
+        '''Standard descriptor, status and configuration requests and the probe / commit controls
+
+        Other requests stall (OSError EPIPE).
+        '''
+        if bmRequestType == REQUEST_TYPE_GET_DEVICE:
+            if bRequest == GET_DESCRIPTOR:
+                return self._get_descriptor(wValue >> 8, data_or_wLength)
+            if bRequest == GET_STATUS:
+                return array.array('B', bytes(2))
+            if bRequest == GET_CONFIGURATION:
+                value = self._configuration.bConfigurationValue if self._configuration is not None else 0
+                return array.array('B', (value,))
+        elif bmRequestType == REQUEST_TYPE_SET_DEVICE and bRequest == SET_CONFIGURATION:
+            self.set_configuration(wValue)
+            return 0
+        elif bmRequestType == REQUEST_TYPE_SET_STANDARD_INTERFACE and bRequest == SET_INTERFACE:
+            self.set_interface_altsetting(wIndex, wValue)
+            return 0
+        elif self._is_streaming_control(bmRequestType, wValue, wIndex):
+            if bmRequestType == REQUEST_TYPE_SET_INTERFACE and bRequest == SET_CUR:
+                return self._set_control(wValue >> 8, data_or_wLength)
+            if bmRequestType == REQUEST_TYPE_GET_INTERFACE and bRequest in (GET_CUR, GET_MIN, GET_MAX, GET_DEF):
+                data = self._get_control(wValue >> 8)
+                return array.array('B', data[:data_or_wLength])
+        raise OSError(errno.EPIPE, "Pipe error")
+
+    def _get_descriptor(self, descriptor_type, length):
+        if descriptor_type == DT_CONFIG:
+            return array.array('B', self._descriptors[:length])
+        if descriptor_type == DT_DEVICE:
+            layout = DeviceDescriptor.LAYOUT
+            device = layout.pack(layout.size, DT_DEVICE, 0x0200, self.bDeviceClass, self.bDeviceSubClass,
+                                 self.bDeviceProtocol, 64, self.idVendor, self.idProduct, 0x0100, 0, 0, 0, 1)
+            return array.array('B', device[:length])
+        raise OSError(errno.EPIPE, "Pipe error")
+
+    def _is_streaming_control(self, bmRequestType, wValue, wIndex):
+        return (bmRequestType in (REQUEST_TYPE_SET_INTERFACE, REQUEST_TYPE_GET_INTERFACE)
+                and self._streaming_interface is not None
+                and wIndex & 0xFF == self._streaming_interface.interface_number
+                and wValue >> 8 in (VS_PROBE_CONTROL, VS_COMMIT_CONTROL))
+
+    def _set_control(self, selector, data):
+        control = StreamingControl.Unpack(data, self._bcd_uvc)
+        setting = self._streaming_interface.alternate_setting(min(self._streaming_interface.alternate_settings))
+        format_node = setting.formats.get(control.bFormatIndex)
+        if format_node is None or not format_node.frames:
+            raise OSError(errno.EPIPE, "Pipe error")
+        frame_node = format_node.frames.get(control.bFrameIndex)
+        if frame_node is None:
+            # Like devices do, settle on a frame the format has
+            frame_node = format_node.frames[min(format_node.frames)]
+            control.bFrameIndex = frame_node.descriptor.bFrameIndex
+        frame = frame_node.descriptor
+        control.dwMaxVideoFrameSize = (getattr(frame, 'dwMaxVideoFrameBufferSize', 0)
+                                       or frame.wWidth * frame.wHeight * 2)
+        control.dwMaxPayloadTransferSize = self._payload_size
+        control.dwClockFrequency = self._clock_frequency
+        self._controls[selector] = control
+        if selector == VS_COMMIT_CONTROL:
+            self._committed = True
+            if self._bulk:
+                self._stop()
+        return len(data)
+
+    def _get_control(self, selector):
+        control = self._controls.get(selector) or self._controls.get(VS_PROBE_CONTROL)
+        if control is None:
+            control = StreamingControl(self._bcd_uvc, bFormatIndex=1, bFrameIndex=1)
+        return control.pack()
+
+    def _find_bulk(self):
+        '''Whether the streaming interface streams over a bulk endpoint of its alternate setting 0'''
+        if self._streaming_interface is None:
+            return False
+        setting = self._streaming_interface.alternate_setting(min(self._streaming_interface.alternate_settings))
+        return any(endpoint.descriptor.bmAttributes & TRANSFER_TYPE_MASK == TRANSFER_TYPE_BULK
+                   for endpoint in setting.endpoints)
+
+    def _streaming(self, interface_number):
+        if not self._committed or self._streaming_interface is None:
+            return False
+        if interface_number != self._streaming_interface.interface_number:
+            return False
+        return self._bulk or self._alternate_settings.get(interface_number, 0) != 0
+
+    def _stop(self):
+        self._payloads = None
+        self._next = None
+        self._exhausted = False
+        self._start = None
+
+    def _read(self, interface_number, buffer, timeout):
+        timeout = (timeout or DEFAULT_TIMEOUT) / 1000
+        if self._recording is None or not self._streaming(interface_number):
+            time.sleep(timeout)
+            raise _timeout_error()
+        if self._exhausted:
+            raise OSError(errno.ENODEV, "Replay finished")
+        if self._payloads is None:
+            self._payloads = self._generate()
+        entry = self._next
+        self._next = None
+        if entry is None:
+            entry = next(self._payloads, None)
+        if entry is None:
+            self._exhausted = True
+            raise OSError(errno.ENODEV, "Replay finished")
+        timestamp, header, data = entry
+        if self._speed is not None:
+            now = time.monotonic()
+            if self._start is None:
+                self._start = now
+                self._first_timestamp = timestamp
+            wait = self._start + (timestamp - self._first_timestamp) / self._speed - now
+            if wait > timeout:
+                # Served by a later read
+                self._next = entry
+                time.sleep(timeout)
+                raise _timeout_error()
+            if wait > 0:
+                time.sleep(wait)
+        header_length = len(header)
+        length = header_length + len(data)
+        if length > len(buffer):
+            raise OSError(errno.EOVERFLOW, "Overflow")
+        view = memoryview(buffer)
+        view[:header_length] = header
+        view[header_length:length] = data
+        self._served += 1
+        return length
+
+    def _generate(self):
+        '''(timestamp, header, data) of every payload to serve, timestamps increasing across loops'''
+        recording = self._recording
+        count = len(recording)
+        if not count:
+            return
+        duration = recording.timestamp(count - 1) - recording.timestamp(0)
+        period = duration / (count - 1) if count > 1 else 0.0
+        offset = 0.0
+        while True:
+            if recording.kind == RECORD_PAYLOADS:
+                for index in range(count):
+                    yield recording.timestamp(index) + offset, b'', recording.data(index)
+            else:
+                for index in range(count):
+                    yield from self._split(recording.frame(index), offset)
+            if not self._loop:
+                return
+            offset += duration + period
+
+    def _split(self, frame, offset):
+        '''Payloads carrying a recorded frame, with the PTS and SCR it was recorded with'''
+        info = HEADER_EOH | (HEADER_FID if frame.fid else 0)
+        fields = b''
+        if frame.pts is not None:
+            info |= HEADER_PTS
+            fields += struct.pack('<I', frame.pts)
+        if frame.scr is not None:
+            info |= HEADER_SCR
+            fields += struct.pack('<IH', *frame.scr)
+        header = bytes((2 + len(fields), info)) + fields
+        last_header = bytes((2 + len(fields), info | HEADER_EOF)) + fields
+        data = frame.data
+        length = len(data)
+        chunk = self._payload_size - len(header)
+        timestamp = frame.timestamp + offset
+        for start in range(0, length, chunk):
+            end = min(start + chunk, length)
+            yield timestamp, last_header if end == length else header, data[start:end]
+
+    @property
+    def descriptors(self):
+        '''Configuration descriptor blob served'''
+        return self._descriptors
+
+    @property
+    def served(self):
+        '''Number of payloads served'''
+        return self._served
+
+    @property
+    def exhausted(self):
+        '''Whether every record was served and the replay does not loop'''
+        return self._exhausted
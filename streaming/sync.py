@@ -0,0 +1,146 @@
+'''This module contains the synchronizer matching frames of several cameras by capture timestamp'''
+import bisect
+
+_NO_SETS = ()
+
+
+class _CameraBuffer:
+    '''Frames of one camera waiting for a match, oldest first, with their timestamps kept sorted'''
+
+    __slots__ = ('timestamps', 'frames', 'unmatched')
+
+    def __init__(self):
+        self.timestamps = []
+        self.frames = []
+        self.unmatched = 0
+
+    def insert(self, frame):
+        # Frames arrive in timestamp order, the insertion point is nearly always the end
+        index = bisect.bisect_right(self.timestamps, frame.timestamp)
+        self.timestamps.insert(index, frame.timestamp)
+        self.frames.insert(index, frame)
+
+    def discard(self, count):
+        '''Drop the count oldest frames as unmatched'''
+        for frame in self.frames[:count]:
+            frame.release()
+        del self.timestamps[:count]
+        del self.frames[:count]
+        self.unmatched += count
+
+    def nearest(self, timestamp):
+        '''Index of the frame closest to timestamp'''
+        index = bisect.bisect_left(self.timestamps, timestamp)
+        if index == len(self.timestamps) or (
+                index and timestamp - self.timestamps[index - 1] <= self.timestamps[index] - timestamp):
+            index -= 1
+        return index
+
+
+class FrameSynchronizer:
+    '''Emits sets of frames, one per camera, with timestamps within tolerance seconds of a reference frame
+
+    The reference of the next set is the latest of the oldest buffered frames of the cameras.
+    Every other camera contributes its frame nearest to it, frames older than the matched ones
+    are dropped as unmatched. Each camera buffers at most max_buffered frames, the oldest is
+    dropped when a camera runs ahead of the others.
+
+    The synchronizer owns the frames pushed: unmatched frames are released, matched frames
+    must be released by the caller.
+    '''
+
+    def __init__(self, cameras, tolerance, max_buffered=8):
+        if max_buffered < 1:
+            raise ValueError("max_buffered must be at least 1")
+        self._cameras = tuple(cameras)
+        self._tolerance = tolerance
+        self._max_buffered = max_buffered
+        self._buffers = {name: _CameraBuffer() for name in self._cameras}
+        self._order = tuple(self._buffers[name] for name in self._cameras)
+        self._matched = 0
+
+    def push(self, name, frame):
+        '''Add a frame of a camera, returns the frame sets it completed as tuples in camera order'''
+        buffer = self._buffers[name]
+        buffer.insert(frame)
+        if len(buffer.frames) > self._max_buffered:
+            buffer.discard(1)
+        sets = []
+        while True:
+            frames = self._match()
+            if frames is None:
+                break
+            sets.append(frames)
+        return sets if sets else _NO_SETS
+
+    def _match(self):
+        '''Take the next frame set out of the buffers, None once a camera has no candidate yet'''
+        order = self._order
+        tolerance = self._tolerance
+        while True:
+            for buffer in order:
+                if not buffer.frames:
+                    return None
+            reference = max(order, key=lambda buffer: buffer.timestamps[0])
+            timestamp = reference.timestamps[0]
+            indices = []
+            for buffer in order:
+                if buffer is reference:
+                    indices.append(0)
+                    continue
+                # Frames too old to match the reference can never match a later one either
+                stale = bisect.bisect_left(buffer.timestamps, timestamp - tolerance)
+                if stale:
+                    buffer.discard(stale)
+                    if not buffer.frames:
+                        return None
+                index = buffer.nearest(timestamp)
+                if abs(buffer.timestamps[index] - timestamp) > tolerance:
+                    break
+                indices.append(index)
+            else:
+                frames = []
+                for buffer, index in zip(order, indices):
+                    if index:
+                        buffer.discard(index)
+                    frames.append(buffer.frames.pop(0))
+                    del buffer.timestamps[0]
+                self._matched += 1
+                return tuple(frames)
+            # Some camera has only later frames, the reference cannot be matched
+            reference.discard(1)
+
+    def map(self, frames):
+        '''Generator of frame sets from (camera name, frame) pairs such as CaptureManager yields'''
+        for name, frame in frames:
+            yield from self.push(name, frame)
+
+    def flush(self):
+        '''Drop every buffered frame as unmatched'''
+        for buffer in self._order:
+            buffer.discard(len(buffer.frames))
+
+    def unmatched(self, name=None):
+        '''Number of frames dropped without a match, of one camera or of all of them'''
+        if name is not None:
+            return self._buffers[name].unmatched
+        return sum(buffer.unmatched for buffer in self._order)
+
+    def buffered(self, name):
+        '''Number of frames of a camera waiting for a match'''
+        return len(self._buffers[name].frames)
+
+    @property
+    def cameras(self):
+        '''Names of the cameras in the order of the frame sets'''
+        return self._cameras
+
+    @property
+    def matched(self):
+        '''Number of frame sets emitted'''
+        return self._matched
+
+    @property
+    def tolerance(self):
+        '''Largest distance in seconds between the reference and another frame of a set'''
+        return self._tolerance
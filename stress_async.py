@@ -0,0 +1,97 @@
+'''Stream several loopback cameras through one asyncio event loop with each overflow policy'''
+import asyncio
+import contextlib
+import itertools
+import sys
+from streaming import HEADER_EOF, HEADER_EOH
+from streaming import OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST
+from streaming import Camera, EventThread, FrameAssembler, FrameBufferPool, TransferEngine
+from streaming import LoopbackContext, LoopbackDeviceHandle
+
+FRAME_SIZE = 64 * 1024
+PAYLOAD_DATA = 8190
+FRAMES = 100
+INTERFACE = 1
+ISO_PACKETS = 4
+# Every ERROR_PERIOD-th payload of the lossy cameras is lost to a transmission error
+ERROR_PERIOD = 23
+
+
+def stream(error_period=0):
+    '''Endless stream of frames, every byte of a frame set to its number
+
+    With error_period every error_period-th payload is replaced by a transmission error.
+    '''
+    sent = 0
+    for index in itertools.count():
+        for offset in range(0, FRAME_SIZE, PAYLOAD_DATA):
+            sent += 1
+            if error_period and sent % error_period == 0:
+                yield None
+                continue
+            length = min(PAYLOAD_DATA, FRAME_SIZE - offset)
+            info = HEADER_EOH | (index & 1) | (HEADER_EOF if offset + length == FRAME_SIZE else 0)
+            yield bytes((2, info)) + bytes((index % 256,)) * length
+
+
+async def consume(name, camera, handle, delay, limit):
+    received = 0
+    corrupt = 0
+    async with contextlib.aclosing(camera.frames()) as frames:
+        async for frame in frames:
+            data = frame.data
+            if len(data) != FRAME_SIZE or data.tobytes().count(data[0]) != FRAME_SIZE:
+                corrupt += 1
+            frame.release()
+            received += 1
+            await asyncio.sleep(delay)
+            if received == limit:
+                break
+    reset = handle.alternate_setting(INTERFACE) == 0 and not handle.claimed
+    engine = camera.engine
+    print(f"{name:12}: {received:3} frames, {camera.dropped:3} dropped by the queue, "
+          f"{engine.assembler.dropped:3} incomplete, {engine.transfer_errors + engine.packet_errors:3} errors, "
+          f"{corrupt} corrupt, alt setting reset: {reset}")
+    return reset and not corrupt
+
+
+async def main():
+    context = LoopbackContext()
+    events = EventThread(context)
+    # A blocking queue stalls its whole event thread, give it a context of its own
+    block_context = LoopbackContext()
+    block_events = EventThread(block_context)
+    tasks = []
+    for name, overflow, delay in (('block', OVERFLOW_BLOCK, 0.002), ('drop-oldest', OVERFLOW_DROP_OLDEST, 0.002),
+                                  ('drop-newest', OVERFLOW_DROP_NEWEST, 0.002), ('fast', OVERFLOW_DROP_OLDEST, 0)):
+        blocking = overflow == OVERFLOW_BLOCK
+        handle = LoopbackDeviceHandle(block_context if blocking else context, stream(), payloads_per_event=4)
+        pool = FrameBufferPool(FRAME_SIZE, 8)
+        engine = TransferEngine(block_context if blocking else context, handle, 0x81,
+                                FrameAssembler(FRAME_SIZE, pool=pool), queue_depth=8,
+                                transfer_size=PAYLOAD_DATA + 2, interface=INTERFACE, alternate_setting=1)
+        camera = Camera(engine, block_events if blocking else events, queue_size=4, overflow=overflow)
+        tasks.append(asyncio.create_task(consume(name, camera, handle, delay, FRAMES)))
+    # Cameras losing payloads to transmission errors must only deliver whole frames
+    for name, iso_packets in (('bulk errors', 0), ('iso errors', ISO_PACKETS)):
+        handle = LoopbackDeviceHandle(context, stream(ERROR_PERIOD), payloads_per_event=4)
+        engine = TransferEngine(context, handle, 0x81, FrameAssembler(FRAME_SIZE), queue_depth=8,
+                                transfer_size=(PAYLOAD_DATA + 2) * max(iso_packets, 1), iso_packets=iso_packets,
+                                interface=INTERFACE, alternate_setting=1)
+        tasks.append(asyncio.create_task(consume(name, Camera(engine, events), handle, 0, FRAMES)))
+    # Cancel one more camera mid stream
+    handle = LoopbackDeviceHandle(context, stream(), payloads_per_event=4)
+    engine = TransferEngine(context, handle, 0x81, FrameAssembler(FRAME_SIZE), queue_depth=8,
+                            transfer_size=PAYLOAD_DATA + 2, interface=INTERFACE, alternate_setting=1)
+    cancelled = asyncio.create_task(consume('cancelled', Camera(engine, events), handle, 0.001, None))
+    await asyncio.sleep(0.05)
+    cancelled.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await cancelled
+    cancel_reset = handle.alternate_setting(INTERFACE) == 0 and not handle.claimed
+    print(f"cancelled   : alt setting reset: {cancel_reset}")
+    results = await asyncio.gather(*tasks)
+    return all(results) and cancel_reset
+
+
+sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,113 @@
+'''Check DescriptorBatch against DescriptorParser on mutated config_desc blobs
+
+Field bytes are randomized, descriptor lengths broken and blobs truncated. Every blob must give
+the same descriptor index in both parsers and the same values for every frame descriptor that
+DescriptorParser can construct. Needs NumPy.
+'''
+import pickle
+import random
+import struct
+import sys
+from descriptors import CS_INTERFACE, SC_VIDEOSTREAMING, VS_FRAME_UNCOMPRESSED, VS_FRAME_MJPEG
+from descriptors import DescriptorParser
+from descriptors.descriptor_batch import FRAME_FIELDS, DescriptorBatch, _FORMAT_SUB_TYPES
+
+BLOBS = 2000
+# Blobs parsed by one DescriptorBatch
+BATCH_SIZE = 100
+# Mutations applied to each blob: (kind, weight)
+MUTATIONS = (('field', 8), ('length', 1), ('truncate', 1))
+# Frame columns compared with the decoded descriptor, blob and offset are checked separately
+FRAME_COLUMNS = [name for name, _ in FRAME_FIELDS if name not in ('blob', 'offset')]
+
+
+def mutate(randomizer, config):
+    '''Copy of the configuration with a few random mutations'''
+    blob = bytearray(config)
+    index = DescriptorParser(blob, lazy=True).index
+    kinds = [kind for kind, weight in MUTATIONS for _ in range(weight)]
+    for _ in range(randomizer.randint(1, 4)):
+        kind = randomizer.choice(kinds)
+        if kind == 'truncate':
+            del blob[randomizer.randrange(len(blob)):]
+            break
+        offset, length = randomizer.choice(index)[:2]
+        if offset + length > len(blob):
+            continue
+        if kind == 'length':
+            blob[offset] = randomizer.choice((0, 1, 2, 3, length + 1, 255, randomizer.randrange(256)))
+            break
+        if length > 2:
+            # Anything after bDescriptorType, the sub type included
+            blob[randomizer.randrange(offset + 2, offset + length)] = randomizer.randrange(256)
+    return bytes(blob)
+
+
+def expected_index(parser):
+    '''(offset, length, type, sub type, interface sub class) rows as DescriptorBatch reports them'''
+    return [(offset, length, desc_type, sub_type or 0, -1 if interface_type is None else interface_type)
+            for offset, length, desc_type, sub_type, interface_type in parser.index]
+
+
+def expected_frames(parser):
+    '''Offset, format context and field values of every frame descriptor, None if it cannot be constructed'''
+    frames = []
+    format_index = format_sub_type = 0
+    for position, (offset, _, desc_type, sub_type, interface_type) in enumerate(parser.index):
+        if desc_type != CS_INTERFACE or interface_type != SC_VIDEOSTREAMING:
+            continue
+        if sub_type in _FORMAT_SUB_TYPES:
+            format_index, format_sub_type = parser.data[offset + 3], sub_type
+        elif sub_type in (VS_FRAME_UNCOMPRESSED, VS_FRAME_MJPEG):
+            try:
+                frame = parser.descriptor(position)
+            except struct.error:
+                frames.append((offset, None))
+                continue
+            intervals = frame.dwFrameInterval or ()
+            frames.append((offset, (
+                format_index, format_sub_type, frame.bFrameIndex, sub_type, frame.bmCapabilities, frame.wWidth,
+                frame.wHeight, frame.dwMinBitRate, frame.dwMaxBitRate, frame.dwMaxVideoFrameBufferSize,
+                frame.dwDefaultFrameInterval, frame.bFrameIntervalType, frame.dwMinFrameInterval or 0,
+                frame.dwMaxFrameInterval or 0, frame.dwFrameIntervalStep or 0, tuple(intervals))))
+    return frames
+
+
+def compare(blobs):
+    '''Number of blobs whose index or frames differ between the two parsers, and frames compared'''
+    batch = DescriptorBatch(blobs)
+    rows = batch.descriptors
+    frame_rows = batch.frame_descriptors()
+    mismatches = 0
+    compared = 0
+    for blob_id, blob in enumerate(blobs):
+        parser = DescriptorParser(blob, lazy=True)
+        index = [tuple(int(value) for value in row) for row in rows[rows['blob'] == blob_id][
+            ['offset', 'length', 'type', 'sub_type', 'interface_type']].tolist()]
+        frames = frame_rows[frame_rows['blob'] == blob_id]
+        expected = expected_frames(parser)
+        different = index != expected_index(parser) or len(frames) != len(expected)
+        for row, (offset, values) in zip(frames, expected):
+            if row['offset'] != offset:
+                different = True
+            elif values is not None:
+                compared += 1
+                intervals = tuple(int(value) for value in row['frame_intervals'][:row['frame_interval_type']])
+                different |= tuple(int(row[name]) for name in FRAME_COLUMNS) + (intervals,) != values
+        mismatches += different
+    return mismatches, compared
+
+
+with open('config_desc', 'rb') as config_file:
+    config = pickle.load(config_file)
+
+randomizer = random.Random(1)
+blobs = [mutate(randomizer, config) for _ in range(BLOBS)]
+mismatches = 0
+compared = 0
+for start in range(0, BLOBS, BATCH_SIZE):
+    batch_mismatches, batch_compared = compare(blobs[start:start + BATCH_SIZE])
+    mismatches += batch_mismatches
+    compared += batch_compared
+print(f"{BLOBS} mutated blobs, {compared} frame descriptors compared, {mismatches} blobs differing")
+sys.exit(1 if mismatches else 0)
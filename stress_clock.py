@@ -0,0 +1,55 @@
+'''Recover capture times of a simulated stream with a drifting device clock, a wrapping STC and host jitter'''
+import random
+import sys
+from streaming import ClockRecovery
+
+CLOCK_FREQUENCY = 15000000
+FPS = 30
+SECONDS = 60
+# Host side scheduling: constant delivery latency plus up to JITTER of random delay per sample
+LATENCY = 0.002
+JITTER = 0.003
+# The STC wraps this many seconds into the run
+WRAP_AFTER = 20
+# Frames are converted once the transfer of the frame has ended
+FRAME_DELAY_MS = 1000 // FPS
+# Time the fits get to settle before the errors are counted
+SETTLE_MS = 1000
+# Largest error allowed between the recovered and the true capture time (mean latency removed)
+MAX_ERROR = 0.0003
+
+
+def simulate(drift_ppm, seed):
+    '''Largest and mean absolute timestamp error in seconds'''
+    randomizer = random.Random(seed)
+    rate = CLOCK_FREQUENCY * (1 + drift_ppm * 1e-6)
+    stc_start = (1 << 32) - round(WRAP_AFTER * rate)
+    host = 0.0
+    recovery = ClockRecovery(CLOCK_FREQUENCY, clock=lambda: host)
+    captures = {}
+    errors = []
+    frame = 0
+    for millisecond in range(SECONDS * 1000):
+        now = millisecond / 1000
+        # One SCR per USB frame: the device clock at the SOF, seen by the host after the latency
+        host = now + LATENCY + randomizer.uniform(0, JITTER)
+        recovery.sample((stc_start + round(now * rate)) % (1 << 32), millisecond % 2048)
+        while frame / FPS <= now:
+            capture = frame / FPS
+            captures[millisecond + FRAME_DELAY_MS] = (capture, (stc_start + round(capture * rate)) % (1 << 32))
+            frame += 1
+        due = captures.pop(millisecond, None)
+        if due is not None and millisecond >= SETTLE_MS:
+            capture, pts = due
+            errors.append(recovery.host_time(pts) - capture - LATENCY - JITTER / 2)
+    worst = max(abs(error) for error in errors)
+    return worst, sum(abs(error) for error in errors) / len(errors)
+
+
+ok = True
+for drift_ppm in (80, -80, 0):
+    for seed in range(3):
+        worst, mean = simulate(drift_ppm, seed)
+        ok &= worst <= MAX_ERROR
+        print(f"drift {drift_ppm:+3} ppm, seed {seed}: error max {worst * 1000:.3f} ms, mean {mean * 1000:.3f} ms")
+sys.exit(0 if ok else 1)
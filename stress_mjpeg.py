@@ -0,0 +1,105 @@
+'''Decode camera style MJPEG frames through the ordered decode pool with threads and processes
+
+Frames without Huffman tables, with padding around the image, truncated frames and frames
+the decoder rejects are mixed. Needs Pillow and NumPy.
+'''
+import io
+import random
+import sys
+import time
+from PIL import Image
+from streaming import Frame, FrameBufferPool, MJPEGDecodePool
+from streaming.mjpeg import MARKER_DHT, MARKER_SOS, decode_with_pillow, extract_jpeg
+
+WIDTH = 64
+HEIGHT = 48
+FRAMES = 300
+POOL_SIZE = 16
+# Largest difference of a decoded channel mean from the color encoded
+COLOR_TOLERANCE = 8
+# Frame kinds: decodable without and with Huffman tables, no EOI, rejected by the decoder
+VALID = 'valid'
+WITH_DHT = 'with DHT'
+TRUNCATED = 'truncated'
+REJECTED = 'rejected'
+KINDS = (VALID, VALID, VALID, WITH_DHT, TRUNCATED, REJECTED)
+
+
+def strip_dht(jpeg):
+    '''The JPEG image without its DHT segments, as cameras send it'''
+    output = bytearray(jpeg[:2])
+    position = 2
+    while jpeg[position + 1] != MARKER_SOS:
+        length = 2 + int.from_bytes(jpeg[position + 2:position + 4], 'big')
+        if jpeg[position + 1] != MARKER_DHT:
+            output += jpeg[position:position + length]
+        position += length
+    return bytes(output + jpeg[position:])
+
+
+def color(index):
+    return (index * 37 % 256, index * 91 % 256, index * 53 % 256)
+
+
+def frame_bytes(index, kind):
+    if kind == REJECTED:
+        # Start of scan without a frame header
+        return b'\xff\xd8\xff\xda\x00\x02\xff\xd9'
+    output = io.BytesIO()
+    Image.new('RGB', (WIDTH, HEIGHT), color(index)).save(output, 'JPEG', quality=95)
+    jpeg = output.getvalue()
+    if kind != WITH_DHT:
+        jpeg = strip_dht(jpeg)
+    if kind == TRUNCATED:
+        jpeg = jpeg[:-2]
+    # Padding before the image and after its EOI
+    return bytes(16) + jpeg + bytes(32)
+
+
+def decode_slowly(jpeg):
+    '''decode_with_pillow finishing in a random order'''
+    time.sleep(random.uniform(0, 0.002))
+    return decode_with_pillow(jpeg)
+
+
+def run(randomizer, pool, use_processes):
+    kinds = [randomizer.choice(KINDS) for _ in range(FRAMES)]
+    frames = []
+    for index, kind in enumerate(kinds):
+        data = frame_bytes(index, kind)
+        buffer = pool.acquire()
+        buffer[:len(data)] = data
+        frames.append(Frame(buffer, len(data), index & 1, None, None, None, index, True, pool))
+    fixed_up = sum(isinstance(extract_jpeg(frame), bytes) for frame in frames)
+    expected_fix_ups = sum(kind in (VALID, REJECTED) for kind in kinds)
+    wrong = 0
+    delivered = []
+    decode = decode_with_pillow if use_processes else decode_slowly
+    with MJPEGDecodePool(decode, workers=4, use_processes=use_processes) as decoder:
+        for frame, image, error in decoder.map(frames):
+            delivered.append(frame.sequence)
+            if kinds[frame.sequence] == REJECTED:
+                wrong += error is None or image is not None
+            elif error is not None or image.shape != (HEIGHT, WIDTH, 3) or any(
+                    abs(mean - channel) > COLOR_TOLERANCE
+                    for mean, channel in zip(image.reshape(-1, 3).mean(axis=0), color(frame.sequence))):
+                wrong += 1
+        invalid = decoder.invalid
+    expected = [index for index, kind in enumerate(kinds) if kind != TRUNCATED]
+    in_order = delivered == expected
+    released = pool.free == pool.allocations
+    print(f"{'processes' if use_processes else 'threads  '}: {len(delivered)}/{len(expected)} frames in order: "
+          f"{in_order}, {invalid} invalid, {fixed_up} Huffman tables inserted, {wrong} wrong, "
+          f"buffers released: {released}")
+    return (in_order and not wrong and invalid == FRAMES - len(expected) and fixed_up == expected_fix_ups
+            and released)
+
+
+if __name__ == '__main__':
+    randomizer = random.Random(1)
+    ok = True
+    for use_processes in (False, True):
+        # Every frame is built before the decoding starts, the pool grows to hold them
+        pool = FrameBufferPool(WIDTH * HEIGHT * 3, POOL_SIZE, grow=True)
+        ok &= run(randomizer, pool, use_processes)
+    sys.exit(0 if ok else 1)
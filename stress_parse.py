@@ -0,0 +1,66 @@
+'''Stress test running concurrent parses of config_desc variants and checking they match serial parses'''
+import concurrent.futures
+import pickle
+import random
+import sys
+from descriptors import CS_INTERFACE, SC_VIDEOSTREAMING, VS_FRAME_UNCOMPRESSED, VS_FRAME_MJPEG
+from descriptors import DescriptorParser, parse_all
+
+VARIANTS = 64
+ROUNDS = 20
+THREADS = 16
+
+
+def make_variants(config, count):
+    '''Copies of the configuration with different frame sizes so every variant parses differently'''
+    variants = []
+    for variant_index in range(count):
+        blob = bytearray(config)
+        for offset, _, desc_type, sub_type, interface_type in DescriptorParser(blob, lazy=True).index:
+            if (desc_type == CS_INTERFACE and interface_type == SC_VIDEOSTREAMING
+                    and sub_type in (VS_FRAME_UNCOMPRESSED, VS_FRAME_MJPEG)):
+                blob[offset + 5:offset + 7] = (variant_index * 16 + blob[offset + 3]).to_bytes(2, 'little')
+        variants.append(bytes(blob))
+    return variants
+
+
+def signature(parser):
+    '''Class and decoded field values of every descriptor in the parsed tree'''
+    return tuple(
+        (type(descriptor).__name__, tuple(getattr(descriptor, field) for field in descriptor.FIELDS))
+        for descriptor in parser.descriptors
+    )
+
+
+def parse_lazily(blob):
+    '''Lazy parse touching the descriptors in a random order'''
+    parser = DescriptorParser(blob, lazy=True)
+    order = list(range(len(parser)))
+    random.shuffle(order)
+    for index in order:
+        parser.descriptor(index)
+    return parser
+
+
+with open('config_desc', 'rb') as config_file:
+    config = pickle.load(config_file)
+
+variants = make_variants(config, VARIANTS)
+expected = [signature(DescriptorParser(blob)) for blob in variants]
+failures = 0
+
+with concurrent.futures.ThreadPoolExecutor(max_workers=THREADS) as executor:
+    for round_index in range(ROUNDS):
+        jobs = list(enumerate(variants)) * 4
+        random.shuffle(jobs)
+        parse = parse_lazily if round_index % 2 else DescriptorParser
+        futures = [(variant_index, executor.submit(parse, blob)) for variant_index, blob in jobs]
+        for variant_index, future in futures:
+            if signature(future.result()) != expected[variant_index]:
+                failures += 1
+
+parsers = parse_all(variants)
+failures += sum(signature(parser) != expected_signature for parser, expected_signature in zip(parsers, expected))
+
+print(f"{ROUNDS * VARIANTS * 4 + VARIANTS} concurrent parses, {failures} mismatches")
+sys.exit(1 if failures else 0)
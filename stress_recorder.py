@@ -0,0 +1,102 @@
+'''Write frames and payloads to small segmented recordings and read every record back'''
+import os
+import random
+import sys
+import tempfile
+from streaming import RECORD_FRAMES, RECORD_PAYLOADS, Frame, Recorder, Recording
+
+SEGMENT_SIZE = 64 * 1024
+RECORDS = 400
+# Record sizes drawn at random, empty records and records filling a whole segment included
+SIZES = (0, 1, 1000, 20000, SEGMENT_SIZE // 2, SEGMENT_SIZE)
+DESCRIPTORS = bytes(range(9)) * 3
+
+
+def content(index, size):
+    return bytes(((index + offset) % 256 for offset in range(min(size, 256)))) * (size // 256) + \
+        bytes(((index + offset) % 256 for offset in range(size % 256)))
+
+
+def frames(randomizer):
+    '''(data, pts, scr, fid, eof, timestamp) of every frame, starting with an empty one'''
+    expected = []
+    for index in range(RECORDS):
+        size = 0 if index == 0 else randomizer.choice(SIZES)
+        pts = randomizer.randrange(1 << 32) if index % 3 else None
+        scr = (randomizer.randrange(1 << 32), randomizer.randrange(1 << 11)) if index % 4 else None
+        expected.append((content(index, size), pts, scr, index & 1, bool(index % 5), index * 0.01))
+    return expected
+
+
+def check_frames(path, expected):
+    mismatches = 0
+    with Recording(path) as recording:
+        if recording.kind != RECORD_FRAMES or recording.descriptors != DESCRIPTORS or len(recording) != len(expected):
+            return len(expected)
+        for index, (frame, (data, pts, scr, fid, eof, timestamp)) in enumerate(zip(recording, expected)):
+            if (frame.data != data or recording.data(index) != data or frame.pts != pts or frame.scr != scr
+                    or bool(frame.fid) != bool(fid) or frame.eof != eof or frame.timestamp != timestamp
+                    or frame.sequence != index):
+                mismatches += 1
+        for index in sorted({0, len(expected) // 2, len(expected) - 1}):
+            if recording.find(expected[index][5]) != index:
+                mismatches += 1
+        if recording.find(expected[-1][5] + 1) != len(expected):
+            mismatches += 1
+        # Views still alive while the recording is closed
+        held = [recording.data(index) for index in range(len(expected))]
+    return mismatches + sum(len(view) != len(data) for view, (data, *_) in zip(held, expected))
+
+
+def record_frames(path, expected):
+    with Recorder(path, DESCRIPTORS, segment_size=SEGMENT_SIZE, max_pending=len(expected)) as recorder:
+        for index, (data, pts, scr, fid, eof, timestamp) in enumerate(expected):
+            stc, sof = scr if scr is not None else (None, None)
+            recorder.write_frame(Frame(bytearray(data), len(data), fid, pts, stc, sof, index, eof,
+                                       timestamp=timestamp))
+    return recorder
+
+
+def round_trip_payloads(path, randomizer):
+    payloads = [content(index, randomizer.choice(SIZES[:4])) for index in range(RECORDS)]
+    with Recorder(path, DESCRIPTORS, kind=RECORD_PAYLOADS, segment_size=SEGMENT_SIZE,
+                  max_pending=RECORDS) as recorder:
+        for index, payload in enumerate(payloads):
+            recorder.write_payload(payload, timestamp=index * 0.001)
+    with Recording(path) as recording:
+        if recording.kind != RECORD_PAYLOADS or len(recording) != len(payloads):
+            return len(payloads)
+        return sum(recording.data(index) != payload or recording.timestamp(index) != index * 0.001
+                   for index, payload in enumerate(payloads))
+
+
+def empty(path):
+    '''A recording whose only segment holds nothing but an empty record'''
+    expected = [(b'', None, None, 0, True, 0.0)]
+    record_frames(path, expected)
+    return check_frames(path, expected) == 0
+
+
+def oversized(path):
+    with Recorder(path, DESCRIPTORS, segment_size=SEGMENT_SIZE) as recorder:
+        try:
+            recorder.write_payload(bytes(SEGMENT_SIZE + 1))
+        except ValueError:
+            return True
+    return False
+
+
+randomizer = random.Random(1)
+with tempfile.TemporaryDirectory() as directory:
+    expected = frames(randomizer)
+    frames_path = os.path.join(directory, 'frames')
+    recorder = record_frames(frames_path, expected)
+    frame_mismatches = check_frames(frames_path, expected)
+    payload_mismatches = round_trip_payloads(os.path.join(directory, 'payloads'), randomizer)
+    empty_read = empty(os.path.join(directory, 'empty'))
+    rejected = oversized(os.path.join(directory, 'oversized'))
+print(f"{recorder.recorded}/{RECORDS} frames in {recorder.segments} segments, {recorder.dropped} dropped, "
+      f"{frame_mismatches} frame mismatches, {payload_mismatches} payload mismatches, "
+      f"empty recording read: {empty_read}, oversized record rejected: {rejected}")
+ok = recorder.recorded == RECORDS and not recorder.dropped and not frame_mismatches and not payload_mismatches
+sys.exit(0 if ok and empty_read and rejected else 1)
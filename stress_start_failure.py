@@ -0,0 +1,101 @@
+'''Start loopback cameras whose interface cannot be claimed or set up and check nothing is left behind'''
+import asyncio
+import contextlib
+import errno
+import itertools
+import sys
+import time
+from streaming import HEADER_EOF, HEADER_EOH
+from streaming import Camera, EventThread, FrameAssembler, TransferEngine, LoopbackContext, LoopbackDeviceHandle
+
+FRAME_SIZE = 16 * 1024
+PAYLOAD_DATA = 4094
+FRAMES = 20
+INTERFACE = 1
+STREAMING_SETTING = 1
+
+
+class FailingHandle(LoopbackDeviceHandle):
+    '''Loopback handle failing to claim the interface or to select the streaming alternate setting'''
+
+    def __init__(self, context, payloads, fail_claim=False, fail_setting=False):
+        super().__init__(context, payloads, payloads_per_event=4)
+        self._fail_claim = fail_claim
+        self._fail_setting = fail_setting
+        self.releases = 0
+
+    def claimInterface(self, interface):
+        if self._fail_claim:
+            raise OSError(errno.EBUSY, "Resource busy")
+        super().claimInterface(interface)
+
+    def releaseInterface(self, interface):
+        self.releases += 1
+        super().releaseInterface(interface)
+
+    def setInterfaceAltSetting(self, interface, alt_setting):
+        if self._fail_setting and alt_setting == STREAMING_SETTING:
+            raise OSError(errno.EPIPE, "Pipe error")
+        super().setInterfaceAltSetting(interface, alt_setting)
+
+
+def stream():
+    '''Endless stream of frames'''
+    for index in itertools.count():
+        for offset in range(0, FRAME_SIZE, PAYLOAD_DATA):
+            length = min(PAYLOAD_DATA, FRAME_SIZE - offset)
+            info = HEADER_EOH | (index & 1) | (HEADER_EOF if offset + length == FRAME_SIZE else 0)
+            yield bytes((2, info)) + bytes((index % 256,)) * length
+
+
+def camera(context, events, handle):
+    engine = TransferEngine(context, handle, 0x81, FrameAssembler(FRAME_SIZE), queue_depth=4,
+                            transfer_size=PAYLOAD_DATA + 2, interface=INTERFACE, alternate_setting=STREAMING_SETTING)
+    return Camera(engine, events)
+
+
+async def receive(camera, limit):
+    received = 0
+    async with contextlib.aclosing(camera.frames()) as frames:
+        async for frame in frames:
+            frame.release()
+            received += 1
+            if received == limit:
+                break
+    return received
+
+
+def thread_exited(events, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while events.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return not events.running
+
+
+async def failed_start(name, fail_claim, fail_setting, expected_releases):
+    context = LoopbackContext()
+    events = EventThread(context)
+    handle = FailingHandle(context, stream(), fail_claim, fail_setting)
+    try:
+        await receive(camera(context, events, handle), FRAMES)
+        raised = None
+    except OSError as error:
+        raised = error.errno
+    # A camera started after the failure still streams and lets the thread exit afterwards
+    received = await receive(camera(context, events, LoopbackDeviceHandle(context, stream(), payloads_per_event=4)),
+                             FRAMES)
+    exited = thread_exited(events)
+    clean = (not handle.claimed and handle.alternate_setting(INTERFACE) == 0
+             and handle.releases == expected_releases)
+    print(f"{name:14}: error {errno.errorcode.get(raised, raised)}, interface left clean: {clean}, "
+          f"next camera {received}/{FRAMES} frames, event thread exited: {exited}")
+    return raised is not None and clean and received == FRAMES and exited
+
+
+async def main():
+    ok = await failed_start('claim fails', True, False, 0)
+    ok &= await failed_start('setting fails', False, True, 1)
+    return ok
+
+
+sys.exit(0 if asyncio.run(main()) else 1)
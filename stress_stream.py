@@ -0,0 +1,79 @@
+'''Exercise the streaming engine against the loopback backend at several transfer queue depths'''
+import sys
+import time
+from streaming import HEADER_EOF, HEADER_EOH
+from streaming import FrameAssembler, FrameBufferPool, TransferEngine, LoopbackContext, LoopbackDeviceHandle
+
+WIDTH = 640
+HEIGHT = 480
+FRAME_SIZE = WIDTH * HEIGHT * 2
+FRAMES = 60
+# Payloads the device sends between two rounds of event handling
+BURST = 8
+ENDPOINT = 0x81
+PAYLOAD_DATA = 3060
+PACKET_SIZE = 3072
+ISO_PACKETS = 4
+# Queue depths from which no frame may be dropped
+LOSSLESS_BULK_DEPTH = 8
+LOSSLESS_ISO_DEPTH = 2
+
+
+def frame_payloads(fid, fill):
+    '''Payloads of one frame, every byte of the frame set to fill'''
+    payloads = []
+    for offset in range(0, FRAME_SIZE, PAYLOAD_DATA):
+        length = min(PAYLOAD_DATA, FRAME_SIZE - offset)
+        info = HEADER_EOH | fid | (HEADER_EOF if offset + length == FRAME_SIZE else 0)
+        payloads.append(bytes((2, info)) + bytes((fill,)) * length)
+    return payloads
+
+
+def stream(frames):
+    templates = [frame_payloads(index & 1, index % 251) for index in range(2 * 251)]
+    for index in range(frames):
+        yield from templates[index % len(templates)]
+
+
+def run(queue_depth, iso):
+    context = LoopbackContext()
+    handle = LoopbackDeviceHandle(context, stream(FRAMES), payloads_per_event=BURST)
+    pool = FrameBufferPool(FRAME_SIZE, 4)
+    assembler = FrameAssembler(FRAME_SIZE, expected_size=FRAME_SIZE, pool=pool)
+    errors = 0
+
+    def check(frame):
+        nonlocal errors
+        fill = frame.sequence % 251
+        data = frame.data
+        if data[0] != fill or data[-1] != fill or data.tobytes().count(fill) != FRAME_SIZE:
+            errors += 1
+        frame.release()
+
+    engine = TransferEngine(context, handle, ENDPOINT, assembler, queue_depth=queue_depth,
+                            transfer_size=PACKET_SIZE * ISO_PACKETS if iso else PACKET_SIZE,
+                            iso_packets=ISO_PACKETS if iso else 0, on_frame=check, interface=1,
+                            alternate_setting=4)
+    start = time.perf_counter()
+    engine.start()
+    while not handle.exhausted:
+        engine.poll()
+    engine.stop()
+    elapsed = time.perf_counter() - start
+    reset = handle.alternate_setting(1) == 0 and not handle.claimed
+    print(f"{'iso ' if iso else 'bulk'} depth {queue_depth:2}: {assembler.frames:3}/{FRAMES} frames, "
+          f"{assembler.dropped:3} dropped, {handle.lost:6} payloads lost, {errors} corrupt, "
+          f"{assembler.frames / elapsed:6.1f} frames/s, {pool.allocations} buffers, "
+          f"alt setting reset: {reset}")
+    lossless = queue_depth >= (LOSSLESS_ISO_DEPTH if iso else LOSSLESS_BULK_DEPTH)
+    if lossless and (assembler.dropped or assembler.frames != FRAMES):
+        print(f"  expected every frame at depth {queue_depth}")
+        return False
+    return errors == 0 and reset
+
+
+ok = True
+for iso in (False, True):
+    for depth in (1, 2, 4, 8, 16):
+        ok &= run(depth, iso)
+sys.exit(0 if ok else 1)
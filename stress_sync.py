@@ -0,0 +1,58 @@
+'''Synchronize simulated cameras with clock offsets, timestamp jitter, frame loss and shuffled arrival'''
+import random
+import sys
+import time
+from streaming import Frame, FrameSynchronizer
+
+CAMERAS = 8
+FPS = 60
+SECONDS = 60
+TOLERANCE = 0.008
+LOSS = 0.01
+# Constant offset of each camera's capture times and jitter of every timestamp
+OFFSET = 0.002
+TIMESTAMP_JITTER = 0.001
+# Frames reach the synchronizer after a random delivery delay, so the cameras interleave out of order
+DELIVERY_DELAY = (0.005, 0.015)
+
+
+def arrivals(randomizer):
+    '''(arrival time, camera name, frame number, capture timestamp) in arrival order, and the complete frame numbers'''
+    events = []
+    received = {}
+    for camera in range(CAMERAS):
+        name = f'camera{camera}'
+        offset = randomizer.uniform(-OFFSET, OFFSET)
+        for number in range(SECONDS * FPS):
+            if randomizer.random() < LOSS:
+                continue
+            timestamp = number / FPS + offset + randomizer.uniform(-TIMESTAMP_JITTER, TIMESTAMP_JITTER)
+            events.append((timestamp + randomizer.uniform(*DELIVERY_DELAY), name, number, timestamp))
+            received[number] = received.get(number, 0) + 1
+    events.sort()
+    complete = {number for number, count in received.items() if count == CAMERAS}
+    return events, complete
+
+
+randomizer = random.Random(1)
+events, complete = arrivals(randomizer)
+frames = [(name, Frame(b'', 0, 0, None, None, None, number, True, timestamp=timestamp))
+          for _, name, number, timestamp in events]
+synchronizer = FrameSynchronizer([f'camera{camera}' for camera in range(CAMERAS)], TOLERANCE)
+matched = set()
+mixed = 0
+start = time.perf_counter()
+for frame_set in synchronizer.map(frames):
+    numbers = {frame.sequence for frame in frame_set}
+    if len(numbers) != 1:
+        mixed += 1
+    matched |= numbers
+    for frame in frame_set:
+        frame.release()
+elapsed = time.perf_counter() - start
+synchronizer.flush()
+missed = len(complete - matched)
+print(f"{synchronizer.matched} sets of {CAMERAS} cameras, {len(complete)} complete, {missed} missed, "
+      f"{mixed} mixing frame numbers, {synchronizer.unmatched()} frames unmatched, "
+      f"{len(frames) / elapsed:.0f} frames/s")
+sys.exit(0 if not missed and not mixed and synchronizer.matched == len(complete) else 1)